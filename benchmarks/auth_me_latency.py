@@ -0,0 +1,61 @@
+from benchmarks.common import (
+    start_redis, require_database, fresh_database, make_user, app_client, app_lifespan,
+    run_concurrently, summarize, print_table,
+)
+import argparse
+import asyncio
+
+'''
+    /auth/me latency under concurrent clients, by how the jti blocklist reaches redis
+    - blocking: a synchronous redis client called from the event loop, how the blocklist used to work
+    - pooled: the shared asyncio connection pool, with the per-worker blocklist cache turned off
+    - pooled+cache: as deployed, the per-worker cache answers repeat lookups of a jti
+
+        python -m benchmarks.auth_me_latency [--clients 200] [--requests 20]
+'''
+
+
+async def main(clients: int, requests: int) -> None:
+    import redis
+    import src.auth.dependencies as dependencies
+    import src.db.redis as redis_module
+    from src.config import Config
+
+    blocking_client = redis.Redis(host=Config.REDIS_HOST, port=int(Config.REDIS_PORT))
+
+    async def blocking_token_in_blocklist(jti: str) -> bool:
+        return blocking_client.get(jti) is not None
+
+    modes = {
+        "blocking": (blocking_token_in_blocklist, 0),
+        "pooled": (redis_module.token_in_blocklist, 0),
+        "pooled+cache": (redis_module.token_in_blocklist, Config.BLOCKLIST_VALID_TTL),
+    }
+    rows = []
+
+    async with app_lifespan(), app_client() as client:
+        await fresh_database()
+        _, headers = await make_user()
+        # warm up connections and the response cache entry
+        await run_concurrently(clients, 1, lambda: client.get("/auth/me", headers=headers))
+
+        for mode, (token_in_blocklist, valid_ttl) in modes.items():
+            dependencies.token_in_blocklist = token_in_blocklist
+            redis_module.blocklist_cache.valid.clear()
+            redis_module.blocklist_cache.valid.ttl = valid_ttl
+
+            latencies = await run_concurrently(clients, requests, lambda: client.get("/auth/me", headers=headers))
+            rows.append({"mode": mode, **summarize(latencies)})
+
+    print_table(f"/auth/me, {clients} concurrent clients x {requests} requests", rows)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--clients", type=int, default=200)
+    parser.add_argument("--requests", type=int, default=20)
+    args = parser.parse_args()
+
+    start_redis()
+    require_database()
+    asyncio.run(main(args.clients, args.requests))
@@ -0,0 +1,131 @@
+from benchmarks.common import start_redis, require_database, fresh_database, print_table
+from datetime import date
+import argparse
+import asyncio
+import random
+import time
+
+'''
+    "Who can make it" at `--members` members, the `days_mask` queries against the shapes they replaced
+    - booleans: the old seven `present_*` columns with an index each, rebuilt from the masks in a scratch
+        table (`bench_availability_booleans`, dropped afterwards)
+    - bitwise AND: the same mask without the IN list, `days_mask & mask = mask`
+    - writes: every member's row updated once, the index maintenance the mask saves
+    - round trips are the client's view (statement + commit), server_ms and the plan come from EXPLAIN ANALYZE
+
+        python -m benchmarks.availability_queries [--members 5000] [--repeat 200]
+'''
+DAY_COLUMNS = ("mon", "tue", "wed", "thu", "fri", "sat", "sun")
+BOOLEANS_TABLE = "bench_availability_booleans"
+
+
+def plan_nodes(plan: dict) -> str:
+    nodes = [plan["Node Type"] + (f" on {plan['Index Name']}" if "Index Name" in plan else "")]
+    nodes += [plan_nodes(child) for child in plan.get("Plans", [])]
+    return " > ".join(nodes)
+
+
+async def main(members: int, repeat: int) -> None:
+    from sqlmodel import text, select, update, func
+    from sqlalchemy.dialects import postgresql
+    from sqlalchemy.sql.elements import TextClause
+    from src.calendar.service import days_to_mask, masks_containing
+    from src.db.db_enum_models import MemberRoleEnum, WeekdayEnum
+    from src.db.main import get_session_maker, init_engines, close_db
+    from src.db.models import User, Availability
+
+    days = [WeekdayEnum.TUESDAY, WeekdayEnum.THURSDAY, WeekdayEnum.SATURDAY]
+    mask = days_to_mask(days)
+    rng = random.Random(0)
+
+    init_engines()
+    await fresh_database()
+
+    async with get_session_maker()() as session:
+        users = [
+            User(
+                username=f"am{n}", email=f"am{n}@bench.edu", first_name="bench", last_name="member",
+                role=MemberRoleEnum.MEMBER, birthdate=date(2000, 1, 1), passwd_hash=None,
+            )
+            for n in range(members)
+        ]
+        session.add_all(users)
+        await session.flush()
+        session.add_all(Availability(member_id=user.uid, days_mask=rng.getrandbits(7)) for user in users)
+        await session.commit()
+
+        presence = ", ".join(f"present_{day} BOOLEAN NOT NULL" for day in DAY_COLUMNS)
+        await session.exec(text(f"DROP TABLE IF EXISTS {BOOLEANS_TABLE}"))
+        await session.exec(text(f"CREATE TABLE {BOOLEANS_TABLE} (member_id UUID PRIMARY KEY, {presence})"))
+        await session.exec(text(
+            f"INSERT INTO {BOOLEANS_TABLE} SELECT member_id, "
+            + ", ".join(f"days_mask & {1 << bit} != 0" for bit in range(len(DAY_COLUMNS)))
+            + ' FROM "Availability"'
+        ))
+        for day in DAY_COLUMNS:
+            await session.exec(text(f"CREATE INDEX ix_{BOOLEANS_TABLE}_{day} ON {BOOLEANS_TABLE} (present_{day})"))
+        await session.exec(text(f"ANALYZE {BOOLEANS_TABLE}"))
+        await session.exec(text('ANALYZE "Availability"'))
+        await session.commit()
+
+        counts = ", ".join(f"count(*) FILTER (WHERE present_{day})" for day in DAY_COLUMNS)
+        cases = [
+            ("available Tue+Thu+Sat", "days_mask IN",
+                select(Availability.member_id).where(Availability.days_mask.in_(masks_containing(mask)))),
+            ("available Tue+Thu+Sat", "bitwise AND",
+                select(Availability.member_id).where(Availability.days_mask.op("&")(mask) == mask)),
+            ("available Tue+Thu+Sat", "booleans",
+                text(f"SELECT member_id FROM {BOOLEANS_TABLE} WHERE present_tue AND present_thu AND present_sat")),
+            ("count per weekday", "days_mask", select(*[
+                func.count().filter(Availability.days_mask.op("&")(1 << bit) != 0) for bit in range(len(DAY_COLUMNS))
+            ])),
+            ("count per weekday", "booleans", text(f"SELECT {counts} FROM {BOOLEANS_TABLE}")),
+            ("update every row", "days_mask", update(Availability).values(days_mask=Availability.days_mask.op("#")(1))),
+            ("update every row", "booleans", text(f"UPDATE {BOOLEANS_TABLE} SET present_mon = NOT present_mon")),
+        ]
+
+        rows = []
+        for query, shape, statement in cases:
+            sql = str(statement) if isinstance(statement, TextClause) else str(
+                statement.compile(dialect=postgresql.dialect(), compile_kwargs={"literal_binds": True})
+            )
+            runs = repeat if statement.is_select else max(repeat // 10, 1)
+
+            await session.exec(text(sql))
+            start = time.perf_counter()
+            for _ in range(runs):
+                await session.exec(text(sql))
+                await session.commit()
+            round_trip_ms = (time.perf_counter() - start) / runs * 1000
+
+            result = await session.exec(text(f"EXPLAIN (ANALYZE, FORMAT JSON) {sql}"))
+            plan = result.scalar_one()[0]
+            await session.rollback()
+
+            rows.append({
+                "query": query,
+                "shape": shape,
+                "round_trip_ms": round_trip_ms,
+                "server_ms": plan["Execution Time"],
+                "plan": plan_nodes(plan["Plan"]),
+            })
+
+        available = len((await session.exec(text(str(cases[2][2])))).all())
+        assert available == len((await session.exec(cases[0][2])).all())
+
+        await session.exec(text(f"DROP TABLE {BOOLEANS_TABLE}"))
+        await session.commit()
+
+    await close_db()
+    print_table(f"{members} members ({available} available Tue+Thu+Sat), round trips are means of {repeat} runs (writes {max(repeat // 10, 1)})", rows)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--members", type=int, default=5000)
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    start_redis()
+    require_database()
+    asyncio.run(main(args.members, args.repeat))
@@ -0,0 +1,155 @@
+import asyncio
+import os
+import subprocess
+import sys
+import threading
+import time
+from datetime import date
+from pathlib import Path
+from statistics import quantiles
+from urllib.parse import urlparse
+from uuid import uuid4
+
+'''
+    Shared setup for `python -m benchmarks.<name>`, run from the repo root. Results are printed, nothing is asserted
+    - postgres: BENCH_DB_URL (TEST_DB_URL when unset), migrated with alembic and truncated by `fresh_database`,
+        never point it at a database you care about
+    - redis: BENCH_REDIS_URL, or an in-process fakeredis TCP server (real sockets and protocol, not redis' speed)
+    - import this before anything from `src`, settings are read from the environment it prepares
+'''
+ROOT = Path(__file__).resolve().parents[1]
+BENCH_DB_URL = os.environ.get("BENCH_DB_URL") or os.environ.get("TEST_DB_URL")
+BENCH_REDIS_URL = os.environ.get("BENCH_REDIS_URL")
+
+os.environ["DB_URL"] = BENCH_DB_URL or "postgresql+asyncpg://postgres@localhost/rowing_bench"
+os.environ.setdefault("JWT_SECRET", "bench-secret-" + "x" * 32)
+os.environ.setdefault("JWT_ALGORITHM", "HS256")
+os.environ.setdefault("SCHEDULER_ENABLED", "false")
+
+redis_server = None
+
+
+def start_redis() -> None:
+    '''
+        Points REDIS_HOST/REDIS_PORT at BENCH_REDIS_URL or at a fakeredis server on a free port
+    '''
+    global redis_server
+
+    if BENCH_REDIS_URL:
+        url = urlparse(BENCH_REDIS_URL)
+        os.environ["REDIS_HOST"], os.environ["REDIS_PORT"] = url.hostname, str(url.port or 6379)
+        return
+
+    from fakeredis import TcpFakeServer
+
+    redis_server = TcpFakeServer(("127.0.0.1", 0), server_type="redis")
+    # connection handler threads would otherwise keep the process alive after the benchmark
+    redis_server.daemon_threads = True
+    threading.Thread(target=redis_server.serve_forever, daemon=True).start()
+    os.environ["REDIS_HOST"], os.environ["REDIS_PORT"] = "127.0.0.1", str(redis_server.server_address[1])
+
+
+def require_database() -> None:
+    if BENCH_DB_URL is None:
+        raise SystemExit("Set BENCH_DB_URL (or TEST_DB_URL) to a scratch postgres database")
+
+    result = subprocess.run(
+        [sys.executable, "-m", "alembic", "upgrade", "head"],
+        cwd=ROOT, env={**os.environ, "PYTHONPATH": str(ROOT)}, capture_output=True, text=True,
+    )
+    if result.returncode:
+        raise SystemExit(result.stderr[-3000:])
+
+async def fresh_database() -> None:
+    '''
+        Empties every table, after `require_database`
+    '''
+    from sqlmodel import SQLModel, text
+    from src.db.main import get_engine
+
+    tables = ", ".join(f'"{table.name}"' for table in SQLModel.metadata.sorted_tables)
+    async with get_engine().begin() as conn:
+        await conn.execute(text(f"TRUNCATE {tables} RESTART IDENTITY CASCADE"))
+
+
+async def make_user(role=None, passwd: str | None = None):
+    '''
+        (User, auth headers with a fresh access token), `passwd` is hashed when given
+    '''
+    from src.auth.user_routes import access_token_claims
+    from src.auth.utils import create_access_token, generate_passwd_hash_async
+    from src.db.db_enum_models import MemberRoleEnum
+    from src.db.main import get_session_maker
+    from src.db.models import User
+
+    suffix = uuid4().hex[:6]
+    user = User(
+        username=f"bu{suffix}",
+        email=f"{suffix}@bench.edu",
+        first_name="bench",
+        last_name="user",
+        role=role or MemberRoleEnum.ADMIN,
+        birthdate=date(2000, 1, 1),
+        passwd_hash=await generate_passwd_hash_async(passwd) if passwd else None,
+    )
+
+    async with get_session_maker()() as session:
+        session.add(user)
+        await session.commit()
+
+    token = create_access_token(user_data=await access_token_claims(user))
+    return user, {"Authorization": f"Bearer {token}"}
+
+
+def app_client():
+    '''
+        httpx client on the app, run inside `app_lifespan()`, unhandled errors come back as 500s to be counted
+    '''
+    import httpx
+    from src import app
+
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=app, raise_app_exceptions=False), base_url="http://bench", timeout=60)
+
+def app_lifespan():
+    from src import app
+
+    return app.router.lifespan_context(app)
+
+
+async def timed(coroutine) -> float:
+    start = time.perf_counter()
+    await coroutine
+    return time.perf_counter() - start
+
+async def run_concurrently(clients: int, requests_per_client: int, request) -> list[float]:
+    '''
+        `clients` tasks each awaiting `request()` back to back, returns every latency in seconds
+    '''
+    async def client():
+        return [await timed(request()) for _ in range(requests_per_client)]
+
+    return [latency for latencies in await asyncio.gather(*(client() for _ in range(clients))) for latency in latencies]
+
+
+def summarize(latencies: list[float]) -> dict:
+    # a starved probe may only get one sample in
+    cuts = quantiles(latencies, n=100, method="inclusive") if len(latencies) > 1 else latencies * 99
+    return {
+        "n": len(latencies),
+        "p50_ms": cuts[49] * 1000,
+        "p90_ms": cuts[89] * 1000,
+        "p99_ms": cuts[98] * 1000,
+        "max_ms": max(latencies) * 1000,
+    }
+
+def print_table(title: str, rows: list[dict]) -> None:
+    print(f"\n{title}")
+    columns = list(rows[0])
+    widths = [max(len(column), *(len(format_cell(row[column])) for row in rows)) for column in columns]
+
+    print("  ".join(column.rjust(width) for column, width in zip(columns, widths)))
+    for row in rows:
+        print("  ".join(format_cell(row[column]).rjust(width) for column, width in zip(columns, widths)))
+
+def format_cell(value) -> str:
+    return f"{value:.2f}" if isinstance(value, float) else str(value)
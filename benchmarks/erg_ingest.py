@@ -0,0 +1,129 @@
+from benchmarks.common import start_redis, require_database, fresh_database, print_table
+from datetime import date, timedelta
+from pathlib import Path
+import argparse
+import asyncio
+import csv
+import random
+import tempfile
+import tracemalloc
+
+'''
+    Concept2 logbook ingestion (`ingest_logbooks`) on a synthetic season
+    - `--days` erg practices with a 2000m and a 30:00 piece, `--members` rowers each logging both every day
+    - every scale writes `scale` logbook files per member (re-exports of the same season, the later rows win),
+        so rows grow with the scale while the members/routines looked up stay the same
+    - rows/s from an untraced run, then the peak of a tracemalloc'd run, results are emptied before each
+
+        python -m benchmarks.erg_ingest [--members 60] [--days 120] [--scales 1,4]
+'''
+HEADER = ("Date", "Description", "Work Time (Seconds)", "Work Distance", "Stroke Rate/Cadence")
+SEASON_START = date(2025, 9, 1)
+
+
+def write_logbooks(folder: Path, members: int, days: int, scale: int, rng: random.Random) -> None:
+    for member in range(members):
+        for copy in range(scale):
+            with (folder / f"erg{member}_{copy}.csv").open("w", newline="") as f:
+                writer = csv.writer(f)
+                writer.writerow(HEADER)
+
+                for day in range(days):
+                    occurred = f"{SEASON_START + timedelta(days=day)} 16:30:00"
+                    seconds = rng.uniform(400, 480)
+                    writer.writerow((occurred, "2000m row", f"{seconds:.1f}", 2000, rng.randint(26, 32)))
+                    meters = rng.randint(7200, 8400)
+                    writer.writerow((occurred, "30:00 row", 1800, meters, rng.randint(18, 22)))
+
+                # an export now and then carries a line the ingester has to skip
+                writer.writerow(("not a date", "", "", "", ""))
+
+
+async def main(members: int, days: int, scales: list[int]) -> None:
+    from sqlmodel import delete
+    from src.db.db_enum_models import MemberRoleEnum, SemesterEnum, WorkoutTypeEnum, WorkoutMeasurementTypeEnum
+    from src.db.main import get_session_maker, init_engines, close_db
+    from src.db.models import User, Semester, Workout, LandWorkoutRoutine, MemberWorkoutPerformance
+    from src.practice.ingest import ingest_logbooks
+
+    init_engines()
+    await fresh_database()
+
+    async with get_session_maker()() as session:
+        semester = Semester(
+            year=2025, semester=SemesterEnum.FALL,
+            start_date=SEASON_START, end_date=SEASON_START + timedelta(days=days),
+        )
+        session.add(semester)
+        session.add_all(
+            User(
+                username=f"erg{n}", email=f"erg{n}@bench.edu", first_name="bench", last_name="rower",
+                role=MemberRoleEnum.MEMBER, birthdate=date(2000, 1, 1), passwd_hash=None,
+            )
+            for n in range(members)
+        )
+        await session.flush()
+
+        workouts = [
+            Workout(
+                semester_id=semester.semester_id, date_occurred=SEASON_START + timedelta(days=day),
+                workout_name="erg test", workout_type=WorkoutTypeEnum.ERG, sequence_num=1,
+            )
+            for day in range(days)
+        ]
+        session.add_all(workouts)
+        await session.flush()
+
+        for workout in workouts:
+            session.add(LandWorkoutRoutine(
+                workout_id=workout.workout_id, sequence_num=1,
+                target_measurement_type=WorkoutMeasurementTypeEnum.DISTANCE, target_value=2000,
+            ))
+            session.add(LandWorkoutRoutine(
+                workout_id=workout.workout_id, sequence_num=2,
+                target_measurement_type=WorkoutMeasurementTypeEnum.TIME, target_value=1800,
+            ))
+        await session.commit()
+
+    rows = []
+    for scale in scales:
+        with tempfile.TemporaryDirectory() as folder:
+            write_logbooks(Path(folder), members, days, scale, random.Random(scale))
+
+            async def ingest():
+                async with get_session_maker()() as session:
+                    await session.exec(delete(MemberWorkoutPerformance))
+                    await session.commit()
+                    return await ingest_logbooks(folder, session)
+
+            report = await ingest()
+
+            tracemalloc.start()
+            await ingest()
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+
+        rows.append({
+            "files": report.files,
+            "rows": report.rows,
+            "upserted": report.upserted,
+            "invalid": report.invalid,
+            "seconds": report.seconds,
+            "rows_per_s": report.rows_per_second,
+            "peak_mib": peak / 2**20,
+        })
+
+    await close_db()
+    print_table(f"{members} members x {days} erg days, 2 pieces a day", rows)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--members", type=int, default=60)
+    parser.add_argument("--days", type=int, default=120)
+    parser.add_argument("--scales", default="1,4", help="logbook files per member, comma separated")
+    args = parser.parse_args()
+
+    start_redis()
+    require_database()
+    asyncio.run(main(args.members, args.days, [int(scale) for scale in args.scales.split(",")]))
@@ -0,0 +1,64 @@
+from benchmarks.common import print_table
+from statistics import median
+import argparse
+import time
+
+'''
+    `seed_lineup` + `balance_lineup` at several roster sizes, NumPy only (no database or redis)
+    - paces ~ N(110s, 6s) per 500m, 45% men / 45% women / 10% unknown, boats cycle men's 8, women's 8, mixed 4
+    - times are the median of `--repeat` runs, spreads are max - min boat mean pace in seconds
+
+        python -m benchmarks.lineup_optimizer [--repeat 20]
+'''
+SIZES = ((40, 4), (120, 10), (300, 20), (600, 40))
+
+
+def timed_ms(function, *args):
+    start = time.perf_counter()
+    result = function(*args)
+    return result, (time.perf_counter() - start) * 1000
+
+
+def main(repeat: int) -> None:
+    import numpy as np
+    from src.lineup.optimizer import BENCH, MIXED, MEN, WOMEN, seed_lineup, balance_lineup, boat_means, eligibility
+
+    rng = np.random.default_rng(0)
+    rows = []
+
+    for rowers, boats in SIZES:
+        pace = rng.normal(110, 6, rowers)
+        category = rng.choice([MIXED, MEN, WOMEN], rowers, p=[0.1, 0.45, 0.45])
+        boat_types = np.resize([MEN, WOMEN, MIXED], boats)
+        seat_counts = np.resize([8, 8, 4], boats)
+
+        seed_ms, balance_ms = [], []
+        for _ in range(repeat):
+            seeded, elapsed = timed_ms(seed_lineup, pace, category, boat_types, seat_counts)
+            seed_ms.append(elapsed)
+            balanced, elapsed = timed_ms(balance_lineup, pace, category, boat_types, seat_counts, seeded)
+            balance_ms.append(elapsed)
+
+        seated = np.flatnonzero(balanced != BENCH)
+        assert eligibility(category, boat_types)[seated, balanced[seated]].all()
+
+        before, after = boat_means(pace, seeded, seat_counts), boat_means(pace, balanced, seat_counts)
+        rows.append({
+            "rowers": rowers,
+            "boats": boats,
+            "seated": len(seated),
+            "seed_ms": median(seed_ms),
+            "balance_ms": median(balance_ms),
+            "spread_seeded_s": float(np.nanmax(before) - np.nanmin(before)),
+            "spread_balanced_s": float(np.nanmax(after) - np.nanmin(after)),
+        })
+
+    print_table(f"Lineups, median of {repeat} runs", rows)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    main(args.repeat)
@@ -0,0 +1,91 @@
+from benchmarks.common import (
+    start_redis, require_database, fresh_database, make_user, app_client, app_lifespan,
+    timed, summarize, print_table,
+)
+from collections import Counter
+import argparse
+import asyncio
+
+'''
+    What concurrent logins do to everyone else: /auth/me latency while `--logins` clients log in back to back
+    - inline: bcrypt called on the event loop, how login used to work
+    - offloaded: the bcrypt thread pool as configured (BCRYPT_POOL_SIZE + BCRYPT_MAX_QUEUED in flight, then 503)
+    - offloaded, unbounded: the same pool without admission control, every login waits its turn
+
+        python -m benchmarks.login_bcrypt [--logins 50] [--rounds 4]
+'''
+PASSWORD = "bench-password"
+
+
+async def main(logins: int, rounds: int) -> None:
+    import src.auth.user_routes as user_routes
+    from src.auth.utils import verify_passwd
+    from src.config import Config
+
+    async def inline_verify_passwd(plain_password, hashed_password) -> bool:
+        return verify_passwd(plain_password, hashed_password)
+
+    offloaded_verify_passwd = user_routes.verify_passwd_async
+    max_queued = Config.BCRYPT_MAX_QUEUED
+
+    modes = {
+        "inline": (inline_verify_passwd, max_queued),
+        "offloaded": (offloaded_verify_passwd, max_queued),
+        "offloaded, unbounded": (offloaded_verify_passwd, logins),
+    }
+    rows = []
+
+    async with app_lifespan(), app_client() as client:
+        await fresh_database()
+        user, headers = await make_user(passwd=PASSWORD)
+        credentials = {"username": user.username, "passwd": PASSWORD}
+
+        for mode, (verify_passwd_async, queued) in modes.items():
+            user_routes.verify_passwd_async = verify_passwd_async
+            Config.BCRYPT_MAX_QUEUED = queued
+
+            statuses = Counter()
+            login_latencies = []
+
+            async def log_in():
+                for _ in range(rounds):
+                    response = None
+
+                    async def request():
+                        nonlocal response
+                        response = await client.post("/auth/login", json=credentials)
+
+                    login_latencies.append(await timed(request()))
+                    statuses[response.status_code] += 1
+
+            probe_latencies = []
+            logging_in = asyncio.gather(*(log_in() for _ in range(logins)))
+
+            while not logging_in.done():
+                probe_latencies.append(await timed(client.get("/auth/me", headers=headers)))
+                await asyncio.sleep(0.01)
+
+            await logging_in
+
+            rows.append({
+                "mode": mode,
+                **{f"me_{k}": v for k, v in summarize(probe_latencies).items() if k in ("n", "p50_ms", "p99_ms", "max_ms")},
+                "login_p50_ms": summarize(login_latencies)["p50_ms"],
+                "logins_ok": statuses[200],
+                "logins_503": statuses[503],
+                "logins_500": statuses[500],
+            })
+
+    Config.BCRYPT_MAX_QUEUED = max_queued
+    print_table(f"/auth/me while {logins} clients log in {rounds} times each", rows)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--logins", type=int, default=50)
+    parser.add_argument("--rounds", type=int, default=4)
+    args = parser.parse_args()
+
+    start_redis()
+    require_database()
+    asyncio.run(main(args.logins, args.rounds))
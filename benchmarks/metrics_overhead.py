@@ -0,0 +1,86 @@
+from benchmarks.common import print_table
+import argparse
+import asyncio
+import time
+
+'''
+    Per-request cost of `MetricsMiddleware`, no database or redis needed
+    - the app is driven through raw ASGI calls so nothing but routing and the middleware is timed
+    - a trivial ASGI app shows the middleware's own cost, a FastAPI app what it adds to a real route
+
+        python -m benchmarks.metrics_overhead [--requests 20000]
+'''
+
+
+async def trivial_app(scope, receive, send) -> None:
+    await send({"type": "http.response.start", "status": 200, "headers": [(b"content-type", b"text/plain")]})
+    await send({"type": "http.response.body", "body": b"ok"})
+
+
+def fastapi_app():
+    from fastapi import FastAPI, APIRouter
+
+    router = APIRouter()
+
+    @router.get("/ping/{item_id}")
+    async def ping(item_id: int):
+        return {"item_id": item_id}
+
+    app = FastAPI()
+    app.include_router(router, prefix="/auth")
+    return app
+
+
+async def per_request_us(app, requests: int) -> float:
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET", "scheme": "http",
+        "path": "/auth/ping/1", "raw_path": b"/auth/ping/1", "root_path": "", "query_string": b"", "headers": [],
+        "client": ("127.0.0.1", 1), "server": ("bench", 80),
+    }
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        pass
+
+    for _ in range(requests // 10):
+        await app(dict(scope), receive, send)
+
+    start = time.perf_counter()
+    for _ in range(requests):
+        await app(dict(scope), receive, send)
+
+    return (time.perf_counter() - start) / requests * 1e6
+
+
+async def main(requests: int) -> None:
+    from src.metrics import MetricsMiddleware, render
+
+    rows = []
+    for name, app in (("trivial ASGI", trivial_app), ("FastAPI route", fastapi_app())):
+        bare = await per_request_us(app, requests)
+        instrumented = await per_request_us(MetricsMiddleware(app), requests)
+        rows.append({
+            "app": name,
+            "bare_us": bare,
+            "with_metrics_us": instrumented,
+            "overhead_us": instrumented - bare,
+            "overhead_pct": (instrumented - bare) / bare * 100,
+        })
+
+    start = time.perf_counter()
+    body = render()
+    rows_rendered = body.count("\n")
+    render_ms = (time.perf_counter() - start) * 1000
+
+    print_table(f"Per request, mean of {requests}", rows)
+    print(f"\n/metrics render: {render_ms:.2f}ms for {rows_rendered} lines")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=20000)
+    args = parser.parse_args()
+
+    asyncio.run(main(args.requests))
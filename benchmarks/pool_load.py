@@ -0,0 +1,95 @@
+from benchmarks.common import start_redis, require_database, fresh_database, make_user, timed, summarize, print_table
+from collections import Counter
+import argparse
+import asyncio
+import time
+
+'''
+    Load on the session factory under different pool settings
+    - a "request" is what /auth/all_users does with its session (a 50 user page), after `--db-ms` of
+        pg_sleep standing in for a database that isn't on the same machine
+    - it bypasses HTTP so the pool is the bottleneck, not the app's CPU
+    - each configuration rebuilds the engines, checkout waits come from `db_pool_checkout_seconds`
+
+        python -m benchmarks.pool_load [--clients 100] [--requests 20] [--db-ms 20]
+'''
+CONFIGURATIONS = {
+    "saturated (2+0)": {"DB_POOL_SIZE": 2, "DB_MAX_OVERFLOW": 0},
+    "default (10+10)": {},
+    "tuned (50+25)": {"DB_POOL_SIZE": 50, "DB_MAX_OVERFLOW": 25},
+    "tuned, no pre-ping": {"DB_POOL_SIZE": 50, "DB_MAX_OVERFLOW": 25, "DB_POOL_PRE_PING": False},
+    "tuned, pgbouncer mode": {"DB_POOL_SIZE": 50, "DB_MAX_OVERFLOW": 25, "DB_PGBOUNCER_MODE": True},
+}
+
+
+async def main(clients: int, requests: int, db_ms: float) -> None:
+    from sqlmodel import text
+    from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+    from src.auth.service import UserService
+    from src.config import Config
+    from src.db.main import init_engines, close_db, get_session_maker
+    from src.metrics import db_pool_checkout_seconds
+
+    user_service = UserService()
+    defaults = {name: getattr(Config, name) for settings in CONFIGURATIONS.values() for name in settings}
+    rows = []
+
+    init_engines()
+    await fresh_database()
+    await asyncio.gather(*(make_user() for _ in range(200)))
+
+    for configuration, settings in CONFIGURATIONS.items():
+        for name, value in {**defaults, **settings}.items():
+            setattr(Config, name, value)
+
+        await close_db()
+        init_engines()
+        db_pool_checkout_seconds.values.clear()
+
+        outcomes = Counter()
+        latencies = []
+
+        async def request():
+            try:
+                async with get_session_maker()() as session:
+                    await session.exec(text("SELECT pg_sleep(:seconds)").bindparams(seconds=db_ms / 1000))
+                    await user_service.get_users_page(session, 50)
+                outcomes["ok"] += 1
+            except PoolTimeoutError:
+                outcomes["pool_timeout"] += 1
+
+        async def run_client():
+            for _ in range(requests):
+                latencies.append(await timed(request()))
+
+        start = time.perf_counter()
+        await asyncio.gather(*(run_client() for _ in range(clients)))
+        elapsed = time.perf_counter() - start
+
+        _, checkout_total, checkouts = db_pool_checkout_seconds.values[("primary",)]
+        summary = summarize(latencies)
+
+        rows.append({
+            "pool": configuration,
+            "req_per_s": len(latencies) / elapsed,
+            "p50_ms": summary["p50_ms"],
+            "p99_ms": summary["p99_ms"],
+            "checkout_mean_ms": checkout_total / checkouts * 1000,
+            "ok": outcomes["ok"],
+            "pool_timeouts": outcomes["pool_timeout"],
+        })
+
+    await close_db()
+    print_table(f"{clients} concurrent clients x {requests} requests, {db_ms}ms of database time each", rows)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--clients", type=int, default=100)
+    parser.add_argument("--requests", type=int, default=20)
+    parser.add_argument("--db-ms", type=float, default=20)
+    args = parser.parse_args()
+
+    start_redis()
+    require_database()
+    asyncio.run(main(args.clients, args.requests, args.db_ms))
@@ -15,7 +15,8 @@ database_url = Config.DB_URL
 # this is the Alembic Config object, which provides
 # access to the values within the .ini file in use.
 config = context.config
-config.set_main_option("sqlalchemy.url", database_url)
+# the ini parser treats "%" as interpolation, percent-encoded URLs (passwords, ?host=%2F...) need it doubled
+config.set_main_option("sqlalchemy.url", database_url.replace("%", "%%"))
 
 # Interpret the config file for Python logging.
 # This line sets up loggers basically.
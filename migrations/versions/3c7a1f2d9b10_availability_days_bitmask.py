@@ -0,0 +1,50 @@
+"""availability days bitmask
+
+Revision ID: 3c7a1f2d9b10
+Revises: e1906a9d84f7
+Create Date: 2026-10-18 15:20:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3c7a1f2d9b10'
+down_revision: Union[str, Sequence[str], None] = 'e1906a9d84f7'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# bit position == index, monday = bit 0
+DAYS = ['monday', 'tuesday', 'wednesday', 'thursday', 'friday', 'saturday', 'sunday']
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('Availability', sa.Column('days_mask', sa.SmallInteger(), server_default='0', nullable=False))
+
+    op.execute(
+        'UPDATE "Availability" SET days_mask = '
+        + ' | '.join(f'(CASE WHEN present_{day} THEN {1 << bit} ELSE 0 END)' for bit, day in enumerate(DAYS))
+    )
+
+    op.create_index(op.f('ix_Availability_days_mask'), 'Availability', ['days_mask'], unique=False)
+
+    for day in DAYS:
+        op.drop_index(op.f(f'ix_Availability_present_{day}'), table_name='Availability')
+        op.drop_column('Availability', f'present_{day}')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for bit, day in enumerate(DAYS):
+        op.add_column('Availability', sa.Column(f'present_{day}', sa.Boolean(), server_default=sa.false(), nullable=False))
+        op.execute(f'UPDATE "Availability" SET present_{day} = (days_mask & {1 << bit}) <> 0')
+        op.alter_column('Availability', f'present_{day}', server_default=None)
+        op.create_index(op.f(f'ix_Availability_present_{day}'), 'Availability', [f'present_{day}'], unique=False)
+
+    op.drop_index(op.f('ix_Availability_days_mask'), table_name='Availability')
+    op.drop_column('Availability', 'days_mask')
@@ -0,0 +1,39 @@
+"""scheduled absence archive
+
+Revision ID: 5b9f0c7e2a41
+Revises: 8d2e4b6a1c35
+Create Date: 2026-10-18 17:20:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5b9f0c7e2a41'
+down_revision: Union[str, Sequence[str], None] = '8d2e4b6a1c35'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('ScheduledAbsenceArchive',
+    sa.Column('member_id', sa.Uuid(), nullable=False),
+    sa.Column('absence_date', sa.Date(), nullable=False),
+    sa.Column('semester_id', sa.Integer(), nullable=True),
+    sa.Column('archived_on', sa.DATE(), nullable=False),
+    sa.ForeignKeyConstraint(['member_id'], ['User.uid'], ),
+    sa.ForeignKeyConstraint(['semester_id'], ['Semester.semester_id'], ),
+    sa.PrimaryKeyConstraint('member_id', 'absence_date')
+    )
+    op.create_index(op.f('ix_ScheduledAbsenceArchive_semester_id'), 'ScheduledAbsenceArchive', ['semester_id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_ScheduledAbsenceArchive_semester_id'), table_name='ScheduledAbsenceArchive')
+    op.drop_table('ScheduledAbsenceArchive')
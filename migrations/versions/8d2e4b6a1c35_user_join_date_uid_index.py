@@ -0,0 +1,29 @@
+"""user join_date uid index
+
+Revision ID: 8d2e4b6a1c35
+Revises: 3c7a1f2d9b10
+Create Date: 2026-10-18 15:50:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8d2e4b6a1c35'
+down_revision: Union[str, Sequence[str], None] = '3c7a1f2d9b10'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_User_join_date_uid', 'User', ['join_date', 'uid'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_User_join_date_uid', table_name='User')
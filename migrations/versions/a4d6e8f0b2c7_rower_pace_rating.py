@@ -0,0 +1,33 @@
+"""rower pace rating
+
+Revision ID: a4d6e8f0b2c7
+Revises: 5b9f0c7e2a41
+Create Date: 2026-10-18 18:40:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a4d6e8f0b2c7'
+down_revision: Union[str, Sequence[str], None] = '5b9f0c7e2a41'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('Rower', sa.Column('pace_rating', sa.Float(), nullable=True))
+    op.add_column('Rower', sa.Column('pace_variance', sa.Float(), server_default='0', nullable=False))
+    op.create_index(op.f('ix_Rower_pace_rating'), 'Rower', ['pace_rating'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_Rower_pace_rating'), table_name='Rower')
+    op.drop_column('Rower', 'pace_variance')
+    op.drop_column('Rower', 'pace_rating')
@@ -0,0 +1,29 @@
+"""member exam distance
+
+Revision ID: c2e4a6b8d0f1
+Revises: a4d6e8f0b2c7
+Create Date: 2026-10-18 21:10:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c2e4a6b8d0f1'
+down_revision: Union[str, Sequence[str], None] = 'a4d6e8f0b2c7'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('MemberExamPerformance', sa.Column('distance', sa.Integer(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('MemberExamPerformance', 'distance')
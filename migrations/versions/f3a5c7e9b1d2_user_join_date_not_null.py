@@ -0,0 +1,46 @@
+"""user join_date not null
+
+Revision ID: f3a5c7e9b1d2
+Revises: c2e4a6b8d0f1
+Create Date: 2026-10-18 23:40:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f3a5c7e9b1d2'
+down_revision: Union[str, Sequence[str], None] = 'c2e4a6b8d0f1'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # the keyset on (join_date, uid) can't order or reach NULLs,
+    # unknown dates become the start of the member's first enrolled semester, today when there is none
+    op.execute(
+        '''
+        UPDATE "User" AS u
+        SET join_date = COALESCE(
+            (
+                SELECT min(s.start_date)
+                FROM "MemberEnrollmentHistory" AS h
+                JOIN "Semester" AS s ON s.semester_id = h.semester_id
+                WHERE h.member_id = u.uid
+            ),
+            CURRENT_DATE
+        )
+        WHERE u.join_date IS NULL
+        '''
+    )
+    op.alter_column('User', 'join_date', existing_type=sa.DATE(), nullable=False, server_default=sa.text('CURRENT_DATE'))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.alter_column('User', 'join_date', existing_type=sa.DATE(), nullable=True, server_default=None)
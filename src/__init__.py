@@ -9,8 +9,19 @@ from src.auth.user_routes import user_router
 from src.products.product_routes import product_router
 from src.root_routes import root_router
 from src.member.member_routes import member_router
-from src.config import Settings
-from src.db.main import init_db
+from src.calendar.calendar_routes import calendar_router
+from src.lineup.lineup_routes import lineup_router
+from src.exam.exam_routes import exam_router
+from src.config import Settings, Config
+from src.db.main import init_engines, check_schema_version, close_db, read_your_writes_middleware
+from src.db.query_stats import query_stats_middleware
+from src.metrics import MetricsMiddleware
+from src.db.redis import init_redis, close_redis, start_invalidation_listener
+from src.auth.utils import shutdown_passwd_hasher
+from src.scheduler import start_scheduler, stop_scheduler
+from src.auth.permissions import load_role_permissions
+from src.member.semesters import load_semesters
+import src.practice.ratings  # registers the result -> rating listeners
 
 from contextlib import asynccontextmanager
 
@@ -18,11 +29,25 @@ from contextlib import asynccontextmanager
 async def life_span(app: FastAPI):
     print("Server is starting...")
     
-    # If we want to autogenerate the DB based on our SQLModels
-    # Using Alembic instead to manage DB updates
-    await init_db()
-    
+    # Alembic manages the schema, only make sure the DB is at the migrations head
+    init_engines()
+    if Config.DB_SCHEMA_CHECK:
+        await check_schema_version()
+
+    await init_redis()
+    await load_role_permissions()
+    await load_semesters()
+    await start_invalidation_listener()
+
+    if Config.SCHEDULER_ENABLED:
+        start_scheduler()
+
     yield
+
+    await stop_scheduler()
+    await close_redis()
+    await close_db()
+    shutdown_passwd_hasher()
     print("Server has been stopped...")
 
 # api_version = "v1"
@@ -33,11 +58,18 @@ async def life_span(app: FastAPI):
 app = FastAPI(
     title="userManager",
     description="manage users",
-    # lifespan=life_span
+    lifespan=life_span
 )
 
+app.middleware("http")(read_your_writes_middleware)
+app.middleware("http")(query_stats_middleware)
+app.add_middleware(MetricsMiddleware)
+
 # app.include_router(router=router, prefix=f"/{api_version}/user")
 app.include_router(router=user_router, prefix="/auth")
 app.include_router(router=root_router, prefix="")
 app.include_router(router=product_router, prefix="/products")
 app.include_router(router=member_router, prefix="/member")
+app.include_router(router=calendar_router, prefix="/calendar")
+app.include_router(router=lineup_router, prefix="/lineup")
+app.include_router(router=exam_router, prefix="/exam")
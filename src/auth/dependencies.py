@@ -3,48 +3,64 @@ from fastapi.security import HTTPBearer
 from fastapi.security.http import HTTPAuthorizationCredentials
 from fastapi.exceptions import HTTPException
 from .utils import decode_token
-from src.db.redis import token_in_blocklist
+from src.db.redis import token_in_blocklist, token_generation_valid
 from src.db.main import get_session
 from sqlmodel.ext.asyncio.session import AsyncSession
 from .service import UserService
 from typing import List, Any
+from uuid import UUID
 from src.db.models import User
 
 user_service = UserService()
 
+'''
+    Auth state is request-scoped and stored on `request.state`
+    - `token_data`: the decoded + verified token, decoded and checked against the blocklist/generation once
+    - `current_user`: the `User` row, queried at most once no matter how many dependencies ask for it
+'''
+
 class TokenBearer(HTTPBearer):
     
     def __init__(self, auto_error = True):
         super().__init__(auto_error=auto_error)
 
     async def __call__(self, request: Request) -> HTTPAuthorizationCredentials | None:
-        creds = await super().__call__(request)
+        token_data = getattr(request.state, "token_data", None)
 
-        token = creds.credentials
+        if token_data is None:
+            creds = await super().__call__(request)
 
-        token_data = decode_token(token)
+            token_data = decode_token(creds.credentials)
 
-        if not self.token_valid(token):
-            raise HTTPException(
-                status_code=status.HTTP_403_FORBIDDEN,
-                detail="Invalid token"
-            )
+            if not self.token_valid(token_data):
+                raise HTTPException(
+                    status_code=status.HTTP_403_FORBIDDEN,
+                    detail="Invalid token"
+                )
 
-        if await token_in_blocklist(token_data['jti']):
-            raise HTTPException(
-                status_code=status.HTTP_403_FORBIDDEN, detail={
-                    "error": "This token is invalid or has been revoked",
-                    "resolution": "Please get a new token"
-                }
-            )
+            if await token_in_blocklist(token_data['jti']):
+                raise HTTPException(
+                    status_code=status.HTTP_403_FORBIDDEN, detail={
+                        "error": "This token is invalid or has been revoked",
+                        "resolution": "Please get a new token"
+                    }
+                )
+
+            if not await token_generation_valid(token_data['user']):
+                raise HTTPException(
+                    status_code=status.HTTP_403_FORBIDDEN, detail={
+                        "error": "This token has been revoked by a privilege or session change",
+                        "resolution": "Please log in again"
+                    }
+                )
+
+            request.state.token_data = token_data
 
         self.verify_token_data(token_data)
 
         return token_data
 
-    def token_valid(self, token: str) -> bool:
-        token_data = decode_token(token)
-
+    def token_valid(self, token_data: dict | None) -> bool:
         return token_data is not None
     
     def verify_token_data(self, token_data):
@@ -67,21 +83,35 @@ class RefreshTokenBearer(TokenBearer):
             )
 
 
-async def get_current_user_by_username(token_details: dict = Depends(AccessTokenBearer()), session: AsyncSession = Depends(get_session)) -> dict:
-    user_username = token_details['user']['username']
-    user = await user_service.get_user_by_username(user_username, session)
-    return user
+# Single instances so FastAPI's per-request dependency cache dedupes them across routers/checkers
+access_token_scheme = AccessTokenBearer()
+refresh_token_scheme = RefreshTokenBearer()
+
+
+async def resolve_current_user(request: Request, token_details: dict, session: AsyncSession) -> User:
+    current_user = getattr(request.state, "current_user", None)
+
+    if current_user is None:
+        current_user = await user_service.get_user_by_uid(UUID(token_details['user']['uid']), session)
+        request.state.current_user = current_user
 
-async def get_current_user_uuid(token_details: dict = Depends(AccessTokenBearer()), session: AsyncSession = Depends(get_session)) -> dict:
-    user_uuid = token_details['user']['uid']
-    return await user_service.get_user_by_uid(user_uuid, session)
+    return current_user
+
+async def get_current_user_by_username(request: Request, token_details: dict = Depends(access_token_scheme), session: AsyncSession = Depends(get_session)) -> dict:
+    return await resolve_current_user(request, token_details, session)
+
+async def get_current_user_uuid(request: Request, token_details: dict = Depends(access_token_scheme), session: AsyncSession = Depends(get_session)) -> dict:
+    return await resolve_current_user(request, token_details, session)
 
 class RoleChecker:
+    '''
+        Trusts the signed `role` claim, role changes bump the token generation so stale claims are rejected by the bearer
+    '''
     def __init__(self, allowed_roles: List[str]) -> None:
         self.allowed_roles = allowed_roles
 
-    def __call__(self, current_user: User = Depends(get_current_user_by_username)) -> Any:
-        if current_user.role in self.allowed_roles:
+    def __call__(self, token_details: dict = Depends(access_token_scheme)) -> Any:
+        if token_details['user'].get('role') in self.allowed_roles:
             return True
 
         raise HTTPException(
@@ -90,5 +120,4 @@ class RoleChecker:
 
 
 
-access_token_bearer = Depends(AccessTokenBearer())
-
+access_token_bearer = Depends(access_token_scheme)
@@ -0,0 +1,113 @@
+from fastapi import status, Depends
+from fastapi.exceptions import HTTPException
+from sqlmodel.ext.asyncio.session import AsyncSession
+from sqlmodel import select
+from enum import IntFlag
+from typing import Any
+from src.db.models import RolePermissions
+from src.db.main import get_session_maker
+from src.db.redis import invalidation_handlers, resync_handlers, publish_invalidation
+from src.db.db_enum_models import MemberRoleEnum
+from .dependencies import access_token_scheme
+import json
+
+'''
+    `RolePermissions` compiled to one bitmask per role, held in memory by every worker
+    - checks are a dict lookup and an AND against the token's `role` claim, no query per request
+    - loaded by the app's life_span, after `update_role_permissions` commits the writer recompiles and
+        publishes the masks on the invalidation channel so every worker swaps them in without a query
+    - reloaded from the db whenever the pub/sub connection is re-established (messages may have been missed)
+    - ADMIN always has every permission, so a bad toggle can't lock everyone out
+'''
+
+
+class Permission(IntFlag):
+    '''
+        One bit per `RolePermissions` column, the column is the lowercased name
+    '''
+    ACCESS_SITE = 1 << 0
+    CREATE_ANNOUNCEMENTS = 1 << 1
+    MANAGE_DATES = 1 << 2
+    MANAGE_MEMBERS = 1 << 3
+    MANAGE_ROLES = 1 << 4
+    VIEW_FUNDS = 1 << 5
+    VIEW_ROSTER = 1 << 6
+
+
+ALL_PERMISSIONS = Permission((1 << len(Permission)) - 1)
+
+# role value -> mask
+role_permissions: dict[str, int] = {MemberRoleEnum.ADMIN.value: ALL_PERMISSIONS}
+
+
+def compile_role_permissions(rows: list[RolePermissions]) -> dict[str, int]:
+    compiled = {}
+
+    for row in rows:
+        mask = 0
+        for permission in Permission:
+            if getattr(row, permission.name.lower()):
+                mask |= permission
+
+        compiled[row.role.value] = mask
+
+    compiled[MemberRoleEnum.ADMIN.value] = ALL_PERMISSIONS
+    return compiled
+
+def apply_role_permissions(compiled: dict[str, int]) -> None:
+    role_permissions.clear()
+    role_permissions.update(compiled)
+
+def apply_published_role_permissions(payload: str) -> None:
+    apply_role_permissions({role: int(mask) for role, mask in json.loads(payload).items()})
+
+def role_has(role: str | None, required: int) -> bool:
+    return role_permissions.get(role, 0) & required == required
+
+
+async def fetch_role_permissions(session: AsyncSession) -> dict[str, int]:
+    result = await session.exec(select(RolePermissions))
+    return compile_role_permissions(result.all())
+
+async def load_role_permissions() -> None:
+    async with get_session_maker()() as session:
+        apply_role_permissions(await fetch_role_permissions(session))
+
+async def publish_role_permissions(session: AsyncSession) -> None:
+    '''
+        Call after committing a `RolePermissions` change
+    '''
+    compiled = await fetch_role_permissions(session)
+    apply_role_permissions(compiled)
+    await publish_invalidation("permissions", json.dumps(compiled))
+
+
+invalidation_handlers["permissions"] = apply_published_role_permissions
+resync_handlers.append(load_role_permissions)
+
+
+class PermissionChecker:
+    '''
+        Passes when the token's role holds every required permission
+    '''
+    def __init__(self, required: Permission) -> None:
+        self.required = required
+
+    def __call__(self, token_details: dict = Depends(access_token_scheme)) -> Any:
+        if role_has(token_details['user'].get('role'), self.required):
+            return True
+
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN, detail="Insufficient user permissions to access requested resource"
+        )
+
+
+def require(*permissions: Permission):
+    '''
+        `dependencies=[require(Permission.VIEW_ROSTER)]`
+    '''
+    required = Permission(0)
+    for permission in permissions:
+        required |= permission
+
+    return Depends(PermissionChecker(required))
@@ -1,4 +1,5 @@
 from pydantic import BaseModel, Field
+from typing import Any
 from uuid import UUID
 from datetime import date, datetime
 from src.db.db_enum_models import MemberRoleEnum
@@ -24,6 +25,21 @@ class User(StrictModel):
     is_verified: bool
     join_date: date
 
+class UserPublicModel(BaseModel):
+    '''
+        A user as other endpoints show it (`USER_LIST_FIELDS`), never the password hash
+        anything else on the row is dropped rather than rejected
+    '''
+    uid: UUID
+    username: str
+    email: str
+    first_name: str
+    last_name: str
+    role: MemberRoleEnum
+    birthdate: date
+    is_verified: bool
+    join_date: date
+
 class UserCreateModel(StrictModel):
     username: str = Field(min_length=8, max_length=8, default='jo123456')
     email: str = Field(max_length=32, default="john@ucf.edu")
@@ -45,4 +61,12 @@ class UserLoginModel(StrictModel):
     passwd: str = Field(min_length=6, default="111111")
 
 class UserPrivilegeUpdateModel(StrictModel):
-    role: str
\ No newline at end of file
+    role: str
+
+class UserPageModel(StrictModel):
+    '''
+        A page of `/auth/all_users`, pass `next_cursor` back as `cursor` for the next page (null on the last one)
+        items only contain the requested `fields`
+    '''
+    items: list[dict[str, Any]]
+    next_cursor: str | None
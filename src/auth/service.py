@@ -1,11 +1,27 @@
 from src.db.models import User
 from sqlmodel.ext.asyncio.session import AsyncSession
-from .schemas import UserCreateModel, UserLoginModel
-from sqlmodel import select, desc, update
+from .schemas import UserCreateModel, UserLoginModel, UserPrivilegeUpdateModel
+from sqlmodel import select, desc, update, tuple_
 from datetime import date, datetime
-from .utils import generate_passwd_hash, verify_passwd
+from .utils import generate_passwd_hash_async, verify_passwd_async
 from uuid import UUID
 from src.db.db_enum_models import MemberRoleEnum
+from src.db.response_cache import invalidate_tags
+import base64
+
+# Columns `/auth/all_users` may project, passwd_hash is never exposed
+USER_LIST_FIELDS = ("uid", "username", "email", "first_name", "last_name", "role", "birthdate", "is_verified", "join_date")
+
+
+def encode_user_cursor(join_date: date, uid: UUID) -> str:
+    return base64.urlsafe_b64encode(f"{join_date.isoformat()}|{uid}".encode()).decode()
+
+def decode_user_cursor(cursor: str) -> tuple[date, UUID]:
+    '''
+        Raises ValueError on anything that isn't a cursor we handed out
+    '''
+    join_date, uid = base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+    return date.fromisoformat(join_date), UUID(uid)
 
 
 class UserService:
@@ -50,6 +66,7 @@ class UserService:
         statement = update(User).where(User.uid == user_id).values(model)
         result = await session.exec(statement)
         await session.commit()
+        await invalidate_tags("users", f"user:{user_id}")
 
         return result.rowcount > 0
 
@@ -63,12 +80,15 @@ class UserService:
         new_user = User(**user_data_dict)
 
         new_user.role = MemberRoleEnum.UNREGISTERED
-        new_user.passwd_hash = generate_passwd_hash(user_data.passwd)
+        # the existence checks' connection goes back to the pool while bcrypt runs, the insert takes a new one
+        await session.close()
+        new_user.passwd_hash = await generate_passwd_hash_async(user_data.passwd)
         new_user.join_date = date.today()
         new_user.is_verified = False
 
         session.add(new_user)
         await session.commit()
+        await invalidate_tags("users")
         return new_user
 
     # TODO: implement the login logic in the user_routes.py
@@ -89,7 +109,7 @@ class UserService:
         if hashed_password is None:
             return false
 
-        return verify_passwd(user_login_details.passwd, hashed_password)
+        return await verify_passwd_async(user_login_details.passwd, hashed_password)
 
     async def get_all_users(self, session: AsyncSession):
         statement = select(User).order_by(desc(User.join_date))
@@ -97,6 +117,41 @@ class UserService:
         result = await session.exec(statement)
         return result.all()
 
+    async def get_users_page(
+        self,
+        session: AsyncSession,
+        limit: int,
+        cursor: str | None = None,
+        role: MemberRoleEnum | None = None,
+        fields: list[str] | None = None,
+    ) -> tuple[list[dict], str | None]:
+        '''
+            Keyset pagination over (join_date, uid), newest first
+            Each page is an index range scan on `ix_User_join_date_uid`, so page N costs the same as page 1
+            Only the requested `fields` are selected (plus the cursor columns)
+        '''
+        fields = list(fields or USER_LIST_FIELDS)
+        columns = [getattr(User, field) for field in dict.fromkeys(fields + ["join_date", "uid"])]
+
+        statement = select(*columns).order_by(desc(User.join_date), desc(User.uid)).limit(limit + 1)
+
+        if role is not None:
+            statement = statement.where(User.role == role)
+
+        if cursor is not None:
+            join_date, uid = decode_user_cursor(cursor)
+            statement = statement.where(tuple_(User.join_date, User.uid) < (join_date, uid))
+
+        result = await session.exec(statement)
+        rows = result.all()
+
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = encode_user_cursor(rows[-1].join_date, rows[-1].uid)
+
+        return [{field: getattr(row, field) for field in fields} for row in rows], next_cursor
+
     # TODO: Create update user password method
     # async def update_user(self, user_uid:str, update_data:UserUpdateModel, session:AsyncSession):
     #     user_to_update = await self.get_user_by_email(user_uid, session)
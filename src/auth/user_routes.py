@@ -4,20 +4,22 @@ from typing import Optional, Union, Annotated, List
     Union() or (type | None)
     Annotated[type, "annotation textr"]
 '''
-from fastapi import FastAPI, Header, APIRouter, Depends
+from fastapi import FastAPI, Header, APIRouter, Depends, Query
 from fastapi import status
 from fastapi.responses import JSONResponse
 from fastapi.exceptions import HTTPException
-from .schemas import UserChangePasswordModel, UserCreateModel, User, UserLoginModel
+from .schemas import UserChangePasswordModel, UserCreateModel, User, UserLoginModel, UserPageModel, UserPublicModel
 from sqlmodel.ext.asyncio.session import AsyncSession
-from .service import UserService
-from src.db.main import get_session
-from .utils import create_access_token, decode_token, verify_passwd
+from .service import UserService, USER_LIST_FIELDS
+from src.db.main import get_session, get_read_session
+from .utils import create_access_token, decode_token, verify_passwd_async
 from datetime import datetime, timedelta
-from .dependencies import RefreshTokenBearer, access_token_bearer, get_current_user_by_username, RoleChecker
-from src.db.redis import add_jti_to_blocklist
+from uuid import UUID
+from .dependencies import RefreshTokenBearer, refresh_token_scheme, access_token_bearer, get_current_user_by_username, RoleChecker
+from src.db.redis import add_jti_to_blocklist, blocklist_cache, bump_user_token_generation, current_token_generations
 from .dependencies_data import admin_rolechecker, coach_rolechecker, officer_rolechecker, member_rolechecker, public_rolechecker, general_member_rolechecker
 from src.db.db_enum_models import MemberRoleEnum
+from src.response_cache import CachedRoute, cached_response
 
 
 '''
@@ -27,9 +29,23 @@ from src.db.db_enum_models import MemberRoleEnum
 '''
 REFRESH_TOKEN_EXPIRY_DAYS = 2
 
-user_router = APIRouter()
+user_router = APIRouter(route_class=CachedRoute)
 user_service = UserService()
 SessionDependency = Annotated[AsyncSession, Depends(get_session)]
+ReadSessionDependency = Annotated[AsyncSession, Depends(get_read_session)]
+
+
+async def access_token_claims(user) -> dict:
+    '''
+        `role` is trusted by RoleChecker, the user's generation lets us revoke it later
+    '''
+    return {
+        "username": user.username,
+        "uid": str(user.uid),
+        "role": user.role,
+        "first_name": user.first_name,
+        **await current_token_generations(str(user.uid)),
+    }
 
 
 
@@ -52,24 +68,23 @@ async def login_user(login_data: UserLoginModel, session: SessionDependency):
     passwd = login_data.passwd
 
     user = await user_service.get_user_by_username(username, session)
+    # nothing else is read, the connection goes back to the pool instead of waiting out the hash
+    await session.close()
 
-    if user is not None:
-        passwd_valid = verify_passwd(passwd, user.passwd_hash)
+    # bulk imported accounts have no password until one is set
+    if user is not None and user.passwd_hash is not None:
+        passwd_valid = await verify_passwd_async(passwd, user.passwd_hash)
 
         if passwd_valid:
             access_token = create_access_token(
-                user_data={
-                    "username": user.username,
-                    "uid": str(user.uid),
-                    "role": user.role,
-                    "first_name": user.first_name,
-                },
+                user_data=await access_token_claims(user),
             )
 
             refresh_token = create_access_token(
                 user_data={
                     "username": user.username,
                     "uid": str(user.uid),
+                    **await current_token_generations(str(user.uid)),
                 },
                 refresh=True,
                 expiry=timedelta(days=REFRESH_TOKEN_EXPIRY_DAYS),
@@ -90,18 +105,37 @@ async def login_user(login_data: UserLoginModel, session: SessionDependency):
 
     raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Invalid username and/or password")
 
-@user_router.get("/all_users", response_model=List[User], dependencies=[admin_rolechecker])
-async def get_all_users(session: SessionDependency):
-    users = await user_service.get_all_users(session)
-    return users
+@user_router.get("/all_users", response_model=UserPageModel, dependencies=[admin_rolechecker])
+@cached_response(tags=("users",))
+async def get_all_users(
+    session: ReadSessionDependency,
+    limit: Annotated[int, Query(ge=1, le=500)] = 100,
+    cursor: str | None = None,
+    role: MemberRoleEnum | None = None,
+    fields: Annotated[list[str] | None, Query()] = None,
+):
+    if fields is not None and not set(fields) <= set(USER_LIST_FIELDS):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail=f"fields must be among {list(USER_LIST_FIELDS)}"
+        )
+
+    try:
+        items, next_cursor = await user_service.get_users_page(session, limit, cursor, role, fields)
+    except ValueError:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+
+    return UserPageModel(items=items, next_cursor=next_cursor)
 
 @user_router.get("/refresh_token")
-async def get_new_access_token(token_details: dict = Depends(RefreshTokenBearer())):
+async def get_new_access_token(session: SessionDependency, token_details: dict = Depends(refresh_token_scheme)):
     expiry_timestamp = token_details['exp']
 
-    if datetime.fromtimestamp(expiry_timestamp) > datetime.now():
+    # Refresh tokens carry no role, so the current one is read from the DB
+    user = await user_service.get_user_by_uid(UUID(token_details['user']['uid']), session)
+
+    if user is not None and datetime.fromtimestamp(expiry_timestamp) > datetime.now():
         new_access_token = create_access_token(
-            user_data=token_details['user']
+            user_data=await access_token_claims(user)
         )
 
         return JSONResponse(content={
@@ -112,7 +146,9 @@ async def get_new_access_token(token_details: dict = Depends(RefreshTokenBearer(
         status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid/Expired token"
     )
 
-@user_router.get('/me', dependencies=[public_rolechecker])
+# the response model keeps the password hash out of the response, and so out of the cached entry
+@user_router.get('/me', response_model=UserPublicModel, dependencies=[public_rolechecker])
+@cached_response(tags=("user:{uid}",), per_user=True)
 async def get_current_user(user = Depends(get_current_user_by_username)):
     return user
 
@@ -132,6 +168,27 @@ async def revoke_token(token_details: dict = access_token_bearer):
         status_code=status.HTTP_200_OK
     )
 
+@user_router.get("/logout_all", dependencies=[public_rolechecker])
+async def revoke_all_tokens(token_details: dict = access_token_bearer):
+    '''
+        Logs out every session of the current user, access and refresh tokens alike
+    '''
+    await bump_user_token_generation(token_details['user']['uid'])
+
+    return JSONResponse(
+        content={
+            "message": "Logged out of all sessions successfully"
+        },
+        status_code=status.HTTP_200_OK
+    )
+
+@user_router.get("/blocklist_stats", dependencies=[admin_rolechecker])
+async def get_blocklist_stats():
+    '''
+        Hit rate of this worker's jti blocklist cache
+    '''
+    return blocklist_cache.stats()
+
 @user_router.put("/raise_my_privilege", status_code=status.HTTP_202_ACCEPTED)
 async def raise_privilege(session: SessionDependency, token: dict = access_token_bearer):
     details = token["user"]["uid"]
@@ -142,6 +199,9 @@ async def raise_privilege(session: SessionDependency, token: dict = access_token
             status_code=status.HTTP_403_FORBIDDEN, detail="failed..."
         )
 
+    # Tokens still claim the old role
+    await bump_user_token_generation(details)
+
 # @user_router.get("/{user_uid}", response_model=User)
 # async def get_user(user_uid: str, session: SessionDependency) -> dict:
 #     user = await user_service.get_user(user_uid, session)
@@ -3,11 +3,92 @@ import jwt
 from src.config import Config
 from datetime import datetime, timedelta
 from uuid import uuid4
+from concurrent.futures import Future, ThreadPoolExecutor
+from fastapi import status
+from fastapi.exceptions import HTTPException
+from src.metrics import bcrypt_seconds, bcrypt_rejected_total
+import asyncio
 import logging
+import threading
+import time
 
 # 3600 sec -> 60 min -> 1 hr
 ACCESS_TOKEN_EXPIRY = 3
 
+'''
+    bcrypt is slow on purpose, so it never runs on the event loop
+    - calls are handed to a small dedicated thread pool (bcrypt releases the GIL)
+    - once BCRYPT_POOL_SIZE + BCRYPT_MAX_QUEUED calls are in flight, new ones are rejected with a 503
+    - a call stays in flight until the pool is done with it, a caller that gave up (client disconnect)
+        doesn't free its slot while its hash is still running
+'''
+passwd_hasher_pool: ThreadPoolExecutor | None = None
+passwd_hasher_in_flight = 0
+# the pool's threads finish calls, and time them
+passwd_hasher_lock = threading.Lock()
+
+
+def get_passwd_hasher_pool() -> ThreadPoolExecutor:
+    global passwd_hasher_pool
+
+    if passwd_hasher_pool is None:
+        passwd_hasher_pool = ThreadPoolExecutor(
+            max_workers=Config.BCRYPT_POOL_SIZE,
+            thread_name_prefix="bcrypt",
+        )
+
+    return passwd_hasher_pool
+
+
+def timed_passwd_hasher_call(func, *args):
+    '''
+        Runs in the pool, `bcrypt_seconds` is the work alone
+    '''
+    start = time.perf_counter()
+    try:
+        return func(*args)
+    finally:
+        elapsed = time.perf_counter() - start
+        with passwd_hasher_lock:
+            bcrypt_seconds.observe(elapsed, (func.__name__,))
+
+
+def passwd_hasher_call_done(future: Future) -> None:
+    global passwd_hasher_in_flight
+
+    with passwd_hasher_lock:
+        passwd_hasher_in_flight -= 1
+
+
+async def run_passwd_hasher(func, *args):
+    global passwd_hasher_in_flight
+
+    with passwd_hasher_lock:
+        if passwd_hasher_in_flight >= Config.BCRYPT_POOL_SIZE + Config.BCRYPT_MAX_QUEUED:
+            bcrypt_rejected_total.inc()
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Too many login attempts in progress, please retry shortly",
+                headers={"Retry-After": "1"},
+            )
+
+        passwd_hasher_in_flight += 1
+
+    # cancelling the await only cancels a call that hasn't started, either way the callback runs once it's settled
+    future = get_passwd_hasher_pool().submit(timed_passwd_hasher_call, func, *args)
+    future.add_done_callback(passwd_hasher_call_done)
+
+    return await asyncio.wrap_future(future)
+
+
+def shutdown_passwd_hasher() -> None:
+    global passwd_hasher_pool
+
+    if passwd_hasher_pool is not None:
+        passwd_hasher_pool.shutdown(wait=False, cancel_futures=True)
+
+    passwd_hasher_pool = None
+
 # Hash a password using bcrypt
 def generate_passwd_hash(password) -> str:
     pwd_bytes = password.encode("utf-8")
@@ -19,6 +100,12 @@ def generate_passwd_hash(password) -> str:
 def verify_passwd(plain_password, hashed_password) -> bool:
     return checkpw(plain_password.encode("utf-8"), hashed_password.encode("utf-8"))
 
+async def generate_passwd_hash_async(password) -> str:
+    return await run_passwd_hasher(generate_passwd_hash, password)
+
+async def verify_passwd_async(plain_password, hashed_password) -> bool:
+    return await run_passwd_hasher(verify_passwd, plain_password, hashed_password)
+
 def create_access_token(user_data: dict, expiry: timedelta = None, refresh: bool = False) -> str:
     payload = {}
 
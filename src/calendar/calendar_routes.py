@@ -0,0 +1,92 @@
+from typing import Optional, Union, Annotated, List
+'''
+    Optional[type(s)]
+    Union() or (type | None)
+    Annotated[type, "annotation textr"]
+'''
+from fastapi import APIRouter, Depends, Query
+from fastapi import status
+from fastapi.exceptions import HTTPException
+from .schemas import AvailabilityModel, AvailabilityUpdateModel, WeekdayCountsModel, ScheduledAbsenceModel, EffectiveAvailabilityModel, EffectiveAvailabilityRowModel
+from sqlmodel.ext.asyncio.session import AsyncSession
+from src.db.main import get_session, get_read_session
+from src.auth.dependencies import access_token_bearer
+from src.auth.dependencies_data import member_rolechecker, coach_rolechecker
+from src.db.db_enum_models import WeekdayEnum
+from .service import CalendarService, days_to_mask, mask_to_days, week_start_of, WEEKDAYS
+from uuid import UUID
+from datetime import date, timedelta
+
+'''
+    Availability and scheduling of club dates
+    calls service() methods to perform business logic
+'''
+
+calendar_router = APIRouter(dependencies=[access_token_bearer])
+calendar_service = CalendarService()
+SessionDependency = Annotated[AsyncSession, Depends(get_session)]
+ReadSessionDependency = Annotated[AsyncSession, Depends(get_read_session)]
+
+
+@calendar_router.get("/availability", response_model=AvailabilityModel, dependencies=[member_rolechecker])
+async def get_my_availability(session: ReadSessionDependency, token: dict = access_token_bearer):
+    member_id = UUID(token["user"]["uid"])
+
+    availability = await calendar_service.get_availability(member_id, session)
+    days_mask = availability.days_mask if availability is not None else 0
+
+    return AvailabilityModel(member_id=member_id, days=mask_to_days(days_mask))
+
+@calendar_router.put("/availability", response_model=AvailabilityModel, dependencies=[member_rolechecker])
+async def set_my_availability(availability: AvailabilityUpdateModel, session: SessionDependency, token: dict = access_token_bearer):
+    member_id = UUID(token["user"]["uid"])
+
+    await calendar_service.set_availability(member_id, days_to_mask(availability.days), session)
+
+    return AvailabilityModel(member_id=member_id, days=availability.days)
+
+@calendar_router.get("/available_members", response_model=list[UUID], dependencies=[coach_rolechecker])
+async def get_available_members(session: ReadSessionDependency, days: Annotated[list[WeekdayEnum], Query()]):
+    '''
+        Members available on ALL of the given days, e.g. ?days=tuesday&days=thursday&days=saturday
+    '''
+    return await calendar_service.get_members_available_on(days, session)
+
+@calendar_router.get("/availability_counts", response_model=WeekdayCountsModel, dependencies=[coach_rolechecker])
+async def get_availability_counts(session: ReadSessionDependency):
+    counts = await calendar_service.count_available_per_weekday(session)
+    return WeekdayCountsModel(**{day.value: n for day, n in counts.items()})
+
+@calendar_router.post("/absence", status_code=status.HTTP_201_CREATED, dependencies=[member_rolechecker])
+async def schedule_absence(absence: ScheduledAbsenceModel, session: SessionDependency, token: dict = access_token_bearer):
+    member_id = UUID(token["user"]["uid"])
+
+    if not await calendar_service.add_scheduled_absence(member_id, absence.absence_date, session):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Absence already scheduled")
+
+@calendar_router.delete("/absence", status_code=status.HTTP_204_NO_CONTENT, dependencies=[member_rolechecker])
+async def remove_absence(absence: ScheduledAbsenceModel, session: SessionDependency, token: dict = access_token_bearer):
+    member_id = UUID(token["user"]["uid"])
+
+    if not await calendar_service.remove_scheduled_absence(member_id, absence.absence_date, session):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="No absence scheduled on that date")
+
+@calendar_router.get("/effective_availability", response_model=EffectiveAvailabilityModel, dependencies=[coach_rolechecker])
+async def get_effective_availability(week_of: date):
+    '''
+        Who is expected at practice on each day of the week containing `week_of`
+    '''
+    week_start = week_start_of(week_of)
+    matrix = await calendar_service.get_effective_availability(week_start)
+
+    return EffectiveAvailabilityModel(
+        week_start=week_start,
+        days=[week_start + timedelta(days=i) for i in range(len(WEEKDAYS))],
+        members=[
+            EffectiveAvailabilityRowModel(
+                member_id=member_id,
+                available=[bool(mask & (1 << bit)) for bit in range(len(WEEKDAYS))],
+            )
+            for member_id, mask in matrix.items()
+        ],
+    )
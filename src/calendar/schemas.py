@@ -1,7 +1,9 @@
-from pydantic import BaseModel, Field, Union
+from pydantic import BaseModel, Field
+from typing import Union
 from uuid import UUID
 from datetime import date, datetime, time
 from enum import Enum
+from src.db.db_enum_models import WeekdayEnum
 
 # Prevent the addition of extra fields
 class StrictModel(BaseModel):
@@ -93,4 +95,42 @@ class ScheduledAttendance(StrictModel):
     thu: bool = False
     fri: bool = False
     sat: bool = False
-    sun: bool = False
\ No newline at end of file
+    sun: bool = False
+
+
+class AvailabilityModel(StrictModel):
+    '''
+        A member's typical week, stored as `Availability.days_mask`
+    '''
+    member_id: UUID
+    days: list[WeekdayEnum]
+
+class AvailabilityUpdateModel(StrictModel):
+    days: list[WeekdayEnum] = Field(default_factory=list)
+
+class WeekdayCountsModel(StrictModel):
+    monday: int
+    tuesday: int
+    wednesday: int
+    thursday: int
+    friday: int
+    saturday: int
+    sunday: int
+
+class ScheduledAbsenceModel(StrictModel):
+    '''
+        A planned absence on a day the member is normally present
+    '''
+    absence_date: date
+
+class EffectiveAvailabilityRowModel(StrictModel):
+    member_id: UUID
+    available: list[bool] = Field(min_length=7, max_length=7)
+
+class EffectiveAvailabilityModel(StrictModel):
+    '''
+        member-by-day matrix, `days[i]` lines up with every row's `available[i]`
+    '''
+    week_start: date
+    days: list[date]
+    members: list[EffectiveAvailabilityRowModel]
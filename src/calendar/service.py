@@ -0,0 +1,327 @@
+from src.db.models import Availability, ScheduledAbsence, ScheduledAbsenceArchive, Semester
+from sqlmodel.ext.asyncio.session import AsyncSession
+from sqlmodel import select, func, delete, and_, cast, extract, tuple_
+from sqlalchemy import Integer, literal
+from sqlalchemy.sql import ColumnElement
+from sqlalchemy.dialects.postgresql import insert
+from src.db.db_enum_models import WeekdayEnum
+from src.db.redis import get_redis
+from src.db.main import get_session_maker
+from redis.exceptions import WatchError
+from src.config import Config
+from datetime import date, timedelta
+from uuid import UUID
+from typing import Iterable
+
+'''
+    Handles business logic (db access) for the {/calendar} route
+'''
+
+WEEKDAYS = list(WeekdayEnum)
+ALL_DAYS_MASK = (1 << len(WEEKDAYS)) - 1
+
+
+def days_to_mask(days: Iterable[WeekdayEnum]) -> int:
+    mask = 0
+    for day in days:
+        mask |= 1 << WEEKDAYS.index(day)
+    return mask
+
+def mask_to_days(mask: int) -> list[WeekdayEnum]:
+    return [day for bit, day in enumerate(WEEKDAYS) if mask & (1 << bit)]
+
+def week_start_of(day: date) -> date:
+    return day - timedelta(days=day.weekday())
+
+def archive_absences_statement(*where: ColumnElement):
+    '''
+        Moves the `ScheduledAbsence` rows matching `where` to `ScheduledAbsenceArchive` in one statement
+        (DELETE ... RETURNING feeding an INSERT), tagged with the semester they fell in,
+        returns the moved keys. A row archived before is overwritten rather than lost
+    '''
+    moved = (
+        delete(ScheduledAbsence)
+        .where(*where)
+        .returning(ScheduledAbsence.member_id, ScheduledAbsence.absence_date)
+        .cte("moved")
+    )
+    archived = (
+        select(moved.c.member_id, moved.c.absence_date, Semester.semester_id, literal(date.today()))
+        .select_from(moved)
+        .outerjoin(
+            Semester,
+            and_(moved.c.absence_date >= Semester.start_date, moved.c.absence_date <= Semester.end_date),
+        )
+    )
+    statement = insert(ScheduledAbsenceArchive).from_select(
+        ["member_id", "absence_date", "semester_id", "archived_on"], archived
+    )
+
+    return (
+        statement.on_conflict_do_update(
+            index_elements=[ScheduledAbsenceArchive.member_id, ScheduledAbsenceArchive.absence_date],
+            set_={"semester_id": statement.excluded.semester_id, "archived_on": statement.excluded.archived_on},
+        )
+        .returning(ScheduledAbsenceArchive.member_id, ScheduledAbsenceArchive.absence_date)
+        .add_cte(moved)
+    )
+
+
+def masks_containing(mask: int) -> list[int]:
+    '''
+        Every 7 bit mask that has all of `mask`'s days, at most 128 values
+        lets "available on all of these days" use the `days_mask` index as an IN list
+    '''
+    return [candidate for candidate in range(ALL_DAYS_MASK + 1) if candidate & mask == mask]
+
+
+'''
+    Effective availability = weekly `Availability` pattern minus that week's `ScheduledAbsence` rows
+    - computed for every member in one grouped query
+    - cached per week in a redis hash `effective_availability:<monday>`, field member_id -> "<days_mask>:<absent_mask>"
+    - a single absence/availability change re-queries and rewrites only that member's field
+    - misses are computed on the primary and only stored when the week is still uncached and no write bumped
+        `effective_availability_generation:<monday>` (or `...:all`) since before the query (WATCH),
+        so a fill racing a write can't cache what the write changed
+'''
+EFFECTIVE_AVAILABILITY_KEY = "effective_availability:"
+EFFECTIVE_AVAILABILITY_GENERATION_KEY = "effective_availability_generation:"
+# Bumped by changes that touch every week (weekly availability, rollover)
+ALL_WEEKS = "all"
+# only has to outlive the slowest fill
+EFFECTIVE_AVAILABILITY_GENERATION_TTL = 24 * 3600
+# Marks a cached week as complete even when nobody has an availability row
+COMPLETE_FIELD = "__complete__"
+
+
+def effective_availability_key(week_start: date) -> str:
+    return f"{EFFECTIVE_AVAILABILITY_KEY}{week_start.isoformat()}"
+
+def effective_availability_generation_keys(week_start: date) -> list[str]:
+    return [
+        f"{EFFECTIVE_AVAILABILITY_GENERATION_KEY}{week_start.isoformat()}",
+        f"{EFFECTIVE_AVAILABILITY_GENERATION_KEY}{ALL_WEEKS}",
+    ]
+
+async def bump_effective_availability_generation(week: str) -> None:
+    '''
+        `week` is a monday's isoformat or ALL_WEEKS, call after committing and before touching the cache
+    '''
+    client = await get_redis()
+    key = f"{EFFECTIVE_AVAILABILITY_GENERATION_KEY}{week}"
+
+    async with client.pipeline(transaction=True) as pipe:
+        pipe.incr(key)
+        pipe.expire(key, EFFECTIVE_AVAILABILITY_GENERATION_TTL)
+        await pipe.execute()
+
+
+def effective_availability_statement(week_start: date):
+    week_end = week_start + timedelta(days=6)
+
+    absent_bit = literal(1).op("<<")(cast(extract("isodow", ScheduledAbsence.absence_date), Integer) - 1)
+
+    return (
+        select(
+            Availability.member_id,
+            Availability.days_mask,
+            func.coalesce(func.bit_or(absent_bit), 0).label("absent_mask"),
+        )
+        .outerjoin(
+            ScheduledAbsence,
+            and_(
+                ScheduledAbsence.member_id == Availability.member_id,
+                ScheduledAbsence.absence_date.between(week_start, week_end),
+            ),
+        )
+        .group_by(Availability.member_id, Availability.days_mask)
+    )
+
+
+class CalendarService:
+
+    # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # #
+    # Weekly Availability
+    # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # #
+    async def get_availability(self, member_id: UUID, session: AsyncSession) -> Availability:
+        statement = select(Availability).where(Availability.member_id == member_id)
+        result = await session.exec(statement)
+        return result.first()
+
+    async def set_availability(self, member_id: UUID, days_mask: int, session: AsyncSession) -> None:
+        statement = insert(Availability).values(member_id=member_id, days_mask=days_mask)
+        statement = statement.on_conflict_do_update(
+            index_elements=[Availability.member_id],
+            set_={"days_mask": statement.excluded.days_mask},
+        )
+
+        await session.exec(statement)
+        await session.commit()
+
+        await bump_effective_availability_generation(ALL_WEEKS)
+        await self.refresh_cached_member_all_weeks(member_id, session)
+
+    async def get_members_available_on(self, days: Iterable[WeekdayEnum], session: AsyncSession) -> list[UUID]:
+        statement = select(Availability.member_id).where(
+            Availability.days_mask.in_(masks_containing(days_to_mask(days)))
+        )
+
+        result = await session.exec(statement)
+        return result.all()
+
+    async def count_available_per_weekday(self, session: AsyncSession) -> dict:
+        '''
+            One pass over the table, one count per day
+        '''
+        statement = select(*[
+            func.count().filter(Availability.days_mask.op("&")(1 << bit) != 0)
+            for bit in range(len(WEEKDAYS))
+        ])
+
+        result = await session.exec(statement)
+        return dict(zip(WEEKDAYS, result.one()))
+
+    # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # #
+    # Scheduled Absences
+    # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # #
+    async def add_scheduled_absence(self, member_id: UUID, absence_date: date, session: AsyncSession) -> bool:
+        statement = insert(ScheduledAbsence).values(member_id=member_id, absence_date=absence_date)
+        statement = statement.on_conflict_do_nothing()
+
+        result = await session.exec(statement)
+        await session.commit()
+
+        await self.refresh_cached_member(member_id, week_start_of(absence_date), session)
+        return result.rowcount > 0
+
+    async def remove_scheduled_absence(self, member_id: UUID, absence_date: date, session: AsyncSession) -> bool:
+        statement = delete(ScheduledAbsence).where(
+            ScheduledAbsence.member_id == member_id,
+            ScheduledAbsence.absence_date == absence_date,
+        )
+
+        result = await session.exec(statement)
+        await session.commit()
+
+        await self.refresh_cached_member(member_id, week_start_of(absence_date), session)
+        return result.rowcount > 0
+
+    async def purge_stale_absences(self, before: date, chunk_size: int, session: AsyncSession) -> int:
+        '''
+            Archives absences older than `before` (like the rollover does), `chunk_size` rows per transaction
+            walking the primary key, so no statement holds row locks for long. Returns the number of rows archived
+        '''
+        archived = 0
+        last_key = None
+
+        while True:
+            chunk = select(ScheduledAbsence.member_id, ScheduledAbsence.absence_date).where(
+                ScheduledAbsence.absence_date < before
+            )
+            if last_key is not None:
+                chunk = chunk.where(tuple_(ScheduledAbsence.member_id, ScheduledAbsence.absence_date) > last_key)
+            chunk = chunk.order_by(ScheduledAbsence.member_id, ScheduledAbsence.absence_date).limit(chunk_size)
+
+            statement = archive_absences_statement(
+                tuple_(ScheduledAbsence.member_id, ScheduledAbsence.absence_date).in_(chunk)
+            )
+            result = await session.exec(statement)
+            keys = result.all()
+            await session.commit()
+
+            archived += len(keys)
+            if len(keys) < chunk_size:
+                return archived
+
+            last_key = tuple_(*max(keys))
+
+    # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # #
+    # Effective Availability
+    # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # #
+    async def get_effective_availability(self, week_start: date) -> dict[UUID, int]:
+        '''
+            member_id -> mask of days the member is expected at practice that week
+        '''
+        client = await get_redis()
+        key = effective_availability_key(week_start)
+
+        cached = await client.hgetall(key)
+        if cached:
+            cached.pop(COMPLETE_FIELD.encode(), None)
+            return {
+                UUID(member_id.decode()): effective_mask(value.decode())
+                for member_id, value in cached.items()
+            }
+
+        generation_keys = effective_availability_generation_keys(week_start)
+        generations = await client.mget(generation_keys)
+
+        # not the caller's session, it may be a lagging replica's
+        async with get_session_maker()() as session:
+            result = await session.exec(effective_availability_statement(week_start))
+            rows = result.all()
+
+        fields = {str(member_id): f"{days_mask}:{absent_mask}" for member_id, days_mask, absent_mask in rows}
+        fields[COMPLETE_FIELD] = "1"
+
+        async with client.pipeline(transaction=True) as pipe:
+            try:
+                await pipe.watch(key, *generation_keys)
+
+                # another fill got there first, or a write landed while querying: the next read recomputes
+                if not await pipe.exists(key) and await pipe.mget(generation_keys) == generations:
+                    pipe.multi()
+                    pipe.hset(key, mapping=fields)
+                    pipe.expire(key, Config.EFFECTIVE_AVAILABILITY_CACHE_TTL)
+                    await pipe.execute()
+            except WatchError:
+                pass
+
+        return {member_id: days_mask & ~absent_mask for member_id, days_mask, absent_mask in rows}
+
+    async def refresh_cached_member(self, member_id: UUID, week_start: date, session: AsyncSession) -> None:
+        '''
+            Rewrites one member's field of a cached week, weeks that aren't cached are left alone
+            (after their generation is bumped, so a fill already in flight isn't stored)
+        '''
+        await bump_effective_availability_generation(week_start.isoformat())
+
+        client = await get_redis()
+        key = effective_availability_key(week_start)
+
+        if not await client.exists(key):
+            return
+
+        statement = effective_availability_statement(week_start).where(Availability.member_id == member_id)
+        result = await session.exec(statement)
+        row = result.first()
+
+        if row is None:
+            await client.hdel(key, str(member_id))
+        else:
+            _, days_mask, absent_mask = row
+            await client.hset(key, str(member_id), f"{days_mask}:{absent_mask}")
+
+    async def refresh_cached_member_all_weeks(self, member_id: UUID, session: AsyncSession) -> None:
+        client = await get_redis()
+
+        async for key in client.scan_iter(match=f"{EFFECTIVE_AVAILABILITY_KEY}*"):
+            week_start = date.fromisoformat(key.decode().removeprefix(EFFECTIVE_AVAILABILITY_KEY))
+            await self.refresh_cached_member(member_id, week_start, session)
+
+    async def clear_cached_effective_availability(self) -> None:
+        '''
+            After bulk changes (semester rollover), weeks are rebuilt on their next read
+        '''
+        await bump_effective_availability_generation(ALL_WEEKS)
+
+        client = await get_redis()
+        keys = [key async for key in client.scan_iter(match=f"{EFFECTIVE_AVAILABILITY_KEY}*")]
+
+        if keys:
+            await client.delete(*keys)
+
+
+def effective_mask(cached_value: str) -> int:
+    days_mask, absent_mask = cached_value.split(":")
+    return int(days_mask) & ~int(absent_mask)
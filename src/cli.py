@@ -0,0 +1,147 @@
+from src.db.main import get_session_maker, close_db
+from src.db.redis import close_redis
+from src.member.bulk_import import import_members
+from src.practice.ingest import ingest_logbooks
+from src.practice.ratings import recompute_ratings
+from src.member.rollover import rollover_semester
+from src.exam.leaderboard import rebuild_leaderboards
+from src.db.db_enum_models import SemesterEnum
+from datetime import date
+from pathlib import Path
+import argparse
+import asyncio
+import sys
+import time
+
+'''
+    Operational commands that run outside the web app, against the same database/settings
+    python -m src.cli <command> --help
+'''
+
+
+async def run_import_members(args) -> int:
+    text = Path(args.csv_file).read_text(encoding="utf-8-sig")
+    started = time.perf_counter()
+
+    try:
+        async with get_session_maker()() as session:
+            report = await import_members(text, session, args.all_or_nothing)
+    except ValueError as e:
+        print(e, file=sys.stderr)
+        return 2
+    finally:
+        await close_db()
+        await close_redis()
+
+    print(report.model_dump_json(indent=2))
+    print(f"{report.rows} rows in {time.perf_counter() - started:.2f}s", file=sys.stderr)
+
+    return 0 if report.committed and not report.errors else 1
+
+
+async def run_ingest_erg(args) -> int:
+    try:
+        async with get_session_maker()() as session:
+            report = await ingest_logbooks(args.path, session, args.username)
+    finally:
+        await close_db()
+
+    print(report.model_dump_json(indent=2))
+    print(f"{report.rows} rows from {report.files} files in {report.seconds:.2f}s ({report.rows_per_second:.0f} rows/s)", file=sys.stderr)
+
+    return 0
+
+
+async def run_rollover(args) -> int:
+    try:
+        async with get_session_maker()() as session:
+            report = await rollover_semester(
+                session, args.start_date, args.end_date, args.year, args.semester, args.dry_run
+            )
+    except ValueError as e:
+        print(e, file=sys.stderr)
+        return 2
+    finally:
+        await close_db()
+        await close_redis()
+
+    print(report.model_dump_json(indent=2))
+
+    return 0
+
+
+async def run_recompute_ratings(args) -> int:
+    started = time.perf_counter()
+
+    try:
+        async with get_session_maker()() as session:
+            rowers = await recompute_ratings(session, args.semester_id)
+    finally:
+        await close_db()
+
+    print(f"{rowers} rowers rated in {time.perf_counter() - started:.2f}s", file=sys.stderr)
+
+    return 0
+
+
+async def run_rebuild_leaderboards(args) -> int:
+    started = time.perf_counter()
+
+    try:
+        async with get_session_maker()() as session:
+            boards = await rebuild_leaderboards(session, args.semester_id)
+    finally:
+        await close_db()
+        await close_redis()
+
+    print(f"{boards} leaderboards rebuilt in {time.perf_counter() - started:.2f}s", file=sys.stderr)
+
+    return 0
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="python -m src.cli")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    import_parser = commands.add_parser("import-members", help="Bulk create/enroll members from a csv")
+    import_parser.add_argument("csv_file")
+    import_parser.add_argument(
+        "--all-or-nothing", action="store_true", help="Write nothing if any row fails validation"
+    )
+    import_parser.set_defaults(handler=run_import_members)
+
+    ingest_parser = commands.add_parser("ingest-erg", help="Load Concept2 logbook csv exports (a file or a folder of them)")
+    ingest_parser.add_argument("path")
+    ingest_parser.add_argument(
+        "--username", help="Member the results belong to, defaults to the file name up to the first '_'"
+    )
+    ingest_parser.set_defaults(handler=run_ingest_erg)
+
+    rollover_parser = commands.add_parser("rollover", help="Start the next semester, carrying members forward")
+    rollover_parser.add_argument("start_date", type=date.fromisoformat)
+    rollover_parser.add_argument("end_date", type=date.fromisoformat)
+    rollover_parser.add_argument("--year", type=int, help="Defaults to the one after the latest semester")
+    rollover_parser.add_argument("--semester", type=SemesterEnum, choices=list(SemesterEnum))
+    rollover_parser.add_argument("--dry-run", action="store_true", help="Only report the counts")
+    rollover_parser.set_defaults(handler=run_rollover)
+
+    ratings_parser = commands.add_parser("recompute-ratings", help="Rebuild rower pace ratings from the stored results")
+    ratings_parser.add_argument(
+        "--semester-id", type=int, help="Rate on one season's results only, defaults to all history for everyone"
+    )
+    ratings_parser.set_defaults(handler=run_recompute_ratings)
+
+    leaderboards_parser = commands.add_parser("rebuild-leaderboards", help="Recompute the redis exam leaderboards from the db")
+    leaderboards_parser.add_argument("--semester-id", type=int, help="Only that semester's boards, defaults to all of them")
+    leaderboards_parser.set_defaults(handler=run_rebuild_leaderboards)
+
+    return parser
+
+
+def main(argv: list[str] | None = None) -> int:
+    args = build_parser().parse_args(argv)
+    return asyncio.run(args.handler(args))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
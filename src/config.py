@@ -1,4 +1,5 @@
 from pydantic_settings import BaseSettings, SettingsConfigDict
+from functools import lru_cache
 
 class Settings(BaseSettings):
     '''
@@ -6,10 +7,54 @@ class Settings(BaseSettings):
             exports the settings to be used throughout the project
     '''
     DB_URL: str
+    # Refuse to start when the DB isn't at the Alembic head
+    DB_SCHEMA_CHECK: bool = True
+    # SQLAlchemy pool, see `src.db.main.build_engine`
+    DB_POOL_SIZE: int = 10
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT: float = 10.0
+    DB_POOL_PRE_PING: bool = True
+    DB_POOL_RECYCLE: int = 1800
+    DB_STATEMENT_CACHE_SIZE: int = 100
+    DB_PGBOUNCER_MODE: bool = False
+    # Optional read replica, see `src.db.main.get_read_session`
+    DB_READ_URL: str | None = None
+    DB_READ_FALLBACK_SECONDS: float = 30.0
+    DB_READ_YOUR_WRITES_SECONDS: int = 5
+    # 0.0 = off, 1.0 = log every statement
+    DB_QUERY_LOG_SAMPLE_RATE: float = 0.0
+    # Per-request statement counts, see `src.db.query_stats`
+    DB_QUERY_STATS_HEADERS: bool = True
+    DB_N_PLUS_ONE_THRESHOLD: int = 5
     JWT_SECRET: str
     JWT_ALGORITHM: str
     REDIS_HOST: str = "localhost"
     REDIS_PORT: int = 6379
+    # Shared async pool, requests wait up to REDIS_POOL_TIMEOUT sec for a free connection
+    REDIS_MAX_CONNECTIONS: int = 50
+    REDIS_POOL_TIMEOUT: float = 1.0
+    REDIS_SOCKET_TIMEOUT: float = 1.0
+    REDIS_CONNECT_TIMEOUT: float = 1.0
+    # Per-worker jti blocklist cache, see `src.db.redis.BlocklistCache`
+    BLOCKLIST_CACHE_SIZE: int = 100_000
+    BLOCKLIST_VALID_TTL: float = 300.0
+    # Per-week effective availability matrix, see `src.calendar.service`
+    EFFECTIVE_AVAILABILITY_CACHE_TTL: int = 24 * 3600
+    # bcrypt worker threads, extra calls allowed to wait before answering 503
+    BCRYPT_POOL_SIZE: int = 4
+    BCRYPT_MAX_QUEUED: int = 16
+    # In-app periodic jobs, see `src.scheduler`
+    SCHEDULER_ENABLED: bool = True
+    SCHEDULER_TICK_SECONDS: float = 30.0
+    # held while a job runs and renewed every third of it, a worker that dies frees the job after this long
+    SCHEDULER_LOCK_SECONDS: float = 30.0
+    ABSENCE_PURGE_INTERVAL: int = 3600
+    ABSENCE_PURGE_CHUNK_SIZE: int = 1000
+    CACHE_WARMUP_INTERVAL: int = 900
+    # Redis response cache for decorated GET routes, see `src.response_cache`
+    RESPONSE_CACHE_ENABLED: bool = True
+    RESPONSE_CACHE_TTL: int = 60
+    RESPONSE_CACHE_LOCK_SECONDS: float = 5.0
 
     model_config = SettingsConfigDict(
         env_file=".env",
@@ -18,4 +63,17 @@ class Settings(BaseSettings):
     )
 
 
-Config = Settings()
\ No newline at end of file
+@lru_cache
+def get_settings() -> Settings:
+    return Settings()
+
+
+class LazySettings:
+    '''
+        Reads the environment on first attribute access instead of at import time
+    '''
+    def __getattr__(self, name: str):
+        return getattr(get_settings(), name)
+
+
+Config = LazySettings()
\ No newline at end of file
@@ -69,3 +69,32 @@ class BoatLineupTypeEnum(str, Enum):
     WOMEN = "women"
     MIXED = "mixed"
 
+
+class WeekdayEnum(str, Enum):
+    """
+    Order matters, a day's position is its bit in `Availability.days_mask` (monday = bit 0)
+    """
+
+    MONDAY = "monday"
+    TUESDAY = "tuesday"
+    WEDNESDAY = "wednesday"
+    THURSDAY = "thursday"
+    FRIDAY = "friday"
+    SATURDAY = "saturday"
+    SUNDAY = "sunday"
+
+
+class ExportFormatEnum(str, Enum):
+    CSV = "csv"
+    NDJSON = "ndjson"
+
+
+class ExportTableEnum(str, Enum):
+    ROSTER = "roster"
+    ENROLLMENT_HISTORY = "enrollment_history"
+    WORKOUT_PERFORMANCE = "workout_performance"
+
+
+class LineupObjectiveEnum(str, Enum):
+    BALANCE = "balance"  # boats as even as possible
+    FASTEST = "fastest"  # fastest rowers in the first boats
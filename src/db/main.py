@@ -1,34 +1,275 @@
-from sqlmodel import create_engine, text, SQLModel
-from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlmodel import text, Session
+from sqlalchemy import event
+from fastapi import Request
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, async_sessionmaker, create_async_engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+from sqlalchemy.exc import DBAPIError, TimeoutError as PoolTimeoutError
 from src.config import Config
+from .query_stats import instrument_engine
+from src.metrics import db_pool_checkout_seconds
 from sqlmodel.ext.asyncio.session import AsyncSession
-from sqlalchemy.orm import sessionmaker
+from uuid import uuid4
+import logging
+import random
+import time
 
+query_logger = logging.getLogger("src.db.queries")
 
-async_engine = AsyncEngine(
-    create_engine(
-        url=Config.DB_URL,
-        echo=True
-))
 
-async def init_db():
+class TimedQueuePool(AsyncAdaptedQueuePool):
     '''
-        initializes the database if table DNE
-        TODO: figure out what metadata is for {conn.run_sync(SQLModel.metadata.create_all)}
+        Records how long each checkout takes (waiting for a free connection or opening one, then the pre-ping)
+        as `db_pool_checkout_seconds{engine=<pool logging name>}`, failed checkouts go to `checkout_failed`
+        pool events only fire once a connection is handed out, so it is timed here
     '''
-    async with async_engine.begin() as conn:
-        from .models import Product
+    def connect(self):
+        try:
+            with db_pool_checkout_seconds.time((self.logging_name,)):
+                return super().connect()
+        except PoolTimeoutError:
+            # pool exhausted, not down
+            raise
+        except Exception as e:
+            checkout_failed(self.logging_name, e)
+            raise
 
-        await conn.run_sync(SQLModel.metadata.create_all)
+
+def build_engine(url: str, name: str) -> AsyncEngine:
+    '''
+        Pool/driver options come from `Settings`
+        - PgBouncer (transaction pooling) can't keep prepared statements across transactions,
+            so asyncpg's statement caches are turned off and statements get unique names
+        - SQL echo is replaced by sampled query logging (DB_QUERY_LOG_SAMPLE_RATE)
+        - `name` labels the engine's pool metrics ("primary", "replica")
+    '''
+    connect_args = {}
+
+    if make_url(url).get_backend_name() == "postgresql":
+        if Config.DB_PGBOUNCER_MODE:
+            connect_args = {
+                "statement_cache_size": 0,
+                "prepared_statement_cache_size": 0,
+                "prepared_statement_name_func": lambda: f"__asyncpg_{uuid4()}__",
+            }
+        else:
+            connect_args = {
+                "statement_cache_size": Config.DB_STATEMENT_CACHE_SIZE,
+                "prepared_statement_cache_size": Config.DB_STATEMENT_CACHE_SIZE,
+            }
+
+    engine = create_async_engine(
+        url,
+        pool_size=Config.DB_POOL_SIZE,
+        max_overflow=Config.DB_MAX_OVERFLOW,
+        pool_timeout=Config.DB_POOL_TIMEOUT,
+        pool_pre_ping=Config.DB_POOL_PRE_PING,
+        pool_recycle=Config.DB_POOL_RECYCLE,
+        poolclass=TimedQueuePool,
+        pool_logging_name=name,
+        connect_args=connect_args,
+    )
+
+    if Config.DB_QUERY_LOG_SAMPLE_RATE > 0:
+        event.listen(engine.sync_engine, "before_cursor_execute", log_sampled_query)
+
+    instrument_engine(engine)
+
+    return engine
 
 
-# dependency injected to route handler
-async def get_session() -> AsyncSession:
-    Session = sessionmaker(
+def log_sampled_query(conn, cursor, statement, parameters, context, executemany) -> None:
+    if random.random() < Config.DB_QUERY_LOG_SAMPLE_RATE:
+        query_logger.info("%s | %r", statement, parameters)
+
+
+'''
+    Engines and session factories are created on first use (or by the app's life_span),
+    so importing `src` never touches the database
+    Optional read replica (DB_READ_URL), used by GET handlers through `get_read_session`
+    - falls back to the primary when no replica is configured or it recently failed to connect,
+        the request that finds it down is served by the primary too (`connected_replica_session`)
+    - read-your-writes: a request that commits sets a short-lived cookie, while it is present
+        that client's reads go to the primary. `X-Read-Consistency: primary` forces it per request
+'''
+READ_PRIMARY_COOKIE = "read_primary_until"
+READ_CONSISTENCY_HEADER = "x-read-consistency"
+
+async_engine: AsyncEngine | None = None
+async_session_maker: async_sessionmaker | None = None
+read_async_engine: AsyncEngine | None = None
+read_session_maker: async_sessionmaker | None = None
+
+# monotonic time until which the replica is skipped
+replica_down_until = 0.0
+
+
+def init_engines() -> None:
+    global async_engine, async_session_maker, read_async_engine, read_session_maker
+
+    if async_engine is not None:
+        return
+
+    async_engine = build_engine(Config.DB_URL, "primary")
+    # Built once, every request's session comes from here
+    async_session_maker = async_sessionmaker(
         bind=async_engine,
         class_=AsyncSession,
         expire_on_commit=False
     )
 
-    async with Session() as session:
+    if Config.DB_READ_URL:
+        read_async_engine = build_engine(Config.DB_READ_URL, "replica")
+        read_session_maker = async_sessionmaker(
+            bind=read_async_engine,
+            class_=AsyncSession,
+            expire_on_commit=False
+        )
+
+
+def get_engine() -> AsyncEngine:
+    init_engines()
+    return async_engine
+
+
+def get_session_maker() -> async_sessionmaker:
+    init_engines()
+    return async_session_maker
+
+
+def get_read_session_maker() -> async_sessionmaker:
+    '''
+        For long reads outside a request's session (exports), the replica when it is up
+    '''
+    init_engines()
+
+    if read_session_maker is None or time.monotonic() < replica_down_until:
+        return async_session_maker
+
+    return read_session_maker
+
+
+def checkout_failed(engine_name: str, error: Exception) -> None:
+    '''
+        A replica that can't be connected to sends reads to the primary for DB_READ_FALLBACK_SECONDS
+    '''
+    global replica_down_until
+
+    if engine_name == "replica":
+        logging.warning("Read replica unavailable, reading from the primary: %s", error)
+        replica_down_until = time.monotonic() + Config.DB_READ_FALLBACK_SECONDS
+
+
+@event.listens_for(Session, "after_commit")
+def mark_request_committed(session) -> None:
+    state = session.info.get("request_state")
+    if state is not None:
+        state.db_committed = True
+
+
+def reads_from_primary(request: Request) -> bool:
+    init_engines()
+
+    if read_session_maker is None or time.monotonic() < replica_down_until:
+        return True
+
+    if request.headers.get(READ_CONSISTENCY_HEADER) == "primary":
+        return True
+
+    try:
+        return float(request.cookies.get(READ_PRIMARY_COOKIE, 0)) > time.time()
+    except ValueError:
+        return False
+
+
+async def read_your_writes_middleware(request: Request, call_next):
+    response = await call_next(request)
+
+    if read_session_maker is not None and getattr(request.state, "db_committed", False):
+        response.set_cookie(
+            READ_PRIMARY_COOKIE,
+            str(time.time() + Config.DB_READ_YOUR_WRITES_SECONDS),
+            max_age=Config.DB_READ_YOUR_WRITES_SECONDS,
+            httponly=True,
+        )
+
+    return response
+
+
+async def check_schema_version() -> None:
+    '''
+        Replaces `create_all` on startup, Alembic owns the schema
+        Only compares the DB's `alembic_version` with the migration head, raises if they differ
+    '''
+    from pathlib import Path
+    from alembic.config import Config as AlembicConfig
+    from alembic.script import ScriptDirectory
+
+    root = Path(__file__).resolve().parents[2]
+    alembic_config = AlembicConfig(str(root / "alembic.ini"))
+    alembic_config.set_main_option("script_location", str(root / "migrations"))
+    heads = set(ScriptDirectory.from_config(alembic_config).get_heads())
+
+    async with get_engine().connect() as conn:
+        result = await conn.execute(text("SELECT version_num FROM alembic_version"))
+        current = {row[0] for row in result}
+
+    if current != heads:
+        raise RuntimeError(
+            f"Database schema is at {sorted(current)} but migrations head is {sorted(heads)}, run `alembic upgrade head`"
+        )
+
+
+async def close_db():
+    global async_engine, async_session_maker, read_async_engine, read_session_maker
+
+    if async_engine is not None:
+        await async_engine.dispose()
+
+    if read_async_engine is not None:
+        await read_async_engine.dispose()
+
+    async_engine = async_session_maker = read_async_engine = read_session_maker = None
+
+
+# dependency injected to route handler, connects on its first statement
+async def get_session(request: Request) -> AsyncSession:
+    async with get_session_maker()() as session:
+        session.sync_session.info["request_state"] = request.state
+        yield session
+
+
+async def connected_replica_session() -> AsyncSession | None:
+    '''
+        A replica session that already holds its connection, None when it couldn't get one
+        (a replica that refused the connection is marked down by the pool's `checkout_failed`)
+    '''
+    session = read_session_maker()
+
+    try:
+        await session.connection()
+    except (OSError, DBAPIError, PoolTimeoutError) as e:
+        logging.warning("Read replica unavailable for this request, reading from the primary: %s", e)
+        await session.close()
+        return None
+
+    return session
+
+
+# dependency injected to read-only (GET) route handlers
+async def get_read_session(request: Request) -> AsyncSession:
+    '''
+        The replica's session connects before the handler runs, so the request that finds it down
+        still reads from the primary (primary sessions stay lazy)
+    '''
+    if not reads_from_primary(request):
+        session = await connected_replica_session()
+
+        if session is not None:
+            async with session:
+                yield session
+            return
+
+    async with get_session_maker()() as session:
+        session.sync_session.info["request_state"] = request.state
         yield session
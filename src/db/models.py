@@ -2,7 +2,8 @@ from sqlmodel import SQLModel, Field, Column
 from datetime import date, datetime, time, timedelta
 from uuid import UUID, uuid4
 from sqlalchemy import Enum as SAEnum
-from sqlalchemy import Interval, Time as Time
+from sqlalchemy import Interval, Float, Time as Time
+from sqlalchemy import Index, text
 import sqlalchemy.dialects.postgresql as postgres
 from src.db.db_enum_models import *
 from typing import Optional
@@ -31,6 +32,8 @@ class User(SQLModel, table=True):
     """
 
     __tablename__ = "User"
+    # keyset pagination of the roster, see `UserService.get_users_page`
+    __table_args__ = (Index("ix_User_join_date_uid", "join_date", "uid"),)
 
     uid: UUID = Field(
         sa_column=Column(postgres.UUID, nullable=False, primary_key=True, default=uuid4)
@@ -58,8 +61,9 @@ class User(SQLModel, table=True):
     )
     birthdate: date
     is_verified: bool = Field(default=False)
+    # NOT NULL, `/auth/all_users` pages on (join_date, uid)
     join_date: date = Field(
-        sa_column=Column(postgres.DATE, default=date.today, index=False)
+        sa_column=Column(postgres.DATE, nullable=False, default=date.today, server_default=text("CURRENT_DATE"), index=False)
     )
 
     def __str__(self):
@@ -106,6 +110,8 @@ class Rower(SQLModel, table=True):
     - `expected pace contribution` is total_pace_contribution / times_rowed, giving us the avg 500m pace of the user
     NOTE: this is flawed as strong rowers may be undervalued and weaker rowers being overvalued, but this is a simple/naive solution for now to keep it simple
     NOTE: Maybe use avg_wattage in the total_pace_contribution score later down the line and cumulatively add the scores factoring in the wattage to not have to keep track of change
+    - `pace_rating` (seconds per 500m) is an exponentially weighted average of results that favours recent form,
+        `pace_variance` how much those results spread, both kept up to date by `src.practice.ratings`
     """
 
     __tablename__ = "Rower"
@@ -116,6 +122,11 @@ class Rower(SQLModel, table=True):
     total_pace_contribution: int = Field(default=0, nullable=False, ge=0)
     avg_wattage: int = Field(default=0, ge=0)
 
+    pace_rating: Optional[float] = Field(default=None, nullable=True, index=True)
+    pace_variance: float = Field(
+        sa_column=Column(Float, nullable=False, default=0.0, server_default="0")
+    )
+
 
 class RolePermissions(SQLModel, table=True):
     """
@@ -231,6 +242,7 @@ class MemberExamPerformance(SQLModel, table=True):
     """
     NOTE: completion_time is the only non-optional due to milerun only measuring time
     NOTE: peak_wattage is for the watt ladder, where the rower reached that level b4 failing
+    - `distance` (meters) is the result of fixed-time tests (`WorkoutMeasurementTypeEnum.DISTANCE`)
     """
 
     __tablename__ = "MemberExamPerformance"
@@ -247,6 +259,7 @@ class MemberExamPerformance(SQLModel, table=True):
     avg_rate: Optional[int] = Field(default=None, nullable=True)
     avg_wattage: Optional[int] = Field(default=None, nullable=True)
     peak_wattage: Optional[int] = Field(default=None, nullable=True)
+    distance: Optional[int] = Field(default=None, nullable=True)
 
 
 class RowerPerformanceRecord(SQLModel, table=True):
@@ -579,19 +592,19 @@ class Availability(SQLModel, table=True):
     - An evolving availability sheet for the week
     - Depends on `ScheduledAbsence` for atypical absences
     - should be deleted at the end of the semester and repopulated with active members (annoying)
+    - `days_mask` is a 7 bit mask, bit 0 = monday ... bit 6 = sunday (see `WeekdayEnum`)
+    - multi-day questions become `days_mask IN (every mask containing those days)`, one index scan
     """
 
     __tablename__ = "Availability"
 
     member_id: UUID = Field(foreign_key="User.uid", primary_key=True)
 
-    present_monday: bool = Field(default=False, index=True)
-    present_tuesday: bool = Field(default=False, index=True)
-    present_wednesday: bool = Field(default=False, index=True)
-    present_thursday: bool = Field(default=False, index=True)
-    present_friday: bool = Field(default=False, index=True)
-    present_saturday: bool = Field(default=False, index=True)
-    present_sunday: bool = Field(default=False, index=True)
+    days_mask: int = Field(
+        sa_column=Column(postgres.SMALLINT, nullable=False, default=0, server_default="0", index=True),
+        ge=0,
+        le=127,
+    )
 
 
 class ScheduledAbsence(SQLModel, table=True):
@@ -611,6 +624,23 @@ class ScheduledAbsence(SQLModel, table=True):
     absence_date: date = Field(primary_key=True)
 
 
+class ScheduledAbsenceArchive(SQLModel, table=True):
+    """
+    - Past `ScheduledAbsence` rows, moved here by the semester rollover
+    - `semester_id` is the semester the absence fell in, NULL if it was outside every semester
+    """
+
+    __tablename__ = "ScheduledAbsenceArchive"
+
+    member_id: UUID = Field(foreign_key="User.uid", primary_key=True)
+    absence_date: date = Field(primary_key=True)
+
+    semester_id: Optional[int] = Field(
+        default=None, foreign_key="Semester.semester_id", nullable=True, index=True
+    )
+    archived_on: date = Field(sa_column=Column(postgres.DATE, nullable=False, default=date.today))
+
+
 class VolunteeringDate(SQLModel, table=True):
     """
     Stores significant dates for when club has to do university-mandated volunteering
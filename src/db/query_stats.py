@@ -0,0 +1,127 @@
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+from fastapi import Request
+from src.config import Config
+import logging
+import time
+
+'''
+    Per-request SQL statement counting
+    - engines are hooked once in `instrument_engine`, the numbers land in whatever `QueryStats`
+        is active in the current context (one per request, see `query_stats_middleware`)
+    - statements are compared by their SQL text (parameters are bound separately),
+        repeating the same shape DB_N_PLUS_ONE_THRESHOLD times in a request logs a warning
+    - streamed responses get no X-DB-* headers (they'd be sent before the body's queries run),
+        their stats are logged when the stream ends
+'''
+query_stats_logger = logging.getLogger("src.db.query_stats")
+
+
+class QueryStats:
+    def __init__(self) -> None:
+        self.count = 0
+        self.total_time = 0.0
+        self.shapes: Counter[str] = Counter()
+
+    def record(self, statement: str, elapsed: float) -> None:
+        self.count += 1
+        self.total_time += elapsed
+        self.shapes[" ".join(statement.split())] += 1
+
+    def repeated_shapes(self, threshold: int) -> list[tuple[str, int]]:
+        return [(shape, n) for shape, n in self.shapes.items() if n >= threshold]
+
+
+current_query_stats: ContextVar[QueryStats | None] = ContextVar("current_query_stats", default=None)
+
+
+def before_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    conn.info.setdefault("query_start_time", []).append(time.perf_counter())
+
+def after_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    elapsed = time.perf_counter() - conn.info["query_start_time"].pop()
+
+    stats = current_query_stats.get()
+    if stats is not None:
+        stats.record(statement, elapsed)
+
+
+def instrument_engine(engine: AsyncEngine) -> None:
+    event.listen(engine.sync_engine, "before_cursor_execute", before_cursor_execute)
+    event.listen(engine.sync_engine, "after_cursor_execute", after_cursor_execute)
+
+
+def report_query_stats(stats: QueryStats, request: Request) -> None:
+    for shape, n in stats.repeated_shapes(Config.DB_N_PLUS_ONE_THRESHOLD):
+        query_stats_logger.warning(
+            "Possible N+1 on %s %s: statement ran %d times: %s",
+            request.method, request.url.path, n, shape,
+        )
+
+async def report_after_stream(body_iterator, stats: QueryStats, request: Request):
+    '''
+        Passes the body through, the stats are only complete once it has been sent
+    '''
+    try:
+        async for chunk in body_iterator:
+            yield chunk
+    finally:
+        query_stats_logger.info(
+            "%s %s streamed: %d statements in %.2fms",
+            request.method, request.url.path, stats.count, stats.total_time * 1000,
+        )
+        report_query_stats(stats, request)
+
+
+async def query_stats_middleware(request: Request, call_next):
+    stats = QueryStats()
+    token = current_query_stats.set(stats)
+
+    try:
+        response = await call_next(request)
+    finally:
+        current_query_stats.reset(token)
+
+    # no length: a StreamingResponse (e.g. exports), its queries run while the body is sent,
+    # after the headers are gone, so there are no headers and the stats are logged at the end
+    if "content-length" not in response.headers and response.status_code not in (204, 304):
+        response.body_iterator = report_after_stream(response.body_iterator, stats, request)
+        return response
+
+    if Config.DB_QUERY_STATS_HEADERS:
+        response.headers["X-DB-Query-Count"] = str(stats.count)
+        response.headers["X-DB-Time-ms"] = f"{stats.total_time * 1000:.2f}"
+
+    report_query_stats(stats, request)
+    return response
+
+
+def assert_query_budget(response, max_queries: int) -> None:
+    '''
+        For endpoint tests, reads the count the middleware put on the response
+        e.g. `assert_query_budget(client.post("/auth/signup", ...), 3)`
+    '''
+    count = int(response.headers["X-DB-Query-Count"])
+    assert count <= max_queries, f"Query budget exceeded: {count} > {max_queries}"
+
+
+@contextmanager
+def query_budget(max_queries: int):
+    '''
+        For service-level tests, fails when the wrapped block issues more than `max_queries` statements
+        e.g. `with query_budget(1): await user_service.get_user_by_uid(uid, session)`
+    '''
+    stats = QueryStats()
+    token = current_query_stats.set(stats)
+
+    try:
+        yield stats
+    finally:
+        current_query_stats.reset(token)
+
+    assert stats.count <= max_queries, (
+        f"Query budget exceeded: {stats.count} > {max_queries}\n" + "\n".join(stats.shapes)
+    )
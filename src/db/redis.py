@@ -1,24 +1,348 @@
-import redis
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable
+
+import redis.asyncio as redis
 from src.config import Config
+from src.metrics import GaugeFunc, redis_blocklist_seconds
 
 JTI_EXPIRY = 3600
 
+# Every worker subscribes here, messages are `<kind>:<payload>` e.g. `jti:<token jti>`
+INVALIDATION_CHANNEL = "auth:invalidate"
+# seconds of silence after which the listener PINGs its connection before reading
+INVALIDATION_HEALTH_CHECK_INTERVAL = 30
+
+'''
+    A single bounded pool is shared by the whole worker
+    created/closed by the app's life_span, see `init_redis` and `close_redis`
+'''
+redis_pool: redis.BlockingConnectionPool | None = None
+redis_token_blocklist: redis.Redis | None = None
+invalidation_listener: asyncio.Task | None = None
+
+
+class TTLCache:
+    '''
+        Bounded key -> (value, expiry) map, oldest entries are evicted first once `maxsize` is reached
+    '''
+
+    def __init__(self, maxsize: int, ttl: float) -> None:
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: OrderedDict[str, tuple[Any, float]] = OrderedDict()
+
+    def __contains__(self, key: str) -> bool:
+        return self.get(key) is not None
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def get(self, key: str, default: Any = None) -> Any:
+        entry = self._data.get(key)
+        if entry is None:
+            return default
+
+        value, expires_at = entry
+        if expires_at < time.monotonic():
+            del self._data[key]
+            return default
+
+        return value
+
+    def set(self, key: str, value: Any = True, ttl: float | None = None) -> None:
+        self._data[key] = (value, time.monotonic() + (self.ttl if ttl is None else ttl))
+        self._data.move_to_end(key)
+
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def discard(self, key: str) -> None:
+        self._data.pop(key, None)
+
+    def clear(self) -> None:
+        self._data.clear()
+
+
+class BlocklistCache:
+    '''
+        Per-worker cache in front of the redis blocklist
+        - `revoked` holds jtis known to be blocked, they stay blocked until the redis key expires
+        - `valid` holds jtis redis said were not blocked, kept briefly since a logout on another
+            worker is pushed through pub/sub and moves the jti into `revoked`
+        NOTE: `valid` is dropped whenever the pub/sub listener loses its connection
+    '''
+
+    def __init__(self, maxsize: int = 0, valid_ttl: float = 0) -> None:
+        self.revoked = TTLCache(maxsize, JTI_EXPIRY)
+        self.valid = TTLCache(maxsize, valid_ttl)
+        self.hits = 0
+        self.misses = 0
+
+    def configure(self, maxsize: int, valid_ttl: float) -> None:
+        self.revoked.maxsize = self.valid.maxsize = maxsize
+        self.valid.ttl = valid_ttl
+
+    def lookup(self, jti: str) -> bool | None:
+        if jti in self.revoked:
+            self.hits += 1
+            return True
+
+        if jti in self.valid:
+            self.hits += 1
+            return False
+
+        self.misses += 1
+        return None
+
+    def mark_revoked(self, jti: str) -> None:
+        self.valid.discard(jti)
+        self.revoked.set(jti)
+
+    def mark_valid(self, jti: str) -> None:
+        # a broadcast may land between the redis read and this call
+        if jti not in self.revoked:
+            self.valid.set(jti)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "revoked_cached": len(self.revoked),
+            "valid_cached": len(self.valid),
+        }
+
+
+# Sized from `Settings` by `init_redis`, caches nothing until then
+blocklist_cache = BlocklistCache()
+
+GaugeFunc("blocklist_cache_hits", "jti blocklist lookups answered by the local cache", lambda: blocklist_cache.hits)
+GaugeFunc("blocklist_cache_misses", "jti blocklist lookups that went to redis", lambda: blocklist_cache.misses)
+
+# `user:<uid>` / `role:<role>` -> current token generation, see "Token Generations" below
+token_generation_cache = TTLCache(maxsize=0, ttl=0)
+
+# kind -> handler(payload), other modules register here to react to broadcasts
+invalidation_handlers: dict[str, Callable[[str], None]] = {
+    "jti": blocklist_cache.mark_revoked,
+    "token_gen": token_generation_cache.discard,
+}
+
+# awaited after every (re)subscribe, for caches that have to be reloaded rather than dropped
+resync_handlers: list[Callable[[], Awaitable[None]]] = []
+
+
+async def init_redis() -> None:
+    global redis_pool, redis_token_blocklist
+
+    if redis_token_blocklist is not None:
+        return
+
+    blocklist_cache.configure(Config.BLOCKLIST_CACHE_SIZE, Config.BLOCKLIST_VALID_TTL)
+    token_generation_cache.maxsize = Config.BLOCKLIST_CACHE_SIZE
+    token_generation_cache.ttl = Config.BLOCKLIST_VALID_TTL
+
+    redis_pool = redis.BlockingConnectionPool(
+        host=Config.REDIS_HOST,
+        port=Config.REDIS_PORT,
+        db=0,
+        max_connections=Config.REDIS_MAX_CONNECTIONS,
+        timeout=Config.REDIS_POOL_TIMEOUT,
+        socket_timeout=Config.REDIS_SOCKET_TIMEOUT,
+        socket_connect_timeout=Config.REDIS_CONNECT_TIMEOUT,
+    )
+    redis_token_blocklist = redis.Redis(connection_pool=redis_pool)
+
+
+async def close_redis() -> None:
+    global redis_pool, redis_token_blocklist
+
+    await stop_invalidation_listener()
+
+    if redis_token_blocklist is not None:
+        await redis_token_blocklist.aclose()
+    if redis_pool is not None:
+        await redis_pool.aclose()
 
-redis_token_blocklist = redis.StrictRedis(
-    host=Config.REDIS_HOST,
-    port=Config.REDIS_PORT,
-    db=0
-)
+    redis_pool = None
+    redis_token_blocklist = None
 
+
+async def get_redis() -> redis.Redis:
+    '''
+        Falls back to creating the pool when used outside of the app (scripts, alembic, etc.)
+    '''
+    if redis_token_blocklist is None:
+        await init_redis()
+
+    return redis_token_blocklist
+
+
+# # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # #
+# Cross-worker invalidation (pub/sub)
+# # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # #
+async def publish_invalidation(kind: str, payload: str) -> None:
+    client = await get_redis()
+    await client.publish(INVALIDATION_CHANNEL, f"{kind}:{payload}")
+
+
+def handle_invalidation(message: str) -> None:
+    kind, _, payload = message.partition(":")
+    handler = invalidation_handlers.get(kind)
+
+    if handler is None:
+        logging.warning("Unknown invalidation message kind: %s", kind)
+        return
+
+    handler(payload)
+
+
+def invalidation_client() -> redis.Redis:
+    '''
+        The listener's own connection, outside the shared pool: the pool's socket timeout would end
+        `listen()` on every quiet second, a dead connection is caught by the health checks instead
+    '''
+    return redis.Redis(
+        host=Config.REDIS_HOST,
+        port=Config.REDIS_PORT,
+        db=0,
+        socket_timeout=None,
+        socket_connect_timeout=Config.REDIS_CONNECT_TIMEOUT,
+        socket_keepalive=True,
+        health_check_interval=INVALIDATION_HEALTH_CHECK_INTERVAL,
+    )
+
+
+async def listen_for_invalidations() -> None:
+    '''
+        Runs for the lifetime of the worker, reconnects on failure
+        Anything cached on a "not changed" assumption is dropped after a disconnect, and resynced on resubscribe
+    '''
+    while True:
+        client = invalidation_client()
+        try:
+            async with client.pubsub(ignore_subscribe_messages=True) as pubsub:
+                await pubsub.subscribe(INVALIDATION_CHANNEL)
+                for resync in resync_handlers:
+                    await resync()
+
+                async for message in pubsub.listen():
+                    data = message["data"]
+                    handle_invalidation(data.decode() if isinstance(data, bytes) else data)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logging.exception(e)
+        finally:
+            await client.aclose()
+
+        blocklist_cache.valid.clear()
+        token_generation_cache.clear()
+        await asyncio.sleep(1)
+
+
+async def start_invalidation_listener() -> None:
+    global invalidation_listener
+
+    if invalidation_listener is None:
+        invalidation_listener = asyncio.create_task(listen_for_invalidations())
+
+
+async def stop_invalidation_listener() -> None:
+    global invalidation_listener
+
+    if invalidation_listener is not None:
+        invalidation_listener.cancel()
+        try:
+            await invalidation_listener
+        except asyncio.CancelledError:
+            pass
+
+    invalidation_listener = None
+
+
+# # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # #
+# JTI Blocklist
+# # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # #
 async def add_jti_to_blocklist(jti:str) -> None:
-    redis_token_blocklist.set(
+    client = await get_redis()
+    await client.set(
         name=jti,
         value="",
         ex=JTI_EXPIRY
     )
 
+    blocklist_cache.mark_revoked(jti)
+    await publish_invalidation("jti", jti)
+
 async def token_in_blocklist(jti:str) -> bool:
-    jti_token = redis_token_blocklist.get(jti)
+    cached = blocklist_cache.lookup(jti)
+    if cached is not None:
+        return cached
+
+    client = await get_redis()
+    with redis_blocklist_seconds.time():
+        jti_token = await client.get(jti)
+
+    if jti_token is not None:
+        blocklist_cache.mark_revoked(jti)
+        return True
+
+    blocklist_cache.mark_valid(jti)
+    return False
+
+
+# # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # #
+# Token Generations
+# - tokens carry the user's generation at the time they were issued
+# - bumping it revokes every outstanding token of that user in O(1)
+# - role changes don't need one, permissions are looked up live (`src.auth.permissions`)
+# # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # #
+def token_generation_key(scope: str, value) -> str:
+    # enums (e.g. MemberRoleEnum) are keyed by their value, like the claims they end up in
+    return f"{scope}:{getattr(value, 'value', value)}"
+
+async def get_token_generations(*keys: str) -> list[int]:
+    generations = [token_generation_cache.get(key) for key in keys]
+    missing = [key for key, gen in zip(keys, generations) if gen is None]
+
+    if missing:
+        client = await get_redis()
+        fetched = await client.mget([f"token_gen:{key}" for key in missing])
+
+        for key, gen in zip(missing, fetched):
+            token_generation_cache.set(key, int(gen) if gen is not None else 0)
+
+        generations = [token_generation_cache.get(key, 0) for key in keys]
+
+    return generations
+
+async def bump_token_generation(key: str) -> int:
+    client = await get_redis()
+    gen = await client.incr(f"token_gen:{key}")
+
+    token_generation_cache.discard(key)
+    await publish_invalidation("token_gen", key)
+    return gen
+
+async def bump_user_token_generation(uid: str) -> int:
+    return await bump_token_generation(token_generation_key("user", str(uid)))
+
+async def current_token_generations(uid: str) -> dict:
+    '''
+        Claims to embed into a new token
+    '''
+    user_gen, = await get_token_generations(token_generation_key("user", uid))
+    return {"gen": user_gen}
+
+async def token_generation_valid(user_data: dict) -> bool:
+    '''
+        Tokens issued before generations existed count as generation 0
+    '''
+    current = await current_token_generations(user_data["uid"])
 
-    return jti_token is not None
-    
\ No newline at end of file
+    return all(user_data.get(claim, 0) == gen for claim, gen in current.items())
@@ -0,0 +1,127 @@
+from src.db.redis import get_redis
+from src.metrics import response_cache_invalidated_keys_total
+from redis.exceptions import RedisError, WatchError
+import asyncio
+import logging
+import time
+
+'''
+    Redis side of the response cache (`src.response_cache`), apart from the web layer so services can invalidate
+    - an entry is a hash `response-cache:<route>:<digest>` {body, etag, media_type} expiring after the route's TTL
+    - each entry is a member of its tags' sets `response-cache-tag:<tag>`, `invalidate_tags` deletes the entries
+        and bumps `response-cache-generation:<tag>`, an entry whose tags moved on while it was being computed
+        isn't stored (WATCH on the generations), so a write can't be undone by a slow reader
+    - `response-cache-lock:<key>` is the single-flight fill lock, other workers wait for the entry instead of computing
+'''
+RESPONSE_CACHE_KEY = "response-cache:"
+RESPONSE_CACHE_TAG_KEY = "response-cache-tag:"
+RESPONSE_CACHE_GENERATION_KEY = "response-cache-generation:"
+RESPONSE_CACHE_LOCK_KEY = "response-cache-lock:"
+
+# only has to outlive the slowest fill
+RESPONSE_CACHE_GENERATION_TTL = 24 * 3600
+FILL_POLL_SECONDS = 0.05
+
+
+async def get_cached(key: str) -> tuple[bytes, str, str] | None:
+    '''
+        (body, etag, media_type)
+    '''
+    client = await get_redis()
+    body, etag, media_type = await client.hmget(key, "body", "etag", "media_type")
+
+    if body is None:
+        return None
+    return body, etag.decode(), media_type.decode()
+
+
+async def tag_generations(tags: list[str]) -> list:
+    if not tags:
+        return []
+
+    client = await get_redis()
+    return await client.mget([f"{RESPONSE_CACHE_GENERATION_KEY}{tag}" for tag in tags])
+
+
+async def store_cached(
+    key: str, body: bytes, etag: str, media_type: str, tags: list[str], ttl: int, generations: list
+) -> bool:
+    '''
+        False when one of the tags was invalidated after `generations` was read
+    '''
+    client = await get_redis()
+    generation_keys = [f"{RESPONSE_CACHE_GENERATION_KEY}{tag}" for tag in tags]
+
+    async with client.pipeline(transaction=True) as pipe:
+        try:
+            if generation_keys:
+                await pipe.watch(*generation_keys)
+                if await pipe.mget(generation_keys) != generations:
+                    return False
+
+            pipe.multi()
+            pipe.hset(key, mapping={"body": body, "etag": etag, "media_type": media_type})
+            pipe.expire(key, ttl)
+            for tag in tags:
+                tag_key = f"{RESPONSE_CACHE_TAG_KEY}{tag}"
+                pipe.sadd(tag_key, key)
+                # the set lives as long as its longest lived entry
+                pipe.expire(tag_key, ttl, nx=True)
+                pipe.expire(tag_key, ttl, gt=True)
+            await pipe.execute()
+        except WatchError:
+            return False
+
+    return True
+
+
+async def invalidate_tags(*tags: str) -> None:
+    '''
+        Call after committing a write that changes what the tagged responses show,
+        best effort, a redis failure leaves the entries to expire
+    '''
+    try:
+        client = await get_redis()
+
+        async with client.pipeline(transaction=True) as pipe:
+            for tag in tags:
+                pipe.smembers(f"{RESPONSE_CACHE_TAG_KEY}{tag}")
+                pipe.delete(f"{RESPONSE_CACHE_TAG_KEY}{tag}")
+                pipe.incr(f"{RESPONSE_CACHE_GENERATION_KEY}{tag}")
+                pipe.expire(f"{RESPONSE_CACHE_GENERATION_KEY}{tag}", RESPONSE_CACHE_GENERATION_TTL)
+            results = await pipe.execute()
+
+        keys = set().union(*results[0::4])
+        if keys:
+            await client.delete(*keys)
+
+        response_cache_invalidated_keys_total.inc(amount=len(keys))
+    except (RedisError, OSError) as e:
+        logging.warning("Response cache tags %s weren't invalidated: %s", tags, e)
+
+
+async def acquire_fill_lock(key: str, seconds: float) -> bool:
+    client = await get_redis()
+    return bool(await client.set(f"{RESPONSE_CACHE_LOCK_KEY}{key}", 1, nx=True, px=int(seconds * 1000)))
+
+async def release_fill_lock(key: str) -> None:
+    client = await get_redis()
+    await client.delete(f"{RESPONSE_CACHE_LOCK_KEY}{key}")
+
+async def wait_for_fill(key: str, seconds: float) -> tuple[bytes, str, str] | None:
+    '''
+        The entry another worker is computing, None when its lock goes away without one or after `seconds`
+    '''
+    client = await get_redis()
+    deadline = time.monotonic() + seconds
+
+    while time.monotonic() < deadline:
+        await asyncio.sleep(FILL_POLL_SECONDS)
+
+        cached = await get_cached(key)
+        if cached is not None:
+            return cached
+        if not await client.exists(f"{RESPONSE_CACHE_LOCK_KEY}{key}"):
+            return None
+
+    return None
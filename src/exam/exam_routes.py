@@ -0,0 +1,64 @@
+from typing import Annotated
+from fastapi import APIRouter, Depends, Query
+from fastapi import status
+from fastapi.exceptions import HTTPException
+from .schemas import ExamResultsModel, ExamResultsReportModel, LeaderboardModel
+from sqlmodel.ext.asyncio.session import AsyncSession
+from src.db.main import get_session
+from src.auth.dependencies import access_token_bearer
+from src.auth.dependencies_data import member_rolechecker, coach_rolechecker
+from src.db.db_enum_models import BoatLineupTypeEnum
+from .service import ExamService
+from .leaderboard import read_leaderboard, exam_board_key, semester_board_key
+from uuid import UUID
+
+'''
+    Erg tests: results and live leaderboards
+    calls service() methods to perform business logic
+'''
+
+exam_router = APIRouter(dependencies=[access_token_bearer])
+exam_service = ExamService()
+SessionDependency = Annotated[AsyncSession, Depends(get_session)]
+
+
+@exam_router.post("/{exam_id}/results", response_model=ExamResultsReportModel, dependencies=[coach_rolechecker])
+async def record_exam_results(exam_id: int, exam_results: ExamResultsModel, session: SessionDependency):
+    try:
+        report = await exam_service.record_results(exam_id, exam_results.results, session)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+    if report is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Exam not found")
+
+    return report
+
+@exam_router.get("/{exam_id}/leaderboard", response_model=LeaderboardModel, dependencies=[member_rolechecker])
+async def get_exam_leaderboard(
+    exam_id: int,
+    lineup_type: BoatLineupTypeEnum = BoatLineupTypeEnum.MIXED,
+    limit: Annotated[int, Query(ge=1, le=100)] = 10,
+    member_id: UUID | None = None,
+    neighbours: Annotated[int, Query(ge=0, le=25)] = 2,
+):
+    '''
+        Top `limit` results, and `member_id`'s rank with `neighbours` results either side
+    '''
+    return await read_leaderboard(exam_board_key(exam_id, lineup_type), lineup_type, limit, member_id, neighbours)
+
+@exam_router.get("/semester/{semester_id}/{exam_name}/leaderboard", response_model=LeaderboardModel, dependencies=[member_rolechecker])
+async def get_semester_leaderboard(
+    semester_id: int,
+    exam_name: str,
+    lineup_type: BoatLineupTypeEnum = BoatLineupTypeEnum.MIXED,
+    limit: Annotated[int, Query(ge=1, le=100)] = 10,
+    member_id: UUID | None = None,
+    neighbours: Annotated[int, Query(ge=0, le=25)] = 2,
+):
+    '''
+        Each member's best result at `exam_name` over the semester
+    '''
+    return await read_leaderboard(
+        semester_board_key(semester_id, exam_name, lineup_type), lineup_type, limit, member_id, neighbours
+    )
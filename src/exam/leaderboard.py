@@ -0,0 +1,183 @@
+from src.db.models import Exam, ExamModel, MemberExamPerformance
+from src.db.db_enum_models import BoatLineupTypeEnum, WorkoutMeasurementTypeEnum
+from src.db.redis import get_redis
+from src.lineup.service import LineupService
+from sqlmodel.ext.asyncio.session import AsyncSession
+from sqlmodel import select
+from typing import Any, Iterable
+from uuid import UUID
+from .schemas import LeaderboardEntryModel, LeaderboardModel
+
+'''
+    Live erg-test standings in redis sorted sets, reads never touch postgres
+    - one board per exam `leaderboard:exam:<exam_id>:<lineup>` and one per semester and exam name
+        `leaderboard:semester:<semester_id>:<exam_name>:<lineup>` holding each member's best result of the season
+    - `<lineup>` is "mixed" for everyone, members also go on the "men" or "women" board
+        (their category as the lineup optimizer sees it)
+    - the score is the result in the exam's unit, negated when higher is better, so rank 0 is always the best
+        and top-N / rank / neighbours are ZRANGE / ZRANK, O(log n + N)
+    - results are added when they are written (the semester board keeps the lower score, ZADD LT),
+        `python -m src.cli rebuild-leaderboards` recomputes the boards from the db after a redis loss or a correction
+'''
+LEADERBOARD_KEY = "leaderboard:"
+LEADERBOARD_REBUILD_KEY = "leaderboard-rebuild:"
+
+HIGHER_IS_BETTER = {WorkoutMeasurementTypeEnum.DISTANCE, WorkoutMeasurementTypeEnum.WATTAGE}
+
+lineup_service = LineupService()
+
+
+def exam_board_key(exam_id: int, lineup_type: BoatLineupTypeEnum = BoatLineupTypeEnum.MIXED) -> str:
+    return f"{LEADERBOARD_KEY}exam:{exam_id}:{lineup_type.value}"
+
+def semester_board_key(semester_id: int, exam_name: str, lineup_type: BoatLineupTypeEnum = BoatLineupTypeEnum.MIXED) -> str:
+    return f"{LEADERBOARD_KEY}semester:{semester_id}:{exam_name}:{lineup_type.value}"
+
+
+def result_value(measure_type: WorkoutMeasurementTypeEnum, result: Any) -> float | None:
+    '''
+        What the exam measures, from a `MemberExamPerformance`-like object (seconds, watts or meters)
+    '''
+    if measure_type == WorkoutMeasurementTypeEnum.TIME:
+        return result.completion_time.total_seconds()
+    if measure_type == WorkoutMeasurementTypeEnum.WATTAGE:
+        return result.peak_wattage if result.peak_wattage is not None else result.avg_wattage
+    return result.distance
+
+def board_score(measure_type: WorkoutMeasurementTypeEnum, value: float) -> float:
+    return -value if measure_type in HIGHER_IS_BETTER else value
+
+def board_lineups(category: BoatLineupTypeEnum | None) -> list[BoatLineupTypeEnum]:
+    if category is None or category == BoatLineupTypeEnum.MIXED:
+        return [BoatLineupTypeEnum.MIXED]
+    return [BoatLineupTypeEnum.MIXED, category]
+
+
+async def get_member_categories(members: Iterable[UUID], session: AsyncSession) -> dict[UUID, BoatLineupTypeEnum]:
+    return await lineup_service.get_categories(set(members), session)
+
+
+async def add_to_leaderboards(
+    exam_id: int,
+    semester_id: int,
+    exam_name: str,
+    measure_type: WorkoutMeasurementTypeEnum,
+    results: list[Any],
+    categories: dict[UUID, BoatLineupTypeEnum],
+) -> None:
+    '''
+        One pipelined round trip for the whole batch
+    '''
+    client = await get_redis()
+
+    async with client.pipeline(transaction=False) as pipe:
+        for result in results:
+            value = result_value(measure_type, result)
+            if value is None:
+                continue
+
+            entry = {str(result.member_id): board_score(measure_type, value)}
+            for lineup_type in board_lineups(categories.get(result.member_id)):
+                pipe.zadd(exam_board_key(exam_id, lineup_type), entry)
+                pipe.zadd(semester_board_key(semester_id, exam_name, lineup_type), entry, lt=True)
+
+        await pipe.execute()
+
+
+def board_entries(rows: list[tuple[bytes, float]], first_rank: int) -> list[LeaderboardEntryModel]:
+    return [
+        LeaderboardEntryModel(rank=first_rank + i, member_id=UUID(member.decode()), value=abs(score))
+        for i, (member, score) in enumerate(rows)
+    ]
+
+async def read_leaderboard(
+    key: str, lineup_type: BoatLineupTypeEnum, limit: int, member_id: UUID | None = None, neighbours: int = 0
+) -> LeaderboardModel:
+    '''
+        Ranks are 1-based, ties are broken by member id
+    '''
+    client = await get_redis()
+
+    async with client.pipeline(transaction=False) as pipe:
+        pipe.zcard(key)
+        pipe.zrange(key, 0, limit - 1, withscores=True)
+        if member_id is not None:
+            pipe.zrank(key, str(member_id))
+        size, top, *rank = await pipe.execute()
+
+    standing = []
+    if rank and rank[0] is not None:
+        start = max(rank[0] - neighbours, 0)
+        rows = await client.zrange(key, start, rank[0] + neighbours, withscores=True)
+        standing = board_entries(rows, start + 1)
+
+    return LeaderboardModel(lineup_type=lineup_type, size=size, top=board_entries(top, 1), standing=standing)
+
+
+async def rebuild_leaderboards(session: AsyncSession, semester_id: int | None = None) -> int:
+    '''
+        Recomputes every board (or one semester's) from `MemberExamPerformance`, each board is written
+        to a scratch key and renamed over the live one so readers never see it half built
+        returns the number of boards written
+    '''
+    statement = (
+        select(
+            Exam.exam_id,
+            Exam.semester_id,
+            Exam.exam_name,
+            ExamModel.measure_type,
+            MemberExamPerformance.member_id,
+            MemberExamPerformance.completion_time,
+            MemberExamPerformance.avg_wattage,
+            MemberExamPerformance.peak_wattage,
+            MemberExamPerformance.distance,
+        )
+        .join(Exam, Exam.exam_id == MemberExamPerformance.exam_id)
+        .join(ExamModel, ExamModel.exam_name == Exam.exam_name)
+    )
+    exams = select(Exam.exam_id)
+
+    if semester_id is not None:
+        statement = statement.where(Exam.semester_id == semester_id)
+        exams = exams.where(Exam.semester_id == semester_id)
+
+    rows = (await session.exec(statement)).all()
+    exam_ids = (await session.exec(exams)).all()
+    categories = await get_member_categories({row.member_id for row in rows}, session)
+
+    boards: dict[str, dict[str, float]] = {}
+    for row in rows:
+        value = result_value(row.measure_type, row)
+        if value is None:
+            continue
+
+        member, score = str(row.member_id), board_score(row.measure_type, value)
+        for lineup_type in board_lineups(categories.get(row.member_id)):
+            boards.setdefault(exam_board_key(row.exam_id, lineup_type), {})[member] = score
+
+            season = boards.setdefault(semester_board_key(row.semester_id, row.exam_name, lineup_type), {})
+            season[member] = min(score, season.get(member, score))
+
+    client = await get_redis()
+
+    # boards nothing is left for
+    if semester_id is None:
+        stale = [key async for key in client.scan_iter(match=f"{LEADERBOARD_KEY}*")]
+    else:
+        stale = [key async for key in client.scan_iter(match=f"{LEADERBOARD_KEY}semester:{semester_id}:*")]
+        for exam_id in exam_ids:
+            stale += [key async for key in client.scan_iter(match=f"{LEADERBOARD_KEY}exam:{exam_id}:*")]
+    stale = [key for key in stale if key.decode() not in boards]
+
+    for key, entries in boards.items():
+        scratch = f"{LEADERBOARD_REBUILD_KEY}{key}"
+        async with client.pipeline(transaction=True) as pipe:
+            pipe.delete(scratch)
+            pipe.zadd(scratch, entries)
+            pipe.rename(scratch, key)
+            await pipe.execute()
+
+    if stale:
+        await client.delete(*stale)
+
+    return len(boards)
@@ -0,0 +1,53 @@
+from pydantic import BaseModel, Field
+from uuid import UUID
+from datetime import timedelta
+from src.db.db_enum_models import BoatLineupTypeEnum
+
+class StrictModel(BaseModel):
+    model_config = {
+        "extra": "forbid"
+    }
+
+
+class ExamResultModel(StrictModel):
+    '''
+        One member's result, `distance` (meters) for fixed-time tests
+    '''
+    member_id: UUID
+    completion_time: timedelta
+    avg_pace: timedelta | None = None
+    avg_rate: int | None = Field(default=None, ge=0)
+    avg_wattage: int | None = Field(default=None, ge=0)
+    peak_wattage: int | None = Field(default=None, ge=0)
+    distance: int | None = Field(default=None, ge=0)
+
+class ExamResultsModel(StrictModel):
+    '''
+        A later result for a member replaces the earlier one
+    '''
+    results: list[ExamResultModel] = Field(min_length=1)
+
+class ExamResultsReportModel(StrictModel):
+    '''
+        `records_set` counts the personal records created or beaten
+    '''
+    exam_id: int
+    results_written: int
+    records_set: int
+
+class LeaderboardEntryModel(StrictModel):
+    '''
+        `value` in the exam's unit: seconds, watts or meters
+    '''
+    rank: int
+    member_id: UUID
+    value: float
+
+class LeaderboardModel(StrictModel):
+    '''
+        `standing` is the member's entry and its neighbours when a member was asked for (empty when unranked)
+    '''
+    lineup_type: BoatLineupTypeEnum
+    size: int
+    top: list[LeaderboardEntryModel]
+    standing: list[LeaderboardEntryModel]
@@ -0,0 +1,123 @@
+from src.db.models import Exam, ExamModel, MemberExamPerformance, RowerPerformanceRecord
+from src.db.db_enum_models import WorkoutMeasurementTypeEnum
+from sqlmodel.ext.asyncio.session import AsyncSession
+from sqlmodel import select, or_
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.exc import IntegrityError
+from redis.exceptions import RedisError
+import logging
+from .schemas import ExamResultModel, ExamResultsReportModel
+from .leaderboard import add_to_leaderboards, get_member_categories, result_value, HIGHER_IS_BETTER
+from datetime import date
+
+'''
+    Handles business logic (db access) for the {/exam} route
+    - results and personal records are written in the same transaction, the records with one conditional upsert
+        (`INSERT ... ON CONFLICT DO UPDATE ... WHERE <new is better>`), never read-compare-write:
+        a concurrent writer blocks on the record's row lock and compares against the committed record
+    - `RowerPerformanceRecord.value_time` is the completion time, `value_int` the watts/meters for WATTAGE/DISTANCE exams,
+        the one the exam measures decides what is better (lower time, higher watts/meters)
+'''
+
+RESULT_COLUMNS = ("completion_time", "avg_pace", "avg_rate", "avg_wattage", "peak_wattage", "distance")
+RECORD_COLUMNS = ("date_occurred", "value_int", "value_time")
+
+
+def personal_record_statement(
+    exam_name: str, measure_type: WorkoutMeasurementTypeEnum, date_occurred: date, results: list
+):
+    '''
+        Upsert of every member's record for a session's results (one result per member), None when nothing is measurable
+    '''
+    values = []
+    for result in results:
+        value = result_value(measure_type, result)
+        if value is None:
+            continue
+
+        values.append({
+            "exam_name": exam_name,
+            "member_id": result.member_id,
+            "date_occurred": date_occurred,
+            "value_int": value if measure_type in HIGHER_IS_BETTER else None,
+            "value_time": result.completion_time,
+        })
+
+    if not values:
+        return None
+
+    statement = insert(RowerPerformanceRecord).values(values)
+
+    if measure_type in HIGHER_IS_BETTER:
+        better = or_(
+            RowerPerformanceRecord.value_int.is_(None),
+            statement.excluded.value_int > RowerPerformanceRecord.value_int,
+        )
+    else:
+        better = or_(
+            RowerPerformanceRecord.value_time.is_(None),
+            statement.excluded.value_time < RowerPerformanceRecord.value_time,
+        )
+
+    return statement.on_conflict_do_update(
+        index_elements=[RowerPerformanceRecord.exam_name, RowerPerformanceRecord.member_id],
+        set_={column: statement.excluded[column] for column in RECORD_COLUMNS},
+        where=better,
+    )
+
+
+class ExamService:
+
+    async def get_exam(self, exam_id: int, session: AsyncSession):
+        '''
+            (exam_id, semester_id, exam_name, date_occurred, measure_type) or None
+        '''
+        result = await session.exec(
+            select(Exam.exam_id, Exam.semester_id, Exam.exam_name, Exam.date_occurred, ExamModel.measure_type)
+            .join(ExamModel, ExamModel.exam_name == Exam.exam_name)
+            .where(Exam.exam_id == exam_id)
+        )
+        return result.first()
+
+    async def record_results(
+        self, exam_id: int, results: list[ExamResultModel], session: AsyncSession
+    ) -> ExamResultsReportModel | None:
+        '''
+            Upserts a session's results and the personal records they beat (one statement each, one transaction)
+            then puts them on the leaderboards,
+            None when the exam doesn't exist, raises ValueError for unknown members
+        '''
+        exam = await self.get_exam(exam_id, session)
+        if exam is None:
+            return None
+
+        # one row per member, the last one wins, in member order so concurrent sessions take row locks in the same order
+        by_member = {result.member_id: result for result in results}
+        results = sorted(by_member.values(), key=lambda result: result.member_id)
+
+        statement = insert(MemberExamPerformance).values([
+            {"exam_id": exam_id, **result.model_dump()} for result in results
+        ])
+        statement = statement.on_conflict_do_update(
+            index_elements=[MemberExamPerformance.exam_id, MemberExamPerformance.member_id],
+            set_={column: statement.excluded[column] for column in RESULT_COLUMNS},
+        )
+
+        records = personal_record_statement(exam.exam_name, exam.measure_type, exam.date_occurred, results)
+
+        try:
+            await session.exec(statement)
+            records_set = (await session.exec(records)).rowcount if records is not None else 0
+            await session.commit()
+        except IntegrityError:
+            await session.rollback()
+            raise ValueError("Results reference an unknown member")
+
+        # the results are committed either way, `rebuild-leaderboards` catches the boards up
+        try:
+            categories = await get_member_categories(by_member, session)
+            await add_to_leaderboards(exam.exam_id, exam.semester_id, exam.exam_name, exam.measure_type, results, categories)
+        except (RedisError, OSError) as e:
+            logging.warning("Exam %s results saved but the leaderboards weren't updated: %s", exam_id, e)
+
+        return ExamResultsReportModel(exam_id=exam_id, results_written=len(results), records_set=records_set)
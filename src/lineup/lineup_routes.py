@@ -0,0 +1,30 @@
+from typing import Annotated
+from fastapi import APIRouter, Depends
+from fastapi import status
+from fastapi.exceptions import HTTPException
+from .schemas import LineupRequestModel, LineupModel
+from sqlmodel.ext.asyncio.session import AsyncSession
+from src.db.main import get_read_session
+from src.auth.dependencies import access_token_bearer
+from src.auth.dependencies_data import coach_rolechecker
+from .service import LineupService
+
+'''
+    Boat lineups for a practice
+    calls service() methods to perform business logic
+'''
+
+lineup_router = APIRouter(dependencies=[access_token_bearer])
+lineup_service = LineupService()
+ReadSessionDependency = Annotated[AsyncSession, Depends(get_read_session)]
+
+
+@lineup_router.post("/optimize", response_model=LineupModel, dependencies=[coach_rolechecker])
+async def optimize_lineup(lineup: LineupRequestModel, session: ReadSessionDependency):
+    '''
+        Seats the members expected at practice on `practice_date` in the requested boats, nothing is saved
+    '''
+    try:
+        return await lineup_service.build_lineup(lineup, session)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
@@ -0,0 +1,137 @@
+import numpy as np
+
+'''
+    Boat lineups as an assignment of rowers to seats, NumPy only (no db) so it can be timed on its own
+    - rowers are entries of `pace` (seconds per 500m, lower is faster) and `category`, boats of `boat_types`/`seat_counts`
+        categories/boat types are UNKNOWN/MIXED, MEN, WOMEN: a MEN or WOMEN boat only takes that category,
+        a MIXED boat takes anyone, a rower of unknown category only rows in MIXED boats
+    - `seed_lineup` fills the boats in the order given with the fastest eligible rowers,
+        holding back the men/women the single-category boats after it still need
+    - `balance_lineup` swaps seated rowers between boats while it narrows the spread of the boats' mean paces,
+        each step scores every possible swap at once as a (seated x seated) matrix and takes the best one
+'''
+BENCH = -1
+
+MIXED = 0
+MEN = 1
+WOMEN = 2
+UNKNOWN = MIXED
+
+MAX_SWAPS = 1000
+SWAP_TOLERANCE = 1e-9
+
+
+def eligibility(category: np.ndarray, boat_types: np.ndarray) -> np.ndarray:
+    '''
+        (rower x boat) may the rower sit in the boat
+    '''
+    return (boat_types[None, :] == MIXED) | (boat_types[None, :] == category[:, None])
+
+
+def seed_lineup(pace: np.ndarray, category: np.ndarray, boat_types: np.ndarray, seat_counts: np.ndarray) -> np.ndarray:
+    '''
+        Boat index per rower (BENCH when not seated), a boat that can't be filled is left empty
+    '''
+    assignment = np.full(len(pace), BENCH)
+    fastest_first = np.argsort(pace, kind="stable")
+
+    for boat, (boat_type, seats) in enumerate(zip(boat_types, seat_counts)):
+        free = fastest_first[assignment[fastest_first] == BENCH]
+
+        if boat_type == MIXED:
+            later = boat_types[boat + 1:], seat_counts[boat + 1:]
+            spare = {
+                c: np.count_nonzero(category[free] == c) - int(later[1][later[0] == c].sum())
+                for c in (MEN, WOMEN)
+            }
+
+            picked = []
+            for rower in free:
+                c = category[rower]
+                if c in spare:
+                    if spare[c] <= 0:
+                        continue
+                    spare[c] -= 1
+
+                picked.append(rower)
+                if len(picked) == seats:
+                    break
+        else:
+            picked = free[category[free] == boat_type][:seats]
+
+        if len(picked) == seats:
+            assignment[picked] = boat
+
+    return assignment
+
+
+def boat_means(pace: np.ndarray, assignment: np.ndarray, seat_counts: np.ndarray) -> np.ndarray:
+    '''
+        Mean pace per boat, NaN for empty boats
+    '''
+    seated = assignment != BENCH
+    totals = np.bincount(assignment[seated], weights=pace[seated], minlength=len(seat_counts))
+    filled = np.bincount(assignment[seated], minlength=len(seat_counts)) > 0
+
+    return np.where(filled, totals / seat_counts, np.nan)
+
+
+def spread_of(means: np.ndarray) -> float:
+    '''
+        Sum of squared deviations of the filled boats' means, what `balance_lineup` minimizes
+    '''
+    means = means[~np.isnan(means)]
+    return float(((means - means.mean()) ** 2).sum()) if len(means) else 0.0
+
+
+def balance_lineup(
+    pace: np.ndarray, category: np.ndarray, boat_types: np.ndarray, seat_counts: np.ndarray, assignment: np.ndarray
+) -> np.ndarray:
+    '''
+        Steepest descent over pairwise swaps, the set of seated rowers doesn't change
+    '''
+    assignment = assignment.copy()
+    seated = np.flatnonzero(assignment != BENCH)
+    if len(seated) == 0:
+        return assignment
+
+    eligible = eligibility(category[seated], boat_types)
+    x = pace[seated]
+    seats = seat_counts.astype(float)
+
+    means = boat_means(pace, assignment, seat_counts)
+    filled = ~np.isnan(means)
+    n_boats = np.count_nonzero(filled)
+    means = np.nan_to_num(means)
+
+    for _ in range(MAX_SWAPS):
+        boat = assignment[seated]
+        s = seats[boat]
+        sum_squares = (means[filled] ** 2).sum()
+        total = means[filled].sum()
+        current = sum_squares - total ** 2 / n_boats
+
+        # i gives its seat to j and takes j's: i's boat changes by d / s_i, j's by -d / s_j
+        d = x[None, :] - x[:, None]
+        mean_i = means[boat][:, None]
+        mean_j = means[boat][None, :]
+        new_i = mean_i + d / s[:, None]
+        new_j = mean_j - d / s[None, :]
+
+        new_sum_squares = sum_squares - mean_i ** 2 - mean_j ** 2 + new_i ** 2 + new_j ** 2
+        new_total = total + d / s[:, None] - d / s[None, :]
+        score = new_sum_squares - new_total ** 2 / n_boats
+
+        allowed = (boat[:, None] != boat[None, :]) & eligible[:, boat].T & eligible[:, boat]
+        score[~allowed] = np.inf
+
+        i, j = np.unravel_index(np.argmin(score), score.shape)
+        if not score[i, j] < current - SWAP_TOLERANCE:
+            break
+
+        p, q = boat[i], boat[j]
+        means[p] += d[i, j] / seats[p]
+        means[q] -= d[i, j] / seats[q]
+        assignment[seated[i]], assignment[seated[j]] = q, p
+
+    return assignment
@@ -0,0 +1,58 @@
+from pydantic import BaseModel, Field
+from pydantic import model_validator
+from uuid import UUID
+from datetime import date, timedelta
+from src.db.db_enum_models import BoatEnum, BoatLineupTypeEnum, LineupObjectiveEnum
+
+class StrictModel(BaseModel):
+    model_config = {
+        "extra": "forbid"
+    }
+
+
+class LineupBoatRequestModel(StrictModel):
+    boat: BoatEnum
+    lineup_type: BoatLineupTypeEnum
+
+class LineupRequestModel(StrictModel):
+    '''
+        `boats` in order of priority (first boat is the 1V), `categories` overrides a rower's MEN/WOMEN category
+        (by default the lineup type of the last single-category boat they rowed in)
+    '''
+    practice_date: date
+    boats: list[LineupBoatRequestModel] = Field(min_length=1)
+    objective: LineupObjectiveEnum = LineupObjectiveEnum.BALANCE
+    categories: dict[UUID, BoatLineupTypeEnum] = {}
+
+    @model_validator(mode="after")
+    def unique_boats(self):
+        if len({boat.boat for boat in self.boats}) != len(self.boats):
+            raise ValueError("A boat can only be listed once")
+        return self
+
+class LineupSeatModel(StrictModel):
+    '''
+        Seat 1 is bow, the highest seat is stroke
+    '''
+    seat_num: int
+    rower_id: UUID
+    pace: float
+
+class LineupBoatModel(StrictModel):
+    boat: BoatEnum
+    lineup_type: BoatLineupTypeEnum
+    coxwain_id: UUID | None
+    anticipated_pace: timedelta
+    seats: list[LineupSeatModel]
+
+class LineupModel(StrictModel):
+    '''
+        `unfilled` boats lacked eligible rowers or a coxwain, `spread` is the slowest minus the fastest boat (seconds/500m)
+    '''
+    practice_date: date
+    objective: LineupObjectiveEnum
+    boats: list[LineupBoatModel]
+    unfilled: list[BoatEnum]
+    benched: list[UUID]
+    spread: float
+    seconds: float
@@ -0,0 +1,178 @@
+from src.db.models import BoatInfo, Rower, Coxwain, RowerOnBoat, BoatRoutineIdentifier, Workout
+from src.db.db_enum_models import BoatLineupTypeEnum, LineupObjectiveEnum
+from src.calendar.service import CalendarService, week_start_of
+from sqlmodel.ext.asyncio.session import AsyncSession
+from sqlmodel import select, desc
+from datetime import date, timedelta
+from uuid import UUID
+from .schemas import LineupRequestModel, LineupModel, LineupBoatModel, LineupSeatModel
+from .optimizer import BENCH, MIXED, MEN, WOMEN, seed_lineup, balance_lineup, boat_means
+import numpy as np
+import time
+
+'''
+    Handles business logic (db access) for the {/lineup} route, the solving is in `optimizer`
+    - candidates are the members expected at practice that day (the cached effective availability)
+    - a rower's pace is `Rower.pace_rating`, else the naive total_pace_contribution / times_rowed,
+        else the median of everyone else's (new rowers land mid-pack)
+    - boats of COXED_MIN_SEATS seats or more need a coxwain, coxwains that don't row are used first,
+        then the slowest available rowers who also cox, a coxed boat that can't be filled doesn't keep one
+'''
+COXED_MIN_SEATS = 4
+DEFAULT_PACE_SECONDS = 120.0
+
+LINEUP_CATEGORY = {
+    BoatLineupTypeEnum.MIXED: MIXED,
+    BoatLineupTypeEnum.MEN: MEN,
+    BoatLineupTypeEnum.WOMEN: WOMEN,
+}
+
+
+class LineupService:
+
+    def __init__(self) -> None:
+        self.calendar_service = CalendarService()
+
+    async def get_available_members(self, practice_date: date) -> set[UUID]:
+        matrix = await self.calendar_service.get_effective_availability(week_start_of(practice_date))
+        bit = 1 << practice_date.weekday()
+
+        return {member_id for member_id, mask in matrix.items() if mask & bit}
+
+    async def get_rower_paces(self, members: set[UUID], session: AsyncSession) -> dict[UUID, float]:
+        result = await session.exec(
+            select(Rower.rower_id, Rower.pace_rating, Rower.total_pace_contribution, Rower.times_rowed)
+            .where(Rower.rower_id.in_(members))
+        )
+        rows = result.all()
+
+        paces = {}
+        for rower_id, pace_rating, total_pace_contribution, times_rowed in rows:
+            if pace_rating is not None:
+                paces[rower_id] = pace_rating
+            elif times_rowed:
+                paces[rower_id] = total_pace_contribution / times_rowed
+
+        default = float(np.median(list(paces.values()))) if paces else DEFAULT_PACE_SECONDS
+        return {rower_id: paces.get(rower_id, default) for rower_id, *_ in rows}
+
+    async def get_categories(self, rowers: set[UUID], session: AsyncSession) -> dict[UUID, BoatLineupTypeEnum]:
+        '''
+            Lineup type of the last MEN/WOMEN boat each rower was in
+        '''
+        result = await session.exec(
+            select(RowerOnBoat.rower_id, BoatRoutineIdentifier.lineup_type)
+            .join(BoatRoutineIdentifier, BoatRoutineIdentifier.boat_routine_id == RowerOnBoat.boat_routine_id)
+            .join(Workout, Workout.workout_id == BoatRoutineIdentifier.workout_id)
+            .where(RowerOnBoat.rower_id.in_(rowers), BoatRoutineIdentifier.lineup_type != BoatLineupTypeEnum.MIXED)
+            .order_by(RowerOnBoat.rower_id, desc(Workout.date_occurred))
+            .distinct(RowerOnBoat.rower_id)
+        )
+        return dict(result.all())
+
+    async def get_coxwains(self, members: set[UUID], session: AsyncSession) -> set[UUID]:
+        result = await session.exec(select(Coxwain.cox_id).where(Coxwain.cox_id.in_(members)))
+        return set(result.all())
+
+    async def get_seat_counts(self, lineup: LineupRequestModel, session: AsyncSession) -> list[int]:
+        '''
+            Raises ValueError for boats without a `BoatInfo` row
+        '''
+        result = await session.exec(
+            select(BoatInfo.name, BoatInfo.seat_count).where(BoatInfo.name.in_([boat.boat for boat in lineup.boats]))
+        )
+        seat_counts = dict(result.all())
+
+        missing = [boat.boat.value for boat in lineup.boats if boat.boat not in seat_counts]
+        if missing:
+            raise ValueError(f"Unknown boats: {', '.join(missing)}")
+
+        return [seat_counts[boat.boat] for boat in lineup.boats]
+
+    async def build_lineup(self, lineup: LineupRequestModel, session: AsyncSession) -> LineupModel:
+        seat_counts = await self.get_seat_counts(lineup, session)
+        members = await self.get_available_members(lineup.practice_date)
+
+        paces = await self.get_rower_paces(members, session)
+        coxwains = await self.get_coxwains(members, session)
+        categories = await self.get_categories(set(paces), session)
+        categories.update(lineup.categories)
+
+        started = time.perf_counter()
+
+        # coxes that don't row first, then the slowest rowers who can cox
+        cox_pool = sorted(coxwains - paces.keys(), key=str) + sorted(coxwains & paces.keys(), key=lambda member_id: -paces[member_id])
+        dropped: set[int] = set()
+
+        # a cox is only kept by a boat whose seats get filled, the first coxed boat that comes back empty
+        # is dropped and the coxes are handed out again (its cox goes to the next boat, or back to rowing)
+        while True:
+            free_coxes = iter(cox_pool)
+            boat_coxes = [
+                next(free_coxes, None) if seats >= COXED_MIN_SEATS and i not in dropped else None
+                for i, seats in enumerate(seat_counts)
+            ]
+
+            # a coxed boat without a cox is skipped
+            rowable = [
+                i for i, seats in enumerate(seat_counts)
+                if i not in dropped and (seats < COXED_MIN_SEATS or boat_coxes[i] is not None)
+            ]
+
+            coxing = set(boat_coxes)
+            rower_ids = [rower_id for rower_id in paces if rower_id not in coxing]
+            pace = np.array([paces[rower_id] for rower_id in rower_ids], dtype=float)
+            category = np.array(
+                [LINEUP_CATEGORY.get(categories.get(rower_id), MIXED) for rower_id in rower_ids], dtype=np.int64
+            )
+            boat_types = np.array([LINEUP_CATEGORY[lineup.boats[i].lineup_type] for i in rowable], dtype=np.int64)
+            seats = np.array([seat_counts[i] for i in rowable], dtype=np.int64)
+
+            assignment = seed_lineup(pace, category, boat_types, seats)
+
+            empty = [
+                rowable[k] for k in np.flatnonzero(np.isnan(boat_means(pace, assignment, seats)))
+                if boat_coxes[rowable[k]] is not None
+            ]
+            if not empty:
+                break
+            dropped.add(empty[0])
+
+        if lineup.objective == LineupObjectiveEnum.BALANCE:
+            assignment = balance_lineup(pace, category, boat_types, seats, assignment)
+
+        means = boat_means(pace, assignment, seats)
+        seconds = time.perf_counter() - started
+
+        boats, unfilled = [], []
+        filled = {rowable[k]: k for k in range(len(rowable)) if not np.isnan(means[k])}
+
+        for i, requested in enumerate(lineup.boats):
+            if i not in filled:
+                unfilled.append(requested.boat)
+                continue
+
+            k = filled[i]
+            # slowest in the bow, fastest at stroke
+            crew = sorted(np.flatnonzero(assignment == k), key=lambda rower: -pace[rower])
+            boats.append(LineupBoatModel(
+                boat=requested.boat,
+                lineup_type=requested.lineup_type,
+                coxwain_id=boat_coxes[i],
+                anticipated_pace=timedelta(seconds=float(means[k])),
+                seats=[
+                    LineupSeatModel(seat_num=seat, rower_id=rower_ids[rower], pace=float(pace[rower]))
+                    for seat, rower in enumerate(crew, start=1)
+                ],
+            ))
+
+        filled_means = means[~np.isnan(means)]
+        return LineupModel(
+            practice_date=lineup.practice_date,
+            objective=lineup.objective,
+            boats=boats,
+            unfilled=unfilled,
+            benched=[rower_ids[rower] for rower in np.flatnonzero(assignment == BENCH)],
+            spread=float(filled_means.max() - filled_means.min()) if len(filled_means) else 0.0,
+            seconds=seconds,
+        )
@@ -0,0 +1,201 @@
+from src.db.models import User, MemberEnrollmentHistory
+from sqlmodel.ext.asyncio.session import AsyncSession
+from sqlmodel import select, or_
+from sqlalchemy.dialects.postgresql import insert
+from pydantic import ValidationError
+from datetime import date
+from uuid import uuid4
+from .schemas import BulkImportRowModel, BulkImportRowErrorModel, BulkImportReportModel
+from .semesters import get_semester_resolver
+from src.db.response_cache import invalidate_tags
+import csv
+import io
+
+'''
+    Semester start bulk enrollment, shared by `POST /member/bulk_import` and `python -m src.cli import-members`
+    - the whole file is validated up front, then checked against the db with one query for existing users,
+        semesters come from the in-memory `SemesterResolver`
+    - writes are multi-row `INSERT ... ON CONFLICT` in IMPORT_CHUNK_SIZE chunks, all in one transaction
+    - imported accounts have no password (no bcrypt per row), login treats them as invalid until one is set
+'''
+IMPORT_CHUNK_SIZE = 1000  # 10 columns per User row, well below asyncpg's 32767 bind params
+
+IMPORT_COLUMNS = tuple(BulkImportRowModel.model_fields)
+REQUIRED_IMPORT_COLUMNS = tuple(
+    name for name, field in BulkImportRowModel.model_fields.items() if field.is_required()
+)
+
+
+def chunked(items: list, size: int = IMPORT_CHUNK_SIZE):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+def format_validation_error(error: ValidationError) -> list[str]:
+    return [
+        f"{'.'.join(str(loc) for loc in err['loc'])}: {err['msg']}" if err["loc"] else err["msg"]
+        for err in error.errors()
+    ]
+
+def parse_member_csv(text: str) -> tuple[list[tuple[int, BulkImportRowModel]], dict[int, BulkImportRowErrorModel]]:
+    '''
+        Raises ValueError when the header (or the csv itself) is unusable
+        returns the valid rows (line number, row) and the per-line errors
+    '''
+    reader = csv.DictReader(io.StringIO(text))
+    header = [name.strip() for name in reader.fieldnames or []]
+
+    missing = [name for name in REQUIRED_IMPORT_COLUMNS if name not in header]
+    unknown = [name for name in header if name not in IMPORT_COLUMNS]
+    if missing or unknown:
+        raise ValueError(f"Bad csv header, missing: {missing}, unknown: {unknown}")
+
+    reader.fieldnames = header
+    rows, errors = [], {}
+
+    try:
+        for raw in reader:
+            line = reader.line_num
+            # blank cells mean "use the default"
+            cells = {key: value.strip() for key, value in raw.items() if key is not None and value and value.strip()}
+
+            try:
+                rows.append((line, BulkImportRowModel.model_validate(cells)))
+            except ValidationError as e:
+                errors[line] = BulkImportRowErrorModel(row=line, username=cells.get("username"), errors=format_validation_error(e))
+    except csv.Error as e:
+        raise ValueError(f"Malformed csv at line {reader.line_num}: {e}")
+
+    return rows, errors
+
+def add_row_error(errors: dict[int, BulkImportRowErrorModel], line: int, row: BulkImportRowModel, message: str):
+    if line not in errors:
+        errors[line] = BulkImportRowErrorModel(row=line, username=row.username, errors=[])
+    errors[line].errors.append(message)
+
+
+async def import_members(text: str, session: AsyncSession, all_or_nothing: bool = False) -> BulkImportReportModel:
+    '''
+        Creates missing `User`s and upserts their `MemberEnrollmentHistory` for the row's semester
+        - a row that fails any check is skipped (and reported), the rest still go in
+        - `all_or_nothing` rolls everything back if any row failed
+    '''
+    rows, errors = parse_member_csv(text)
+    total = len(rows) + len(errors)
+
+    # duplicates inside the file, first occurrence wins
+    seen_usernames, seen_emails = {}, {}
+    for line, row in rows:
+        if row.username in seen_usernames:
+            add_row_error(errors, line, row, f"username repeated from row {seen_usernames[row.username]}")
+        elif row.email in seen_emails:
+            add_row_error(errors, line, row, f"email repeated from row {seen_emails[row.email]}")
+        else:
+            seen_usernames[row.username] = line
+            seen_emails[row.email] = line
+    rows = [(line, row) for line, row in rows if line not in errors]
+
+    today = date.today()
+    resolver = await get_semester_resolver(session)
+
+    def semester_of(row: BulkImportRowModel) -> int | None:
+        if row.year is None:
+            return resolver.resolve(today)
+        return resolver.semester_id_of(row.year, row.semester)
+
+    if any(semester_of(row) is None for _, row in rows):
+        resolver = await get_semester_resolver(session, reload_on_miss=True)
+    semester_ids = {line: semester_of(row) for line, row in rows}
+
+    existing_by_username, existing_by_email = {}, {}
+    if rows:
+        result = await session.exec(
+            select(User.uid, User.username, User.email).where(
+                or_(User.username.in_(list(seen_usernames)), User.email.in_(list(seen_emails)))
+            )
+        )
+        for uid, username, email in result.all():
+            existing_by_username[username] = (uid, email)
+            existing_by_email[email] = username
+
+    new_users, member_ids = [], {}
+    for line, row in rows:
+        if semester_ids[line] is None:
+            add_row_error(
+                errors, line, row,
+                "no semester in progress" if row.year is None else f"no semester {row.semester.value} {row.year}",
+            )
+            continue
+
+        if row.username in existing_by_username:
+            member_ids[line] = existing_by_username[row.username][0]
+        elif row.email in existing_by_email:
+            add_row_error(errors, line, row, f"email already used by {existing_by_email[row.email]}")
+        else:
+            uid = uuid4()
+            member_ids[line] = uid
+            new_users.append({
+                "uid": uid,
+                "username": row.username,
+                "email": row.email,
+                "passwd_hash": None,
+                "first_name": row.first_name,
+                "last_name": row.last_name,
+                "role": row.role,
+                "birthdate": row.birthdate,
+                "is_verified": False,
+                "join_date": date.today(),
+            })
+
+    users_created = 0
+    for chunk in chunked(new_users):
+        # a concurrent signup may have taken a username/email since the lookup
+        result = await session.exec(
+            insert(User).values(chunk).on_conflict_do_nothing().returning(User.uid)
+        )
+        users_created += len(result.all())
+
+    if users_created != len(new_users):
+        inserted = set((await session.exec(
+            select(User.uid).where(User.uid.in_([user["uid"] for user in new_users]))
+        )).all())
+        for line, row in rows:
+            if line in member_ids and member_ids[line] not in inserted and row.username not in existing_by_username:
+                add_row_error(errors, line, row, "username or email taken while importing")
+                del member_ids[line]
+
+    enrollments = [
+        {
+            "member_id": member_ids[line],
+            "semester_id": semester_ids[line],
+            "role": row.role,
+            "dues_paid": row.dues_paid,
+        }
+        for line, row in rows
+        if line in member_ids
+    ]
+
+    enrollments_written = 0
+    for chunk in chunked(enrollments):
+        statement = insert(MemberEnrollmentHistory).values(chunk)
+        statement = statement.on_conflict_do_update(
+            index_elements=[MemberEnrollmentHistory.member_id, MemberEnrollmentHistory.semester_id],
+            set_={"role": statement.excluded.role, "dues_paid": statement.excluded.dues_paid},
+        )
+        result = await session.exec(statement)
+        enrollments_written += result.rowcount
+
+    committed = not (all_or_nothing and errors)
+    if committed:
+        await session.commit()
+        if users_created:
+            await invalidate_tags("users")
+    else:
+        await session.rollback()
+
+    return BulkImportReportModel(
+        rows=total,
+        users_created=users_created if committed else 0,
+        enrollments_written=enrollments_written if committed else 0,
+        committed=committed,
+        errors=sorted(errors.values(), key=lambda error: error.row),
+    )
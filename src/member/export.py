@@ -0,0 +1,118 @@
+from src.db.models import User, MemberEnrollmentHistory, MemberWorkoutPerformance, LandWorkoutRoutine, Workout
+from src.db.main import get_read_session_maker
+from src.db.db_enum_models import ExportFormatEnum
+from sqlmodel import select, desc
+from typing import AsyncIterator
+import csv
+import io
+import json
+import zlib
+
+'''
+    Semester-end exports, streamed with constant memory
+    - rows come from a server-side cursor (`session.stream`) EXPORT_BATCH_SIZE at a time
+    - each batch is encoded (csv / ndjson) and optionally gzip-compressed before the next is fetched
+    - the export opens its own session since it outlives the route handler
+'''
+EXPORT_BATCH_SIZE = 1000
+
+ROSTER_COLUMNS = [User.uid, User.username, User.email, User.first_name, User.last_name, User.role, User.birthdate, User.is_verified, User.join_date]
+
+
+def roster_statement(semester_id: int | None):
+    statement = select(*ROSTER_COLUMNS).order_by(desc(User.join_date), desc(User.uid))
+
+    if semester_id is not None:
+        statement = statement.join(
+            MemberEnrollmentHistory, MemberEnrollmentHistory.member_id == User.uid
+        ).where(MemberEnrollmentHistory.semester_id == semester_id)
+
+    return statement
+
+def enrollment_history_statement(semester_id: int | None):
+    statement = select(MemberEnrollmentHistory.__table__).order_by(
+        MemberEnrollmentHistory.semester_id, MemberEnrollmentHistory.member_id
+    )
+
+    if semester_id is not None:
+        statement = statement.where(MemberEnrollmentHistory.semester_id == semester_id)
+
+    return statement
+
+def workout_performance_statement(semester_id: int | None):
+    statement = select(MemberWorkoutPerformance.__table__).order_by(
+        MemberWorkoutPerformance.workout_performed_id, MemberWorkoutPerformance.member_id
+    )
+
+    if semester_id is not None:
+        statement = (
+            statement
+            .join(LandWorkoutRoutine, LandWorkoutRoutine.routine_id == MemberWorkoutPerformance.workout_performed_id)
+            .join(Workout, Workout.workout_id == LandWorkoutRoutine.workout_id)
+            .where(Workout.semester_id == semester_id)
+        )
+
+    return statement
+
+EXPORT_STATEMENTS = {
+    "roster": roster_statement,
+    "enrollment_history": enrollment_history_statement,
+    "workout_performance": workout_performance_statement,
+}
+
+
+async def stream_row_batches(statement) -> AsyncIterator[tuple[list[str], list]]:
+    async with get_read_session_maker()() as session:
+        result = await session.stream(statement.execution_options(yield_per=EXPORT_BATCH_SIZE))
+        columns = list(result.keys())
+
+        async for rows in result.partitions():
+            yield columns, rows
+
+
+def format_value(value):
+    if value is None:
+        return None
+    if isinstance(value, (int, float, bool, str)):
+        return value
+    return getattr(value, "value", None) or str(value)
+
+
+async def encode_csv(batches) -> AsyncIterator[bytes]:
+    header_written = False
+
+    async for columns, rows in batches:
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+
+        if not header_written:
+            writer.writerow(columns)
+            header_written = True
+
+        writer.writerows([format_value(value) for value in row] for row in rows)
+        yield buffer.getvalue().encode()
+
+async def encode_ndjson(batches) -> AsyncIterator[bytes]:
+    async for columns, rows in batches:
+        yield "".join(
+            json.dumps({column: format_value(value) for column, value in zip(columns, row)}) + "\n"
+            for row in rows
+        ).encode()
+
+async def gzip_chunks(chunks: AsyncIterator[bytes]) -> AsyncIterator[bytes]:
+    compressor = zlib.compressobj(wbits=31)  # 31 -> gzip container
+
+    async for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+
+    yield compressor.flush()
+
+
+def export_stream(table: str, export_format: ExportFormatEnum, semester_id: int | None, gzip: bool) -> AsyncIterator[bytes]:
+    batches = stream_row_batches(EXPORT_STATEMENTS[table](semester_id))
+
+    chunks = encode_csv(batches) if export_format == ExportFormatEnum.CSV else encode_ndjson(batches)
+
+    return gzip_chunks(chunks) if gzip else chunks
@@ -4,19 +4,24 @@ from typing import Optional, Union, Annotated, List
     Union() or (type | None)
     Annotated[type, "annotation textr"]
 '''
-from fastapi import FastAPI, Header, APIRouter, Depends
+from fastapi import FastAPI, Header, APIRouter, Depends, UploadFile, File
 from fastapi import status
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, StreamingResponse
 from fastapi.exceptions import HTTPException
 from src.auth.schemas import User
 from .schemas import *
 from sqlmodel.ext.asyncio.session import AsyncSession
 from src.auth.service import UserService
-from src.db.main import get_session
+from src.db.main import get_session, get_read_session
 from datetime import datetime, timedelta
 from src.auth.dependencies import RefreshTokenBearer, access_token_bearer, get_current_user_uuid, get_current_user_by_username
 from src.auth.dependencies_data import admin_rolechecker, coach_rolechecker, officer_rolechecker, member_rolechecker, public_rolechecker
 from .service import MemberService
+from .export import export_stream
+from .bulk_import import import_members
+from src.db.db_enum_models import ExportFormatEnum, ExportTableEnum
+from src.auth.permissions import Permission, require, publish_role_permissions
+from src.response_cache import CachedRoute, cached_response
 from uuid import UUID
 
 REFRESH_TOKEN_EXPIRY_DAYS = 2
@@ -28,10 +33,11 @@ REFRESH_TOKEN_EXPIRY_DAYS = 2
     calls service() methods to perform business logic
 '''
 
-member_router = APIRouter(dependencies=[access_token_bearer])
+member_router = APIRouter(dependencies=[access_token_bearer], route_class=CachedRoute)
 user_service = UserService()
 member_service = MemberService()
 SessionDependency = Annotated[AsyncSession, Depends(get_session)]
+ReadSessionDependency = Annotated[AsyncSession, Depends(get_read_session)]
 
 
 @member_router.post("/add_coxain", response_model=CoxwainModel, dependencies=[officer_rolechecker], status_code=status.HTTP_201_CREATED)
@@ -62,7 +68,8 @@ async def del_coxwain_evaluation(cox_eval: DeleteCoxwainEvaluationModel, session
         )
 
 @member_router.get("/get_coxwain_evaluations", response_model=list[CoxwainEvaluationModel])
-async def get_cox_evals(session: SessionDependency, eval_search_params: CoxwainModel):
+@cached_response(tags=("coxwain_evaluations",))
+async def get_cox_evals(session: ReadSessionDependency, eval_search_params: CoxwainModel):
     result = await member_service.get_all_coxwain_evaluations(eval_search_params, session)
     return result
 
@@ -77,21 +84,61 @@ async def add_rower(session: SessionDependency, rower_data: RowerModel) -> Rower
         )
     return rower
 
-@member_router.patch("/update_role_permissions")
+@member_router.patch("/update_role_permissions", dependencies=[require(Permission.MANAGE_ROLES)])
 async def update_role_perms(session: SessionDependency, role_data: RolePermissionsUpdateModel) -> None:
+    '''
+        Needs MANAGE_ROLES (the route used to take no token at all), other workers reload the masks on publish
+    '''
     if not await member_service.update_role_permissions(role_data, session):
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN, detail="Invalid paramas / No changes made"
         )
+
+    await publish_role_permissions(session)
     
 
-@member_router.post("/enroll_member", status_code=status.HTTP_201_CREATED)
+@member_router.post("/enroll_member", status_code=status.HTTP_201_CREATED, dependencies=[require(Permission.MANAGE_MEMBERS)])
 async def enroll_member(member_data: CreateMemberEnrollmentHistoryModel, session: SessionDependency):
+    '''
+        Needs MANAGE_MEMBERS (the route used to take no token at all), like `bulk_import`
+    '''
     if not await member_service.enroll_member(member_data, session):
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN, detail="Invalid paramas / No changes made"
         )
 
+@member_router.post("/bulk_import", response_model=BulkImportReportModel, dependencies=[require(Permission.MANAGE_MEMBERS)])
+async def bulk_import_members(session: SessionDependency, file: UploadFile = File(...), all_or_nothing: bool = False):
+    '''
+        Enrolls every member of a csv in one transaction, see `BulkImportRowModel` for the columns
+        rows that fail are listed in `errors` instead of failing the whole upload (unless `all_or_nothing`)
+    '''
+    try:
+        report = await import_members((await file.read()).decode("utf-8-sig"), session, all_or_nothing)
+    except (UnicodeDecodeError, ValueError) as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+    return report
+
+@member_router.get("/export/{table}", dependencies=[require(Permission.VIEW_ROSTER)])
+async def export_table(
+    table: ExportTableEnum,
+    format: ExportFormatEnum = ExportFormatEnum.CSV,
+    semester_id: int | None = None,
+    gzip: bool = False,
+):
+    '''
+        Streams the whole table (optionally one semester) without building it in memory
+    '''
+    media_type = "text/csv" if format == ExportFormatEnum.CSV else "application/x-ndjson"
+    filename = f"{table.value}{f'_{semester_id}' if semester_id is not None else ''}.{format.value}{'.gz' if gzip else ''}"
+
+    return StreamingResponse(
+        export_stream(table.value, format, semester_id, gzip),
+        media_type="application/gzip" if gzip else media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
 # @member_router.put("/raise_privilege", status_code=status.HTTP_202_ACCEPTED)
 
 # @member_router.put("/raise_privilege", status_code=status.HTTP_202_ACCEPTED)
@@ -0,0 +1,142 @@
+from src.db.models import (
+    User,
+    Semester,
+    MemberEnrollmentHistory,
+    Availability,
+    ScheduledAbsence,
+)
+from src.db.db_enum_models import MemberRoleEnum, SemesterEnum
+from src.calendar.service import CalendarService, archive_absences_statement
+from sqlmodel.ext.asyncio.session import AsyncSession
+from sqlmodel import select, desc, delete, literal
+from sqlalchemy.dialects.postgresql import insert
+from datetime import date
+from redis.exceptions import RedisError
+import logging
+from .schemas import SemesterRolloverReportModel
+from .semesters import publish_semesters
+
+'''
+    End of semester rollover, `python -m src.cli rollover`
+    - one transaction of set-based statements, the number of round trips doesn't depend on the roster size
+        1. create the next `Semester`
+        2. carry every non-alumni enrollment of the previous semester forward (INSERT ... SELECT, dues reset)
+        3. `Availability` is emptied and repopulated with an all-zero row for each carried member
+        4. `ScheduledAbsence` before the new semester moves to `ScheduledAbsenceArchive` (`archive_absences_statement`)
+    - a dry run executes everything for the counts and rolls back
+'''
+calendar_service = CalendarService()
+
+# no practice during the summer, spring rolls over to fall
+NEXT_SEMESTER = {
+    SemesterEnum.SPRING: SemesterEnum.FALL,
+    SemesterEnum.SUMMER: SemesterEnum.FALL,
+    SemesterEnum.FALL: SemesterEnum.SPRING,
+}
+
+
+def next_semester_of(year: int, semester: SemesterEnum) -> tuple[int, SemesterEnum]:
+    next_semester = NEXT_SEMESTER[semester]
+    return (year + 1 if next_semester == SemesterEnum.SPRING else year), next_semester
+
+
+async def rollover_semester(
+    session: AsyncSession,
+    start_date: date,
+    end_date: date,
+    year: int | None = None,
+    semester: SemesterEnum | None = None,
+    dry_run: bool = False,
+) -> SemesterRolloverReportModel:
+    '''
+        Raises ValueError on dates/semesters that don't make sense
+        `year`/`semester` default to the one after the latest semester (required when there is none)
+    '''
+    if end_date <= start_date:
+        raise ValueError("end_date must be after start_date")
+
+    # plain columns, a dry run's rollback would expire an ORM instance
+    result = await session.exec(
+        select(Semester.semester_id, Semester.year, Semester.semester, Semester.end_date)
+        .order_by(desc(Semester.start_date))
+        .limit(1)
+    )
+    previous = result.first()
+
+    if previous is not None and start_date <= previous.end_date:
+        raise ValueError(f"New semester must start after {previous.end_date}")
+
+    if year is None or semester is None:
+        if previous is None:
+            raise ValueError("No semester to roll over from, pass year and semester")
+        year, semester = next_semester_of(previous.year, previous.semester)
+
+    result = await session.exec(
+        insert(Semester)
+        .values(year=year, semester=semester, start_date=start_date, end_date=end_date)
+        .returning(Semester.semester_id)
+    )
+    semester_id = result.scalar_one()
+
+    enrollments_carried = 0
+    if previous is not None:
+        carried = (
+            select(
+                MemberEnrollmentHistory.member_id,
+                literal(semester_id),
+                MemberEnrollmentHistory.role,
+                literal(False),
+            )
+            .join(User, User.uid == MemberEnrollmentHistory.member_id)
+            .where(
+                MemberEnrollmentHistory.semester_id == previous.semester_id,
+                MemberEnrollmentHistory.role != MemberRoleEnum.ALUMNI,
+                User.role != MemberRoleEnum.ALUMNI,
+            )
+        )
+        result = await session.exec(
+            insert(MemberEnrollmentHistory)
+            .from_select(["member_id", "semester_id", "role", "dues_paid"], carried)
+            .on_conflict_do_nothing()
+        )
+        enrollments_carried = result.rowcount
+
+    result = await session.exec(delete(Availability))
+    availability_removed = result.rowcount
+
+    result = await session.exec(
+        insert(Availability).from_select(
+            ["member_id", "days_mask"],
+            select(MemberEnrollmentHistory.member_id, literal(0)).where(
+                MemberEnrollmentHistory.semester_id == semester_id
+            ),
+        )
+    )
+    availability_reset = result.rowcount
+
+    result = await session.exec(archive_absences_statement(ScheduledAbsence.absence_date < start_date))
+    absences_archived = len(result.all())
+
+    if dry_run:
+        await session.rollback()
+    else:
+        await session.commit()
+
+        # the rollover is committed either way, workers reload semesters on a miss and the matrix expires
+        try:
+            await publish_semesters(session)
+            await calendar_service.clear_cached_effective_availability()
+        except (RedisError, OSError) as e:
+            logging.warning("Rollover committed but caches weren't refreshed: %s", e)
+
+    return SemesterRolloverReportModel(
+        dry_run=dry_run,
+        previous_semester_id=previous.semester_id if previous is not None else None,
+        semester_id=semester_id,
+        year=year,
+        semester=semester,
+        enrollments_carried=enrollments_carried,
+        availability_removed=availability_removed,
+        availability_reset=availability_reset,
+        absences_archived=absences_archived,
+    )
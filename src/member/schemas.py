@@ -86,7 +86,8 @@ class RolePermissionsUpdateModel(StrictModel):
     view_funds: bool = False
     view_roster: bool = False
 
-    @model_validator(mode="before")
+    # "after": reads the parsed fields, a "before" validator gets the raw dict and failed every request
+    @model_validator(mode="after")
     def require_one(self):
         permissions = [
             self.access_site,
@@ -119,7 +120,63 @@ class CreateMemberEnrollmentHistoryModel(StrictModel):
     '''
     member_id: UUID
     role: MemberRoleEnum
-    year: int = Field(ge=1900, default=date.year)
+    year: int = Field(ge=1900, default_factory=lambda: date.today().year)
     semester: SemesterEnum
     dues_paid: bool = False
 
+
+class BulkImportRowModel(StrictModel):
+    '''
+        One line of a bulk member import csv
+        - blank `role` / `dues_paid` cells fall back to the defaults
+        - blank `year` and `semester` enroll into the semester in progress
+        - existing usernames are enrolled as-is, their account isn't modified
+    '''
+    username: str = Field(min_length=8, max_length=8)
+    email: str = Field(max_length=32)
+    first_name: str = Field(min_length=2)
+    last_name: str = Field(min_length=2)
+    birthdate: date
+    role: MemberRoleEnum = MemberRoleEnum.MEMBER
+    year: int | None = Field(ge=1900, default=None)
+    semester: SemesterEnum | None = None
+    dues_paid: bool = False
+
+    @model_validator(mode="after")
+    def year_with_semester(self):
+        if (self.year is None) != (self.semester is None):
+            raise ValueError("year and semester go together, leave both blank for the current semester")
+
+        return self
+
+class BulkImportRowErrorModel(StrictModel):
+    '''
+        `row` is the csv line number (the header is line 1)
+    '''
+    row: int
+    username: str | None = None
+    errors: list[str]
+
+class BulkImportReportModel(StrictModel):
+    '''
+        Nothing is written when `all_or_nothing` was requested and `errors` isn't empty
+    '''
+    rows: int
+    users_created: int
+    enrollments_written: int
+    committed: bool
+    errors: list[BulkImportRowErrorModel]
+
+class SemesterRolloverReportModel(StrictModel):
+    '''
+        What the rollover did (or would do, on a dry run nothing is kept)
+    '''
+    dry_run: bool
+    previous_semester_id: int | None
+    semester_id: int
+    year: int
+    semester: SemesterEnum
+    enrollments_carried: int
+    availability_removed: int
+    availability_reset: int
+    absences_archived: int
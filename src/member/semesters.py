@@ -0,0 +1,128 @@
+from src.db.models import Semester
+from src.db.main import get_session_maker
+from src.db.redis import invalidation_handlers, resync_handlers, publish_invalidation
+from src.db.db_enum_models import SemesterEnum
+from sqlmodel.ext.asyncio.session import AsyncSession
+from sqlmodel import select
+from bisect import bisect_right
+from datetime import date
+from typing import Iterable
+import json
+import time
+
+'''
+    date -> semester_id without a query
+    - every worker keeps the (small) `Semester` table as parallel lists sorted by start_date, a lookup is one bisect
+    - loaded by the app's life_span, writers call `publish_semesters` after committing a `Semester` change
+        and every worker swaps in the published table, it is reloaded after a pub/sub reconnect too
+    - a miss reloads from the db (at most every SEMESTER_RELOAD_INTERVAL seconds) in case a change was never published
+    - semesters never overlap (the rollover enforces it), so only the closest start before the date is checked
+'''
+SEMESTER_RELOAD_INTERVAL = 60.0
+
+
+class SemesterResolver:
+
+    def __init__(self) -> None:
+        self.loaded = False
+        self.last_load = 0.0
+        self.starts: list[date] = []
+        self.ends: list[date] = []
+        self.ids: list[int] = []
+        self.by_name: dict[tuple[int, SemesterEnum], int] = {}
+
+    def load(self, rows: Iterable[tuple[int, int, SemesterEnum, date, date]]) -> None:
+        '''
+            rows are (semester_id, year, semester, start_date, end_date)
+        '''
+        rows = sorted(rows, key=lambda row: row[3])
+
+        self.starts = [row[3] for row in rows]
+        self.ends = [row[4] for row in rows]
+        self.ids = [row[0] for row in rows]
+        self.by_name = {(row[1], SemesterEnum(row[2])): row[0] for row in rows}
+        self.loaded = True
+        self.last_load = time.monotonic()
+
+    def resolve(self, day: date) -> int | None:
+        i = bisect_right(self.starts, day) - 1
+
+        if i >= 0 and day <= self.ends[i]:
+            return self.ids[i]
+        return None
+
+    def resolve_many(self, days: Iterable[date]) -> dict[date, int | None]:
+        '''
+            Each distinct day is looked up once
+        '''
+        return {day: self.resolve(day) for day in set(days)}
+
+    def semester_id_of(self, year: int, semester: SemesterEnum) -> int | None:
+        return self.by_name.get((year, semester))
+
+    def rows(self) -> list[tuple]:
+        names = {semester_id: name for name, semester_id in self.by_name.items()}
+        return [
+            (semester_id, *names[semester_id], start, end)
+            for semester_id, start, end in zip(self.ids, self.starts, self.ends)
+        ]
+
+
+semester_resolver = SemesterResolver()
+
+
+async def fetch_semesters(session: AsyncSession) -> list[tuple]:
+    result = await session.exec(
+        select(Semester.semester_id, Semester.year, Semester.semester, Semester.start_date, Semester.end_date)
+    )
+    return [tuple(row) for row in result.all()]
+
+async def load_semesters() -> None:
+    async with get_session_maker()() as session:
+        semester_resolver.load(await fetch_semesters(session))
+
+async def get_semester_resolver(session: AsyncSession, reload_on_miss: bool = False) -> SemesterResolver:
+    '''
+        Loads on first use (outside the app, e.g. the cli), `reload_on_miss` after a failed lookup
+    '''
+    stale = reload_on_miss and time.monotonic() - semester_resolver.last_load > SEMESTER_RELOAD_INTERVAL
+
+    if not semester_resolver.loaded or stale:
+        semester_resolver.load(await fetch_semesters(session))
+
+    return semester_resolver
+
+async def resolve_semester_id(day: date, session: AsyncSession) -> int | None:
+    resolver = await get_semester_resolver(session)
+    semester_id = resolver.resolve(day)
+
+    if semester_id is None:
+        semester_id = (await get_semester_resolver(session, reload_on_miss=True)).resolve(day)
+
+    return semester_id
+
+async def resolve_semester_name(year: int, semester: SemesterEnum, session: AsyncSession) -> int | None:
+    resolver = await get_semester_resolver(session)
+    semester_id = resolver.semester_id_of(year, semester)
+
+    if semester_id is None:
+        semester_id = (await get_semester_resolver(session, reload_on_miss=True)).semester_id_of(year, semester)
+
+    return semester_id
+
+async def publish_semesters(session: AsyncSession) -> None:
+    '''
+        Call after committing a `Semester` change
+    '''
+    semester_resolver.load(await fetch_semesters(session))
+    await publish_invalidation("semester", json.dumps(semester_resolver.rows(), default=str))
+
+def apply_published_semesters(payload: str) -> None:
+    semester_resolver.load(
+        (semester_id, year, SemesterEnum(semester), date.fromisoformat(start), date.fromisoformat(end))
+        for semester_id, year, semester, start, end in json.loads(payload)
+    )
+
+
+invalidation_handlers["semester"] = apply_published_semesters
+resync_handlers.append(load_semesters)
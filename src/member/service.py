@@ -7,6 +7,8 @@ from uuid import UUID
 from src.auth.service import UserService
 from typing import List
 from src.db.db_enum_models import MemberRoleEnum
+from .semesters import resolve_semester_name
+from src.db.response_cache import invalidate_tags
 
 user_service = UserService()
 
@@ -27,6 +29,7 @@ class MemberService:
 
         session.add(new_eval)
         await session.commit()
+        await invalidate_tags("coxwain_evaluations")
         return new_eval
 
     async def get_one_coxwain_evaluation(
@@ -51,6 +54,7 @@ class MemberService:
 
         await session.delete(cox_evaluation)
         await session.commit()
+        await invalidate_tags("coxwain_evaluations")
         return True
 
     async def get_all_coxwain_evaluations(
@@ -129,8 +133,15 @@ class MemberService:
         result = await session.exec(query)
         return result.first()
 
-    # TODO: create a get semester ID method for this method and future methods
-    # Update logic here for future to check if the enrollment history already has it populated
+    async def enrollment_exists(self, member_id: UUID, semester_id: int, session: AsyncSession) -> bool:
+        query = select(MemberEnrollmentHistory.member_id).where(
+            MemberEnrollmentHistory.member_id == member_id,
+            MemberEnrollmentHistory.semester_id == semester_id,
+        )
+
+        result = await session.exec(query)
+        return result.first() is not None
+
     async def enroll_member(
         self, add_member: CreateMemberEnrollmentHistoryModel, session: AsyncSession
     ) -> bool:
@@ -138,10 +149,19 @@ class MemberService:
         if user is None:
             return False
 
-        if await self.check_member_status(add_member, session) is not None:
+        semester_id = await resolve_semester_name(add_member.year, add_member.semester, session)
+        if semester_id is None:
+            return False
+
+        if await self.enrollment_exists(add_member.member_id, semester_id, session):
             return False
 
-        new_member_enrollment = MemberEnrollmentHistory(**add_member.model_dump())
+        new_member_enrollment = MemberEnrollmentHistory(
+            member_id=add_member.member_id,
+            semester_id=semester_id,
+            role=add_member.role,
+            dues_paid=add_member.dues_paid,
+        )
 
         session.add(new_member_enrollment)
         await session.commit()
@@ -0,0 +1,220 @@
+from bisect import bisect_left
+from typing import Callable
+import time
+
+'''
+    Minimal Prometheus-style metrics, rendered on `/metrics` in the text exposition format
+    - everything lives in-process (per worker), scrape each worker or aggregate upstream
+    - labels are always bounded: route templates (not raw paths), router prefixes, fixed enums
+'''
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+registry: list = []
+
+
+def format_labels(label_names: tuple, label_values: tuple, extra: str = "") -> str:
+    pairs = [f'{name}="{value}"' for name, value in zip(label_names, label_values)]
+    if extra:
+        pairs.append(extra)
+
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Counter:
+    kind = "counter"
+
+    def __init__(self, name: str, description: str, label_names: tuple = ()) -> None:
+        self.name = name
+        self.description = description
+        self.label_names = label_names
+        self.values: dict[tuple, float] = {}
+        registry.append(self)
+
+    def inc(self, labels: tuple = (), amount: float = 1) -> None:
+        self.values[labels] = self.values.get(labels, 0) + amount
+
+    def samples(self):
+        for labels, value in self.values.items():
+            yield self.name, format_labels(self.label_names, labels), value
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def dec(self, labels: tuple = (), amount: float = 1) -> None:
+        self.inc(labels, -amount)
+
+    def set(self, value: float, labels: tuple = ()) -> None:
+        self.values[labels] = value
+
+
+class GaugeFunc:
+    '''
+        Value read at scrape time, e.g. cache stats kept elsewhere
+    '''
+    kind = "gauge"
+
+    def __init__(self, name: str, description: str, func: Callable[[], float]) -> None:
+        self.name = name
+        self.description = description
+        self.func = func
+        registry.append(self)
+
+    def samples(self):
+        yield self.name, "", self.func()
+
+
+class Histogram:
+    kind = "histogram"
+
+    def __init__(self, name: str, description: str, label_names: tuple = (), buckets: tuple = LATENCY_BUCKETS) -> None:
+        self.name = name
+        self.description = description
+        self.label_names = label_names
+        self.buckets = buckets
+        # labels -> [per-bucket counts (+Inf last), sum, count]
+        self.values: dict[tuple, list] = {}
+        registry.append(self)
+
+    def observe(self, value: float, labels: tuple = ()) -> None:
+        entry = self.values.get(labels)
+        if entry is None:
+            entry = self.values[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+
+        entry[0][bisect_left(self.buckets, value)] += 1
+        entry[1] += value
+        entry[2] += 1
+
+    def time(self, labels: tuple = ()) -> "HistogramTimer":
+        return HistogramTimer(self, labels)
+
+    def samples(self):
+        for labels, (bucket_counts, total, count) in self.values.items():
+            cumulative = 0
+            for bound, n in zip(self.buckets + ("+Inf",), bucket_counts):
+                cumulative += n
+                yield f"{self.name}_bucket", format_labels(self.label_names, labels, f'le="{bound}"'), cumulative
+
+            yield f"{self.name}_sum", format_labels(self.label_names, labels), total
+            yield f"{self.name}_count", format_labels(self.label_names, labels), count
+
+
+class HistogramTimer:
+    def __init__(self, histogram: Histogram, labels: tuple) -> None:
+        self.histogram = histogram
+        self.labels = labels
+
+    def __enter__(self) -> "HistogramTimer":
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.histogram.observe(time.perf_counter() - self.start, self.labels)
+
+
+def render() -> str:
+    lines = []
+    for metric in registry:
+        lines.append(f"# HELP {metric.name} {metric.description}")
+        lines.append(f"# TYPE {metric.name} {metric.kind}")
+        lines.extend(f"{name}{labels} {value}" for name, labels, value in metric.samples())
+
+    return "\n".join(lines) + "\n"
+
+
+"""##########################
+    NOTE: START APP METRICS
+##########################"""
+
+http_requests_total = Counter(
+    "http_requests_total", "HTTP requests handled", ("router", "route", "method", "status")
+)
+http_requests_in_progress = Gauge(
+    "http_requests_in_progress", "HTTP requests currently being handled"
+)
+http_request_duration_seconds = Histogram(
+    "http_request_duration_seconds", "HTTP request latency", ("router", "route", "method")
+)
+db_pool_checkout_seconds = Histogram(
+    "db_pool_checkout_seconds", "Time waiting for a DB connection from the pool", ("engine",)
+)
+redis_blocklist_seconds = Histogram(
+    "redis_blocklist_seconds", "Redis round trip for jti blocklist lookups (cache misses only)"
+)
+bcrypt_seconds = Histogram(
+    "bcrypt_seconds", "bcrypt hash/verify time in the pool's threads, without queueing", ("operation",),
+    buckets=(0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0),
+)
+bcrypt_rejected_total = Counter(
+    "bcrypt_rejected_total", "bcrypt calls rejected because the pool was saturated"
+)
+scheduler_job_seconds = Histogram(
+    "scheduler_job_seconds", "Duration of scheduled job runs", ("job",),
+    buckets=(0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0, 30.0, 60.0, 300.0),
+)
+scheduler_job_runs_total = Counter(
+    "scheduler_job_runs_total", "Scheduled job runs on this worker", ("job", "outcome")
+)
+scheduler_job_rows_total = Counter(
+    "scheduler_job_rows_total", "Rows/keys affected by scheduled jobs", ("job",)
+)
+scheduler_job_last_success = Gauge(
+    "scheduler_job_last_success_timestamp", "Unix time of the job's last successful run on this worker", ("job",)
+)
+response_cache_requests_total = Counter(
+    "response_cache_requests_total", "Cacheable requests by outcome (hit, miss, coalesced, bypass)", ("route", "outcome")
+)
+response_cache_not_modified_total = Counter(
+    "response_cache_not_modified_total", "Cacheable requests answered 304 Not Modified", ("route",)
+)
+response_cache_invalidated_keys_total = Counter(
+    "response_cache_invalidated_keys_total", "Cached responses deleted by tag invalidation"
+)
+
+
+def route_labels(scope: dict) -> tuple[str, str]:
+    '''
+        (router prefix, route template), unmatched paths share one label to bound cardinality
+    '''
+    route = scope.get("route")
+    if route is None:
+        return "unmatched", "unmatched"
+
+    template = route.path
+    return "/" + template.split("/")[1], template
+
+
+class MetricsMiddleware:
+    '''
+        Plain ASGI middleware (no BaseHTTPMiddleware task/stream overhead)
+    '''
+
+    def __init__(self, app) -> None:
+        self.app = app
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+
+        async def send_with_status(message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        http_requests_in_progress.inc()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            elapsed = time.perf_counter() - start
+            http_requests_in_progress.dec()
+
+            router, route = route_labels(scope)
+            method = scope["method"]
+            http_request_duration_seconds.observe(elapsed, (router, route, method))
+            http_requests_total.inc((router, route, method, str(status_code)))
@@ -0,0 +1,209 @@
+from src.db.models import User, Workout, LandWorkoutRoutine, MemberWorkoutPerformance
+from src.db.db_enum_models import WorkoutTypeEnum, WorkoutMeasurementTypeEnum
+from sqlmodel.ext.asyncio.session import AsyncSession
+from sqlmodel import select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy import literal_column
+from datetime import date, timedelta
+from uuid import UUID
+from pathlib import Path
+from typing import Iterator
+from .schemas import ErgIngestReportModel
+from .ratings import record_results, rating_params, ERG_RESULT_WEIGHT
+import csv
+import time
+
+'''
+    Concept2 logbook csv ingestion into `MemberWorkoutPerformance`
+    - files are read row by row and written INGEST_BATCH_SIZE rows at a time (one upsert + commit per batch),
+        memory only grows with the member/routine lookups, not with the number of rows
+    - the member is the file's `Username` column when present, else the `username` given by the caller,
+        else the file name up to the first "_" (`ab123456_2025.csv`, as the club collects them)
+    - a result goes to the erg `LandWorkoutRoutine` on that day whose target matches the piece
+        (distance in meters / time in seconds), or the day's only erg routine when nothing matches
+    - newly inserted results update the rowers' pace ratings, oldest first within a batch
+        (a logbook split across batches is rated in arrival order, `recompute-ratings` replays it by date)
+'''
+INGEST_BATCH_SIZE = 1000
+
+# Concept2 logbook export headers
+DATE_COLUMN = "Date"
+WORK_TIME_COLUMN = "Work Time (Seconds)"
+WORK_DISTANCE_COLUMN = "Work Distance"
+STROKE_RATE_COLUMN = "Stroke Rate/Cadence"
+USERNAME_COLUMN = "Username"
+
+
+def erg_watts(seconds: float, meters: float) -> int:
+    '''
+        Concept2's pace -> power formula, watts = 2.80 / (seconds per meter)^3
+    '''
+    return round(2.80 / (seconds / meters) ** 3)
+
+def parse_logbook_row(row: dict) -> tuple[date, float, float, dict] | None:
+    '''
+        (day, seconds, meters, `MemberWorkoutPerformance` values without the keys), None if unusable
+    '''
+    try:
+        day = date.fromisoformat((row.get(DATE_COLUMN) or "")[:10])
+        seconds = float(row[WORK_TIME_COLUMN])
+        meters = float(row[WORK_DISTANCE_COLUMN])
+        rate = row.get(STROKE_RATE_COLUMN)
+        rate = int(float(rate)) if rate else None
+    except (KeyError, TypeError, ValueError):
+        return None
+
+    if seconds <= 0 or meters <= 0:
+        return None
+
+    return day, seconds, meters, {
+        "total_time": timedelta(seconds=seconds),
+        "avg_pace": timedelta(seconds=seconds * 500 / meters),
+        "avg_rate": rate,
+        "avg_wattage": erg_watts(seconds, meters),
+    }
+
+def logbook_files(path: str | Path) -> list[Path]:
+    path = Path(path)
+    return sorted(path.rglob("*.csv")) if path.is_dir() else [path]
+
+def read_logbook(file: Path, username: str | None = None) -> Iterator[tuple[str, dict]]:
+    '''
+        Yields (username, row) one line at a time
+    '''
+    default_username = username or file.stem.split("_")[0]
+
+    with file.open(newline="", encoding="utf-8-sig") as f:
+        for row in csv.DictReader(f):
+            yield (row.get(USERNAME_COLUMN) or default_username).strip(), row
+
+
+class ErgIngester:
+    '''
+        Resolves usernames and erg routines with a query per batch (only for keys not seen yet),
+        then upserts the batch's results
+    '''
+
+    def __init__(self, session: AsyncSession):
+        self.session = session
+        self.member_ids: dict[str, UUID | None] = {}
+        # date -> [(measurement type, target value, routine_id)] in workout order
+        self.routines: dict[date, list[tuple]] = {}
+        self.report = ErgIngestReportModel()
+
+    async def load_members(self, usernames: set[str]) -> None:
+        missing = usernames - self.member_ids.keys()
+        if not missing:
+            return
+
+        result = await self.session.exec(select(User.username, User.uid).where(User.username.in_(missing)))
+        self.member_ids.update({username: None for username in missing})
+        self.member_ids.update(dict(result.all()))
+
+    async def load_routines(self, days: set[date]) -> None:
+        missing = days - self.routines.keys()
+        if not missing:
+            return
+
+        result = await self.session.exec(
+            select(
+                Workout.date_occurred,
+                LandWorkoutRoutine.target_measurement_type,
+                LandWorkoutRoutine.target_value,
+                LandWorkoutRoutine.routine_id,
+            )
+            .join(Workout, Workout.workout_id == LandWorkoutRoutine.workout_id)
+            .where(Workout.date_occurred.in_(missing), Workout.workout_type == WorkoutTypeEnum.ERG)
+            .order_by(Workout.date_occurred, Workout.sequence_num, LandWorkoutRoutine.sequence_num)
+        )
+        self.routines.update({day: [] for day in missing})
+        for day, measurement, target, routine_id in result.all():
+            self.routines[day].append((measurement, target, routine_id))
+
+    def match_routine(self, day: date, seconds: float, meters: float) -> int | None:
+        candidates = self.routines.get(day, [])
+
+        for measurement, target, routine_id in candidates:
+            if measurement == WorkoutMeasurementTypeEnum.TIME and target == round(seconds):
+                return routine_id
+            if measurement == WorkoutMeasurementTypeEnum.DISTANCE and target == round(meters):
+                return routine_id
+
+        return candidates[0][2] if len(candidates) == 1 else None
+
+    async def flush(self, batch: list[tuple[str, date, float, float, dict]]) -> None:
+        await self.load_members({username for username, *_ in batch})
+        await self.load_routines({day for _, day, *_ in batch})
+
+        # keyed by the primary key, a later row for the same piece wins
+        values, days = {}, {}
+        for username, day, seconds, meters, performance in batch:
+            member_id = self.member_ids.get(username)
+            if member_id is None:
+                self.report.unmatched_member += 1
+                continue
+
+            routine_id = self.match_routine(day, seconds, meters)
+            if routine_id is None:
+                self.report.unmatched_routine += 1
+                continue
+
+            values[(member_id, routine_id)] = {"member_id": member_id, "workout_performed_id": routine_id, **performance}
+            days[(member_id, routine_id)] = day
+
+        if values:
+            statement = insert(MemberWorkoutPerformance).values(list(values.values()))
+            statement = statement.on_conflict_do_update(
+                index_elements=[MemberWorkoutPerformance.member_id, MemberWorkoutPerformance.workout_performed_id],
+                set_={
+                    column: statement.excluded[column]
+                    for column in ("total_time", "avg_pace", "avg_rate", "avg_wattage")
+                },
+            )
+            # xmax is 0 on rows that were inserted rather than updated
+            statement = statement.returning(
+                MemberWorkoutPerformance.member_id,
+                MemberWorkoutPerformance.workout_performed_id,
+                literal_column("xmax = 0"),
+            )
+            result = await self.session.exec(statement)
+            inserted = [(member_id, routine_id) for member_id, routine_id, is_new in result.all() if is_new]
+
+            # only new results move the ratings, re-ingested ones are corrections (see `recompute_ratings`)
+            await record_results(self.session, [
+                rating_params(key[0], values[key]["avg_pace"], ERG_RESULT_WEIGHT, values[key]["avg_wattage"])
+                for key in sorted(inserted, key=lambda key: days[key])
+            ])
+            await self.session.commit()
+            self.report.upserted += len(values)
+
+    async def ingest(self, path: str | Path, username: str | None = None) -> ErgIngestReportModel:
+        started = time.perf_counter()
+        batch = []
+
+        for file in logbook_files(path):
+            self.report.files += 1
+
+            for row_username, row in read_logbook(file, username):
+                self.report.rows += 1
+                parsed = parse_logbook_row(row)
+
+                if parsed is None:
+                    self.report.invalid += 1
+                    continue
+
+                batch.append((row_username, *parsed))
+
+                if len(batch) >= INGEST_BATCH_SIZE:
+                    await self.flush(batch)
+                    batch = []
+
+        if batch:
+            await self.flush(batch)
+
+        self.report.seconds = time.perf_counter() - started
+        return self.report
+
+
+async def ingest_logbooks(path: str | Path, session: AsyncSession, username: str | None = None) -> ErgIngestReportModel:
+    return await ErgIngester(session).ingest(path, username)
@@ -0,0 +1,237 @@
+from src.db.models import (
+    Rower,
+    RowerOnBoat,
+    BoatRoutineIdentifier,
+    BoatWorkoutRoutine,
+    LandWorkoutRoutine,
+    MemberWorkoutPerformance,
+    Workout,
+)
+from sqlmodel.ext.asyncio.session import AsyncSession
+from sqlmodel import select
+from sqlalchemy import bindparam, case, event, extract, func, literal, null, union_all, update, Float, Integer
+from datetime import timedelta
+from uuid import UUID
+import numpy as np
+
+'''
+    Rower pace ratings (`Rower.pace_rating`, seconds per 500m), an exponentially weighted average of results
+    - every result is one O(1) `UPDATE` of the rower's row computed from its previous values, history is never rescanned
+        step = max(RATING_ALPHA, 1 / (times_rowed + 1)), early results count more until the average settles
+        a = step * weight (boat results are shared by the crew so they count for less)
+        rating += a * (pace - rating), variance = (1 - a) * (variance + a * (pace - rating)^2)
+    - ORM inserts of `MemberWorkoutPerformance` / `BoatWorkoutRoutine` apply it automatically (`after_insert`),
+        bulk writers (the Concept2 ingestion) call `record_results` with what they inserted
+    - `recompute_ratings` replays a season (or everything) vectorized with NumPy for backfills and corrections,
+        it applies the same steps in the same order so both paths agree
+'''
+RATING_ALPHA = 0.2
+ERG_RESULT_WEIGHT = 1.0
+BOAT_RESULT_WEIGHT = 0.5
+
+rower_table = Rower.__table__
+
+
+def rating_update_statement():
+    '''
+        Executed with {"b_rower", "b_pace", "b_weight", "b_wattage"} params, many at once with executemany
+    '''
+    c = rower_table.c
+    pace = bindparam("b_pace", type_=Float)
+    weight = bindparam("b_weight", type_=Float)
+    wattage = bindparam("b_wattage", type_=Integer)
+
+    step = func.greatest(RATING_ALPHA, 1.0 / (c.times_rowed + 1))
+    a = weight * step
+
+    return (
+        update(rower_table)
+        .where(c.rower_id == bindparam("b_rower"))
+        .values(
+            pace_rating=func.coalesce(c.pace_rating + a * (pace - c.pace_rating), pace),
+            pace_variance=func.coalesce((1 - a) * (c.pace_variance + a * func.power(pace - c.pace_rating, 2)), 0.0),
+            times_rowed=c.times_rowed + 1,
+            total_pace_contribution=c.total_pace_contribution + func.round(pace),
+            avg_wattage=case(
+                (wattage.is_(None), c.avg_wattage),
+                else_=func.round(c.avg_wattage + step * (wattage - c.avg_wattage)),
+            ),
+        )
+    )
+
+def rating_params(rower_id: UUID, avg_pace: timedelta, weight: float, wattage: int | None = None) -> dict:
+    return {"b_rower": rower_id, "b_pace": avg_pace.total_seconds(), "b_weight": weight, "b_wattage": wattage}
+
+
+async def record_results(session: AsyncSession, results: list[dict]) -> None:
+    '''
+        `results` from `rating_params`, in the order the results happened
+    '''
+    if results:
+        connection = await session.connection()
+        await connection.execute(rating_update_statement(), results)
+
+
+@event.listens_for(MemberWorkoutPerformance, "after_insert")
+def rate_member_workout_performance(mapper, connection, target) -> None:
+    if target.avg_pace is not None:
+        connection.execute(
+            rating_update_statement(),
+            [rating_params(target.member_id, target.avg_pace, ERG_RESULT_WEIGHT, target.avg_wattage)],
+        )
+
+@event.listens_for(BoatWorkoutRoutine, "after_insert")
+def rate_boat_workout_routine(mapper, connection, target) -> None:
+    if target.avg_pace is None:
+        return
+
+    crew = connection.execute(
+        select(RowerOnBoat.rower_id)
+        .join(BoatRoutineIdentifier, BoatRoutineIdentifier.boat_routine_id == RowerOnBoat.boat_routine_id)
+        .where(BoatRoutineIdentifier.workout_id == target.workout_id, BoatRoutineIdentifier.boat == target.boat)
+    ).scalars().all()
+
+    if crew:
+        connection.execute(
+            rating_update_statement(),
+            [rating_params(rower_id, target.avg_pace, BOAT_RESULT_WEIGHT) for rower_id in crew],
+        )
+
+
+def results_statement(semester_id: int | None):
+    '''
+        (rower_id, pace seconds, weight, wattage) of every rated result, oldest first
+    '''
+    erg = (
+        select(
+            MemberWorkoutPerformance.member_id.label("rower_id"),
+            extract("epoch", MemberWorkoutPerformance.avg_pace).label("pace"),
+            literal(ERG_RESULT_WEIGHT).label("weight"),
+            MemberWorkoutPerformance.avg_wattage.label("wattage"),
+            Workout.date_occurred.label("day"),
+            Workout.sequence_num.label("workout_seq"),
+            LandWorkoutRoutine.sequence_num.label("routine_seq"),
+        )
+        .join(Rower, Rower.rower_id == MemberWorkoutPerformance.member_id)
+        .join(LandWorkoutRoutine, LandWorkoutRoutine.routine_id == MemberWorkoutPerformance.workout_performed_id)
+        .join(Workout, Workout.workout_id == LandWorkoutRoutine.workout_id)
+        .where(MemberWorkoutPerformance.avg_pace.is_not(None))
+    )
+    boat = (
+        select(
+            RowerOnBoat.rower_id,
+            extract("epoch", BoatWorkoutRoutine.avg_pace),
+            literal(BOAT_RESULT_WEIGHT),
+            null(),
+            Workout.date_occurred,
+            Workout.sequence_num,
+            BoatWorkoutRoutine.sequence_num,
+        )
+        .join(
+            BoatRoutineIdentifier,
+            (BoatRoutineIdentifier.workout_id == BoatWorkoutRoutine.workout_id)
+            & (BoatRoutineIdentifier.boat == BoatWorkoutRoutine.boat),
+        )
+        .join(RowerOnBoat, RowerOnBoat.boat_routine_id == BoatRoutineIdentifier.boat_routine_id)
+        .join(Workout, Workout.workout_id == BoatWorkoutRoutine.workout_id)
+        .where(BoatWorkoutRoutine.avg_pace.is_not(None))
+    )
+
+    if semester_id is not None:
+        erg = erg.where(Workout.semester_id == semester_id)
+        boat = boat.where(Workout.semester_id == semester_id)
+
+    results = union_all(erg, boat).subquery()
+    return select(results.c.rower_id, results.c.pace, results.c.weight, results.c.wattage).order_by(
+        results.c.day, results.c.workout_seq, results.c.routine_seq
+    )
+
+
+def replay_ratings(rower_codes: np.ndarray, pace: np.ndarray, weight: np.ndarray, wattage: np.ndarray, rowers: int) -> dict:
+    '''
+        Same steps as `rating_update_statement` from a blank slate, inputs in chronological order
+        (wattage is NaN where unknown). Each pass updates the k-th result of every rower at once,
+        so the Python loop runs max(results per rower) times, not once per result
+    '''
+    rating = np.full(rowers, np.nan)
+    variance = np.zeros(rowers)
+    times = np.zeros(rowers)
+    total = np.zeros(rowers)
+    watts = np.zeros(rowers)
+
+    # position of each result within its rower's history
+    order = np.argsort(rower_codes, kind="stable")
+    counts = np.bincount(rower_codes, minlength=rowers)
+    starts = np.cumsum(counts) - counts
+    position = np.empty_like(rower_codes)
+    position[order] = np.arange(len(rower_codes)) - starts[rower_codes[order]]
+
+    for k in range(counts.max(initial=0)):
+        selected = position == k
+        r, x, w, wt = rower_codes[selected], pace[selected], weight[selected], wattage[selected]
+
+        step = np.maximum(RATING_ALPHA, 1.0 / (times[r] + 1))
+        a = w * step
+        old = rating[r]
+        first = np.isnan(old)
+
+        rating[r] = np.where(first, x, old + a * (x - old))
+        variance[r] = np.where(first, 0.0, (1 - a) * (variance[r] + a * (x - old) ** 2))
+        # round() on a double precision is rint in postgres, halves go to even
+        total[r] += np.rint(x)
+        has_watts = ~np.isnan(wt)
+        watts[r] = np.where(has_watts, np.rint(watts[r] + step * (np.nan_to_num(wt) - watts[r])), watts[r])
+        times[r] += 1
+
+    return {"rating": rating, "variance": variance, "times": times, "total": total, "watts": watts}
+
+
+async def recompute_ratings(session: AsyncSession, semester_id: int | None = None) -> int:
+    '''
+        Rebuilds ratings from the results, everyone from scratch when `semester_id` is None,
+        otherwise the rowers with results that season are rated on that season alone
+        returns the number of rowers written
+    '''
+    result = await session.exec(results_statement(semester_id))
+    rows = result.all()
+    connection = await session.connection()
+
+    if semester_id is None:
+        await connection.execute(
+            update(rower_table).values(pace_rating=None, pace_variance=0.0, times_rowed=0, total_pace_contribution=0, avg_wattage=0)
+        )
+
+    if rows:
+        rower_ids, rower_codes = np.unique(np.array([row[0] for row in rows], dtype=object), return_inverse=True)
+        replayed = replay_ratings(
+            rower_codes.astype(np.int64),
+            np.array([row[1] for row in rows], dtype=float),
+            np.array([row[2] for row in rows], dtype=float),
+            np.array([np.nan if row[3] is None else row[3] for row in rows], dtype=float),
+            len(rower_ids),
+        )
+
+        c = rower_table.c
+        await connection.execute(
+            update(rower_table).where(c.rower_id == bindparam("b_rower")).values(
+                pace_rating=bindparam("b_rating"),
+                pace_variance=bindparam("b_variance"),
+                times_rowed=bindparam("b_times"),
+                total_pace_contribution=bindparam("b_total"),
+                avg_wattage=bindparam("b_watts"),
+            ),
+            [
+                {
+                    "b_rower": rower_id,
+                    "b_rating": float(replayed["rating"][i]),
+                    "b_variance": float(replayed["variance"][i]),
+                    "b_times": int(replayed["times"][i]),
+                    "b_total": int(replayed["total"][i]),
+                    "b_watts": int(replayed["watts"][i]),
+                }
+                for i, rower_id in enumerate(rower_ids)
+            ],
+        )
+
+    await session.commit()
+    return len(rower_ids) if rows else 0
@@ -1,7 +1,7 @@
 from pydantic import BaseModel, Field
 from pydantic import model_validator
 from uuid import UUID
-from datetime import date, datetime
+from datetime import date, datetime, time
 from enum import Enum
 from src.db.db_enum_models import SemesterEnum
 
@@ -24,11 +24,11 @@ class SemesterAttendance(StrictModel):
         Tracks each students's absences that semster, if not absent on that day then they were present
         sort by (year, semester) for current stats
     '''
-    member_id = UUID
+    member_id: UUID
     semester: SemesterEnum
     year: int = Field(ge=1900)
     day: date
-    arrival_time: datetime.time
+    arrival_time: time
     is_tardy: bool = False
 
     
@@ -63,9 +63,34 @@ class MemberWorkoutPerformance(StrictModel):
     workout_id: UUID
     member_id: UUID
     sequence_num: int 
-    performance: datetime.time
+    performance: time
+
+
 
 
 
 
 
+'''
+
+    INGESTION-RELATED MODELS
+
+'''
+
+
+class ErgIngestReportModel(StrictModel):
+    '''
+        Outcome of a Concept2 logbook ingestion run
+        rows that couldn't be tied to a member / erg routine are counted, not stored
+    '''
+    files: int = 0
+    rows: int = 0
+    upserted: int = 0
+    unmatched_member: int = 0
+    unmatched_routine: int = 0
+    invalid: int = 0
+    seconds: float = 0.0
+
+    @property
+    def rows_per_second(self) -> float:
+        return self.rows / self.seconds if self.seconds else 0.0
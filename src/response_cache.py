@@ -0,0 +1,222 @@
+from fastapi import Request, Response
+from fastapi.routing import APIRoute
+from redis.exceptions import RedisError
+from src.auth.dependencies import access_token_scheme
+from src.config import Config
+from src.db.response_cache import (
+    get_cached,
+    tag_generations,
+    store_cached,
+    acquire_fill_lock,
+    release_fill_lock,
+    wait_for_fill,
+    RESPONSE_CACHE_KEY,
+)
+from src.metrics import response_cache_requests_total, response_cache_not_modified_total
+from dataclasses import dataclass
+from typing import Callable
+import asyncio
+import hashlib
+import json
+import logging
+
+'''
+    Declarative caching of GET responses in redis
+
+        user_router = APIRouter(route_class=CachedRoute)
+
+        @user_router.get("/all_users", ...)
+        @cached_response(tags=("users",))
+        async def get_all_users(...)
+
+    - `CachedRoute` answers hits before any dependency runs, and on a 200 miss stores what FastAPI rendered
+        (after `response_model` filtering), routes without the decorator are untouched
+    - keyed by route, path/query params, body and the caller's role (plus uid when `per_user`),
+        the access token is verified first so an invalid or revoked token never gets a cached response
+    - `tags` may use the token's claims, e.g. "user:{uid}", services call `invalidate_tags` after committing
+    - strong ETag (sha256 of the body), a matching `If-None-Match` gets 304 with no body
+    - `single_flight`: concurrent misses of a key are computed once, in the worker by sharing the pending result,
+        across workers through a fill lock the others wait on (at most RESPONSE_CACHE_LOCK_SECONDS, then compute)
+    - redis trouble never fails a request, the handler just runs uncached
+'''
+RESPONSE_CACHE_ATTRIBUTE = "__response_cache__"
+
+# responses depend on who asks, clients keep them but revalidate with the ETag
+CACHE_CONTROL = "private, no-cache"
+
+# key -> entry being computed by this worker
+pending_fills: dict[str, asyncio.Future] = {}
+
+
+@dataclass
+class ResponseCachePolicy:
+    ttl: int | None
+    tags: tuple[str, ...]
+    per_user: bool
+    single_flight: bool
+
+
+def cached_response(
+    ttl: int | None = None, tags: tuple[str, ...] = (), per_user: bool = False, single_flight: bool = True
+):
+    '''
+        `ttl` defaults to RESPONSE_CACHE_TTL seconds
+    '''
+    def decorator(endpoint: Callable) -> Callable:
+        setattr(endpoint, RESPONSE_CACHE_ATTRIBUTE, ResponseCachePolicy(ttl, tuple(tags), per_user, single_flight))
+        return endpoint
+
+    return decorator
+
+
+def response_cache_key(route: str, request: Request, body: bytes, claims: dict, per_user: bool) -> str:
+    parts = {
+        "path": sorted(request.path_params.items()),
+        "query": sorted(request.query_params.multi_items()),
+        "body": hashlib.sha256(body).hexdigest() if body else None,
+        "role": claims.get("role"),
+        "uid": claims.get("uid") if per_user else None,
+    }
+    digest = hashlib.sha256(json.dumps(parts, default=str, sort_keys=True).encode()).hexdigest()
+
+    return f"{RESPONSE_CACHE_KEY}{route}:{digest}"
+
+
+def etag_of(body: bytes) -> str:
+    return f'"{hashlib.sha256(body).hexdigest()}"'
+
+
+def not_modified(request: Request, etag: str) -> bool:
+    header = request.headers.get("if-none-match")
+    if header is None:
+        return False
+
+    # If-None-Match uses the weak comparison
+    candidates = [candidate.strip().removeprefix("W/") for candidate in header.split(",")]
+    return "*" in candidates or etag in candidates
+
+
+def entry_response(route: str, request: Request, body: bytes, etag: str, media_type: str) -> Response:
+    headers = {"ETag": etag, "Cache-Control": CACHE_CONTROL}
+
+    if not_modified(request, etag):
+        response_cache_not_modified_total.inc((route,))
+        return Response(status_code=304, headers=headers)
+
+    return Response(content=body, media_type=media_type, headers=headers)
+
+
+class CachedRoute(APIRoute):
+
+    def get_route_handler(self) -> Callable:
+        handler = super().get_route_handler()
+        policy = getattr(self.endpoint, RESPONSE_CACHE_ATTRIBUTE, None)
+
+        if policy is None:
+            return handler
+
+        async def cached_route_handler(request: Request) -> Response:
+            if not Config.RESPONSE_CACHE_ENABLED or request.method != "GET":
+                return await handler(request)
+
+            return await serve_cached(self.path_format, policy, handler, request)
+
+        return cached_route_handler
+
+
+async def serve_cached(route: str, policy: ResponseCachePolicy, handler: Callable, request: Request) -> Response:
+    token_details = await access_token_scheme(request)
+    claims = token_details["user"]
+
+    key = response_cache_key(route, request, await request.body(), claims, policy.per_user)
+    tags = [tag.format_map(claims) for tag in policy.tags]
+
+    try:
+        cached = await get_cached(key)
+    except (RedisError, OSError) as e:
+        logging.warning("Response cache unavailable: %s", e)
+        response_cache_requests_total.inc((route, "bypass"))
+        return await handler(request)
+
+    if cached is not None:
+        response_cache_requests_total.inc((route, "hit"))
+        return entry_response(route, request, *cached)
+
+    if not policy.single_flight:
+        response, _ = await fill(route, policy, handler, request, key, tags)
+        return response
+
+    pending = pending_fills.get(key)
+    if pending is not None:
+        entry = await asyncio.shield(pending)
+        if entry is not None:
+            response_cache_requests_total.inc((route, "coalesced"))
+            return entry_response(route, request, *entry)
+
+        return await handler(request)
+
+    pending = pending_fills[key] = asyncio.get_running_loop().create_future()
+    entry = None
+    try:
+        response, entry = await fill(route, policy, handler, request, key, tags)
+        return response
+    finally:
+        pending_fills.pop(key, None)
+        pending.set_result(entry)
+
+
+async def fill(
+    route: str, policy: ResponseCachePolicy, handler: Callable, request: Request, key: str, tags: list[str]
+) -> tuple[Response, tuple[bytes, str, str] | None]:
+    '''
+        Runs the handler and stores a 200, returns the response and the entry (None when nothing was cached)
+    '''
+    lock_seconds = Config.RESPONSE_CACHE_LOCK_SECONDS
+    locked = False
+
+    try:
+        generations = await tag_generations(tags)
+
+        if policy.single_flight:
+            locked = await acquire_fill_lock(key, lock_seconds)
+
+            if not locked:
+                entry = await wait_for_fill(key, lock_seconds)
+                if entry is not None:
+                    response_cache_requests_total.inc((route, "coalesced"))
+                    return entry_response(route, request, *entry), entry
+    except (RedisError, OSError) as e:
+        logging.warning("Response cache unavailable: %s", e)
+        response_cache_requests_total.inc((route, "bypass"))
+        return await handler(request), None
+
+    try:
+        response = await handler(request)
+        response_cache_requests_total.inc((route, "miss"))
+
+        # errors and streamed bodies aren't cached
+        if response.status_code != 200 or not hasattr(response, "body"):
+            return response, None
+
+        entry = (bytes(response.body), etag_of(response.body), response.media_type or "application/json")
+
+        try:
+            ttl = policy.ttl if policy.ttl is not None else Config.RESPONSE_CACHE_TTL
+            await store_cached(key, *entry, tags, ttl, generations)
+        except (RedisError, OSError) as e:
+            logging.warning("Response not cached: %s", e)
+    finally:
+        if locked:
+            try:
+                await release_fill_lock(key)
+            except (RedisError, OSError):
+                pass
+
+    response.headers["ETag"] = entry[1]
+    response.headers["Cache-Control"] = CACHE_CONTROL
+
+    if not_modified(request, entry[1]):
+        response_cache_not_modified_total.inc((route,))
+        return Response(status_code=304, headers={"ETag": entry[1], "Cache-Control": CACHE_CONTROL}), entry
+
+    return response, entry
@@ -7,6 +7,8 @@ from typing import Optional, Union, Annotated
 from fastapi import FastAPI, Header, APIRouter
 from fastapi import status
 from fastapi.exceptions import HTTPException
+from fastapi.responses import PlainTextResponse
+from src.metrics import render
 
 root_router = APIRouter()
 users = []
@@ -15,6 +17,13 @@ users = []
 async def welcome():
     return "You have reached the API" 
 
+@root_router.get("/metrics", response_class=PlainTextResponse, include_in_schema=False)
+async def get_metrics():
+    '''
+        Prometheus text exposition format, keep this off the public network
+    '''
+    return PlainTextResponse(render(), media_type="text/plain; version=0.0.4")
+
 @root_router.get("/")
 async def get_headers(
     accept: str = Header(None),
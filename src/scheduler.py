@@ -0,0 +1,207 @@
+from src.config import Config
+from src.db.main import get_session_maker
+from src.db.redis import get_redis
+from src.calendar.service import CalendarService, week_start_of
+from src.metrics import scheduler_job_seconds, scheduler_job_runs_total, scheduler_job_rows_total, scheduler_job_last_success
+from dataclasses import dataclass
+from datetime import date, timedelta
+from typing import Awaitable, Callable
+from uuid import uuid4
+from redis.exceptions import RedisError, WatchError
+import asyncio
+import logging
+import os
+import socket
+import time
+
+'''
+    In-app periodic jobs, started by the app's life_span in every worker
+    - every SCHEDULER_TICK_SECONDS each worker tries to take a job's run lock, `SET scheduler:lock:<job> <token> NX PX`
+        the lock lasts SCHEDULER_LOCK_SECONDS and is renewed while the job runs, so only one worker runs a job
+        however long it takes. Renewal and release only touch the lock while it still holds the worker's token
+        (WATCH/MULTI), a worker that lost its lock cancels its run
+    - with the lock held, `SET scheduler:interval:<job> NX PX <interval>` decides whether the job is due,
+        that key is never released, so across all workers a job starts at most once per interval
+    - a crashed worker's lock expires after SCHEDULER_LOCK_SECONDS, it can't leave a job stuck
+    - jobs return how many rows/keys they touched, exposed on `/metrics` with their duration
+'''
+SCHEDULER_LOCK_KEY = "scheduler:lock:"
+SCHEDULER_INTERVAL_KEY = "scheduler:interval:"
+
+calendar_service = CalendarService()
+
+scheduler_task: asyncio.Task | None = None
+
+
+@dataclass
+class ScheduledJob:
+    name: str
+    interval: Callable[[], float]
+    run: Callable[[], Awaitable[int]]
+
+
+async def purge_stale_absences() -> int:
+    '''
+        `ScheduledAbsence` rows only matter until their week is over, then they move to the archive
+    '''
+    async with get_session_maker()() as session:
+        return await calendar_service.purge_stale_absences(
+            week_start_of(date.today()), Config.ABSENCE_PURGE_CHUNK_SIZE, session
+        )
+
+
+async def warm_effective_availability() -> int:
+    '''
+        Builds this week's and next week's matrix before the first request needs it
+    '''
+    this_week = week_start_of(date.today())
+    warmed = 0
+
+    for week_start in (this_week, this_week + timedelta(days=7)):
+        warmed += len(await calendar_service.get_effective_availability(week_start))
+
+    return warmed
+
+
+scheduled_jobs = [
+    ScheduledJob("purge_stale_absences", lambda: Config.ABSENCE_PURGE_INTERVAL, purge_stale_absences),
+    ScheduledJob("warm_effective_availability", lambda: Config.CACHE_WARMUP_INTERVAL, warm_effective_availability),
+]
+
+
+async def acquire_lock(job: ScheduledJob) -> str | None:
+    '''
+        The token that holds the job's run lock, None when another worker has it
+    '''
+    client = await get_redis()
+    token = f"{socket.gethostname()}:{os.getpid()}:{uuid4().hex}"
+
+    acquired = await client.set(
+        f"{SCHEDULER_LOCK_KEY}{job.name}", token, nx=True, px=int(Config.SCHEDULER_LOCK_SECONDS * 1000)
+    )
+    return token if acquired else None
+
+
+async def update_lock(job: ScheduledJob, token: str, release: bool = False) -> bool:
+    '''
+        Extends (or deletes) the job's lock if `token` still holds it
+    '''
+    client = await get_redis()
+    key = f"{SCHEDULER_LOCK_KEY}{job.name}"
+
+    async with client.pipeline(transaction=True) as pipe:
+        try:
+            await pipe.watch(key)
+            if await pipe.get(key) != token.encode():
+                return False
+
+            pipe.multi()
+            if release:
+                pipe.delete(key)
+            else:
+                pipe.pexpire(key, int(Config.SCHEDULER_LOCK_SECONDS * 1000))
+            await pipe.execute()
+        except WatchError:
+            return False
+
+    return True
+
+
+async def keep_lock(job: ScheduledJob, token: str, run: asyncio.Task) -> None:
+    '''
+        Renews the lock until `run` is done, cancels it if the lock was lost
+    '''
+    while True:
+        await asyncio.sleep(Config.SCHEDULER_LOCK_SECONDS / 3)
+
+        try:
+            renewed = await update_lock(job, token)
+        except (RedisError, OSError) as e:
+            logging.warning("Couldn't renew the %s lock: %s", job.name, e)
+            renewed = False
+
+        if not renewed:
+            logging.warning("Lost the %s lock, cancelling this run", job.name)
+            scheduler_job_runs_total.inc((job.name, "lock_lost"))
+            run.cancel()
+            return
+
+
+async def claim_interval(job: ScheduledJob) -> bool:
+    '''
+        True when the job hasn't started within its interval, and marks it started
+    '''
+    client = await get_redis()
+    return bool(await client.set(f"{SCHEDULER_INTERVAL_KEY}{job.name}", 1, nx=True, px=int(job.interval() * 1000)))
+
+
+async def run_if_due(job: ScheduledJob) -> None:
+    token = await acquire_lock(job)
+    if token is None:
+        return
+
+    try:
+        if not await claim_interval(job):
+            return
+
+        run = asyncio.create_task(run_job(job))
+        renewal = asyncio.create_task(keep_lock(job, token, run))
+        try:
+            # wait() doesn't raise when `keep_lock` cancels the run
+            await asyncio.wait({run})
+        finally:
+            renewal.cancel()
+            run.cancel()
+    finally:
+        await update_lock(job, token, release=True)
+
+
+async def run_job(job: ScheduledJob) -> None:
+    with scheduler_job_seconds.time((job.name,)):
+        try:
+            rows = await job.run()
+        except Exception as e:
+            scheduler_job_runs_total.inc((job.name, "error"))
+            logging.exception(e)
+            return
+
+    scheduler_job_runs_total.inc((job.name, "ok"))
+    scheduler_job_rows_total.inc((job.name,), rows)
+    scheduler_job_last_success.set(time.time(), (job.name,))
+
+
+async def run_scheduler() -> None:
+    '''
+        Runs for the lifetime of the worker, jobs run one at a time
+    '''
+    while True:
+        for job in scheduled_jobs:
+            try:
+                await run_if_due(job)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                # redis down, try again next tick
+                logging.exception(e)
+
+        await asyncio.sleep(Config.SCHEDULER_TICK_SECONDS)
+
+
+def start_scheduler() -> None:
+    global scheduler_task
+
+    if scheduler_task is None:
+        scheduler_task = asyncio.create_task(run_scheduler())
+
+
+async def stop_scheduler() -> None:
+    global scheduler_task
+
+    if scheduler_task is not None:
+        scheduler_task.cancel()
+        try:
+            await scheduler_task
+        except asyncio.CancelledError:
+            pass
+
+    scheduler_task = None
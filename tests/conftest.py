@@ -0,0 +1,170 @@
+import os
+import subprocess
+import sys
+from datetime import date
+from pathlib import Path
+from uuid import uuid4
+
+import pytest
+
+'''
+    Run from the repo root with `python -m pytest`
+    - settings the app can't start without get harmless defaults, nothing here connects anywhere by itself
+    - tests needing postgres take the `session_maker` fixture and are skipped unless TEST_DB_URL points at
+        a database they may migrate and write to (e.g. postgresql+asyncpg://postgres@localhost/rowing_test),
+        every table is truncated before each of them
+    - replica routing tests also migrate a second database, TEST_READ_DB_URL or "<test database>_replica"
+    - redis is TEST_REDIS_URL when set, an in-process fakeredis otherwise
+'''
+ROOT = Path(__file__).resolve().parents[1]
+TEST_DB_URL = os.environ.get("TEST_DB_URL")
+
+os.environ.setdefault("DB_URL", TEST_DB_URL or "postgresql+asyncpg://postgres@localhost/rowing_test")
+os.environ.setdefault("JWT_SECRET", "test-secret-" + "x" * 32)
+os.environ.setdefault("JWT_ALGORITHM", "HS256")
+os.environ.setdefault("SCHEDULER_ENABLED", "false")
+
+
+def pytest_configure(config):
+    config.addinivalue_line("markers", "slow: long running (e.g. exports of a million rows), deselect with -m 'not slow'")
+
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
+
+
+def migrate(url: str) -> None:
+    result = subprocess.run(
+        [sys.executable, "-m", "alembic", "upgrade", "head"],
+        cwd=ROOT, env={**os.environ, "DB_URL": url, "PYTHONPATH": str(ROOT)},
+        capture_output=True, text=True,
+    )
+    assert result.returncode == 0, result.stderr[-3000:]
+
+
+@pytest.fixture(scope="session")
+def migrated_database():
+    if TEST_DB_URL is None:
+        pytest.skip("TEST_DB_URL is not set")
+
+    migrate(TEST_DB_URL)
+    return TEST_DB_URL
+
+
+@pytest.fixture(scope="session")
+def migrated_replica_database(migrated_database):
+    '''
+        TEST_READ_DB_URL, or a "<test database>_replica" database next to it (created when missing)
+        nothing replicates into it, tests write each side themselves to see which one was read
+    '''
+    import asyncio
+    from sqlalchemy import text
+    from sqlalchemy.engine import make_url
+    from sqlalchemy.ext.asyncio import create_async_engine
+
+    url = os.environ.get("TEST_READ_DB_URL")
+
+    if url is None:
+        primary = make_url(migrated_database)
+        url = primary.set(database=f"{primary.database}_replica").render_as_string(hide_password=False)
+
+        async def create_database():
+            engine = create_async_engine(migrated_database, isolation_level="AUTOCOMMIT")
+            try:
+                async with engine.connect() as conn:
+                    database = make_url(url).database
+                    exists = await conn.scalar(text("SELECT 1 FROM pg_database WHERE datname = :name"), {"name": database})
+                    if not exists:
+                        await conn.execute(text(f'CREATE DATABASE "{database}"'))
+            finally:
+                await engine.dispose()
+
+        asyncio.run(create_database())
+
+    migrate(url)
+    return url
+
+
+@pytest.fixture
+async def session_maker(migrated_database):
+    '''
+        The app's primary session factory over an empty (migrated) database, engines are disposed afterwards
+    '''
+    from sqlmodel import SQLModel, text
+    from src.db.main import init_engines, get_engine, get_session_maker, close_db
+
+    init_engines()
+
+    tables = ", ".join(f'"{table.name}"' for table in SQLModel.metadata.sorted_tables)
+    async with get_engine().begin() as conn:
+        await conn.execute(text(f"TRUNCATE {tables} RESTART IDENTITY CASCADE"))
+
+    yield get_session_maker()
+
+    await close_db()
+
+
+@pytest.fixture
+async def redis_client(monkeypatch):
+    import src.db.redis as redis_module
+
+    if os.environ.get("TEST_REDIS_URL"):
+        client = redis_module.redis.Redis.from_url(os.environ["TEST_REDIS_URL"])
+    else:
+        import fakeredis
+        client = fakeredis.FakeAsyncRedis()
+
+    await client.flushdb()
+    monkeypatch.setattr(redis_module, "redis_token_blocklist", client)
+    redis_module.blocklist_cache.valid.clear()
+    redis_module.blocklist_cache.revoked.clear()
+    redis_module.token_generation_cache.clear()
+
+    yield client
+
+    await client.aclose()
+
+
+@pytest.fixture
+def make_user(session_maker, redis_client):
+    '''
+        make_user(role, passwd_hash) -> (User, auth headers with a fresh access token)
+    '''
+    from src.auth.user_routes import access_token_claims
+    from src.auth.utils import create_access_token
+    from src.db.db_enum_models import MemberRoleEnum
+    from src.db.models import User
+
+    async def make(role: MemberRoleEnum = MemberRoleEnum.ADMIN, passwd_hash: str | None = None):
+        suffix = uuid4().hex[:6]
+        user = User(
+            username=f"tu{suffix}",
+            email=f"{suffix}@test.edu",
+            first_name="test",
+            last_name="user",
+            role=role,
+            birthdate=date(2000, 1, 1),
+            passwd_hash=passwd_hash,
+        )
+
+        async with session_maker() as session:
+            session.add(user)
+            await session.commit()
+
+        token = create_access_token(user_data=await access_token_claims(user))
+        return user, {"Authorization": f"Bearer {token}"}
+
+    return make
+
+
+@pytest.fixture
+async def client(session_maker, redis_client):
+    '''
+        httpx client on the app, without its life_span (the fixtures above stand in for it)
+    '''
+    import httpx
+    from src import app
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as http_client:
+        yield http_client
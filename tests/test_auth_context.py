@@ -0,0 +1,79 @@
+import pytest
+from sqlalchemy import event
+import src.auth.dependencies as dependencies
+from src.config import get_settings
+from src.db.main import get_engine
+
+'''
+    Auth is decoded, verified and resolved once per request however many dependencies ask for it
+    (`TokenBearer` caches the token on `request.state`, `resolve_current_user` the `User` row)
+'''
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture
+def decode_count(monkeypatch):
+    decoded = []
+    decode_token = dependencies.decode_token
+
+    def counting_decode(token: str):
+        decoded.append(token)
+        return decode_token(token)
+
+    monkeypatch.setattr(dependencies, "decode_token", counting_decode)
+    return decoded
+
+@pytest.fixture
+def user_queries(session_maker):
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if 'FROM "User"' in statement:
+            statements.append(statement)
+
+    engine = get_engine().sync_engine
+    event.listen(engine, "before_cursor_execute", record)
+    yield statements
+    event.remove(engine, "before_cursor_execute", record)
+
+
+@pytest.mark.parametrize("response_cache", [True, False])
+async def test_one_decode_and_one_user_query_per_request(
+    client, make_user, decode_count, user_queries, monkeypatch, response_cache
+):
+    '''
+        /auth/me stacks the bearer, a role checker and the current user,
+        on a response cache miss the cache checks the token first
+    '''
+    monkeypatch.setattr(get_settings(), "RESPONSE_CACHE_ENABLED", response_cache)
+    user, headers = await make_user()
+
+    response = await client.get("/auth/me", headers=headers)
+
+    assert response.status_code == 200, response.text
+    assert response.json()["uid"] == str(user.uid)
+    assert len(decode_count) == 1
+    assert len(user_queries) == 1
+
+async def test_cached_response_decodes_once_and_skips_the_user_query(client, make_user, decode_count, user_queries):
+    _, headers = await make_user()
+
+    await client.get("/auth/me", headers=headers)
+    decode_count.clear()
+    user_queries.clear()
+
+    response = await client.get("/auth/me", headers=headers)
+
+    assert response.status_code == 200
+    assert len(decode_count) == 1
+    assert user_queries == []
+
+async def test_revoked_token_is_rejected_after_one_decode(client, make_user, decode_count):
+    _, headers = await make_user()
+    assert (await client.get("/auth/logout", headers=headers)).status_code == 200
+
+    decode_count.clear()
+    response = await client.get("/auth/me", headers=headers)
+
+    assert response.status_code == 403
+    assert len(decode_count) == 1
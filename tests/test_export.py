@@ -0,0 +1,89 @@
+import csv
+import gzip
+import io
+import json
+import os
+import tracemalloc
+import pytest
+from sqlmodel import text
+from src.db.db_enum_models import ExportFormatEnum
+from src.member.export import export_stream
+
+'''
+    Exports stream from a server-side cursor, memory doesn't grow with the number of rows
+'''
+pytestmark = pytest.mark.anyio
+
+EXPORT_TEST_ROWS = int(os.environ.get("EXPORT_TEST_ROWS", 1_000_000))
+# a few export batches in flight, nowhere near the size of the export
+EXPORT_MEMORY_BUDGET = 16 * 1024 * 1024
+
+
+async def insert_users(session_maker, rows: int) -> None:
+    async with session_maker() as session:
+        await session.exec(text(
+            '''
+            INSERT INTO "User" (uid, username, email, first_name, last_name, role, birthdate, is_verified, join_date)
+            SELECT gen_random_uuid(), lpad(i::text, 8, '0'), i || '@test.edu', 'first', 'last', 'COACH',
+                DATE '2000-01-01', false, DATE '2020-01-01' + (i % 2000)
+            FROM generate_series(1, :rows) AS i
+            '''
+        ).bindparams(rows=rows))
+        await session.commit()
+
+
+@pytest.mark.slow
+async def test_export_memory_stays_flat(session_maker):
+    await insert_users(session_maker, EXPORT_TEST_ROWS)
+
+    lines = exported = 0
+    tracemalloc.start()
+    try:
+        async for chunk in export_stream("roster", ExportFormatEnum.CSV, None, gzip=False):
+            exported += len(chunk)
+            lines += chunk.count(b"\n")
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    assert lines == EXPORT_TEST_ROWS + 1
+    assert peak < EXPORT_MEMORY_BUDGET, f"peak {peak / 2**20:.1f}MiB exporting {exported / 2**20:.0f}MiB"
+
+async def test_csv_export(session_maker):
+    await insert_users(session_maker, 2500)
+
+    body = b"".join([chunk async for chunk in export_stream("roster", ExportFormatEnum.CSV, None, gzip=False)])
+    rows = list(csv.DictReader(io.StringIO(body.decode())))
+
+    assert len(rows) == 2500
+    assert rows[0]["role"] == "coach"
+    # newest first
+    assert rows[0]["join_date"] >= rows[-1]["join_date"]
+
+async def test_gzip_ndjson_export(session_maker):
+    await insert_users(session_maker, 2500)
+
+    body = b"".join([chunk async for chunk in export_stream("roster", ExportFormatEnum.NDJSON, None, gzip=True)])
+    rows = [json.loads(line) for line in gzip.decompress(body).splitlines()]
+
+    assert len(rows) == 2500
+    assert {"uid", "username", "email", "join_date"} <= rows[0].keys()
+    assert "passwd_hash" not in rows[0]
+
+async def test_semester_filter(session_maker):
+    await insert_users(session_maker, 10)
+    async with session_maker() as session:
+        await session.exec(text(
+            '''INSERT INTO "Semester" (year, semester, start_date, end_date) VALUES (2026, 'FALL', '2026-08-20', '2026-12-15')'''
+        ))
+        await session.exec(text(
+            '''
+            INSERT INTO "MemberEnrollmentHistory" (member_id, semester_id, role, dues_paid)
+            SELECT uid, 1, 'COACH', false FROM "User" ORDER BY username LIMIT 4
+            '''
+        ))
+        await session.commit()
+
+    body = b"".join([chunk async for chunk in export_stream("roster", ExportFormatEnum.CSV, 1, gzip=False)])
+
+    assert len(body.splitlines()) == 1 + 4
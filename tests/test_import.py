@@ -0,0 +1,62 @@
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+'''
+    Importing `src` is what every new worker pays on a cold start, it must stay cheap and touch nothing:
+    settings, engines and redis are created by the app's life_span (or on first use), never at import
+'''
+ROOT = Path(__file__).resolve().parents[1]
+
+# cumulative, third party packages included (fastapi, sqlalchemy, numpy...)
+IMPORT_BUDGET_MS = float(os.environ.get("IMPORT_BUDGET_MS", 3000))
+# the project's own modules only
+OWN_IMPORT_BUDGET_MS = float(os.environ.get("OWN_IMPORT_BUDGET_MS", 750))
+
+NO_SIDE_EFFECTS = '''
+import src, src.cli
+from src.config import get_settings
+from src.db import main, redis
+
+assert get_settings.cache_info().currsize == 0, "settings were read at import"
+assert main.async_engine is None and main.read_async_engine is None, "an engine was built at import"
+assert redis.redis_pool is None and redis.redis_token_blocklist is None, "redis was set up at import"
+'''
+
+
+def import_src() -> subprocess.CompletedProcess:
+    # without the required settings, so reading them at import fails loudly
+    env = {key: value for key, value in os.environ.items() if key not in ("DB_URL", "JWT_SECRET", "JWT_ALGORITHM")}
+    env["PYTHONPATH"] = str(ROOT)
+
+    return subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", NO_SIDE_EFFECTS],
+        cwd=ROOT, env=env, capture_output=True, text=True,
+    )
+
+def import_times(stderr: str) -> dict[str, tuple[int, int]]:
+    '''
+        module -> (self µs, cumulative µs) from `-X importtime` output
+    '''
+    times = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+
+        own, cumulative, module = line.removeprefix("import time:").split("|")
+        times[module.strip()] = (int(own), int(cumulative))
+
+    return times
+
+
+def test_import_is_side_effect_free_and_within_budget():
+    result = import_src()
+    assert result.returncode == 0, result.stderr[-3000:]
+
+    times = import_times(result.stderr)
+    total_ms = times["src"][1] / 1000
+    own_ms = sum(own for module, (own, _) in times.items() if module == "src" or module.startswith("src.")) / 1000
+
+    assert total_ms <= IMPORT_BUDGET_MS, f"import src took {total_ms:.0f}ms > {IMPORT_BUDGET_MS:.0f}ms"
+    assert own_ms <= OWN_IMPORT_BUDGET_MS, f"src's own modules took {own_ms:.0f}ms > {OWN_IMPORT_BUDGET_MS:.0f}ms"
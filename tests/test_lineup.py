@@ -0,0 +1,76 @@
+from datetime import date
+from uuid import uuid4
+
+import pytest
+
+from src.db.db_enum_models import BoatEnum, BoatLineupTypeEnum
+from src.lineup.schemas import LineupRequestModel
+from src.lineup.service import LineupService
+
+'''
+    `build_lineup` on fixed rosters, the db lookups are replaced by the values they'd return
+'''
+pytestmark = pytest.mark.anyio
+
+MEN = BoatLineupTypeEnum.MEN
+WOMEN = BoatLineupTypeEnum.WOMEN
+MIXED = BoatLineupTypeEnum.MIXED
+
+
+def lineup_service(monkeypatch, seat_counts: list[int], paces: dict, coxwains: set, categories: dict) -> LineupService:
+    service = LineupService()
+
+    async def get_seat_counts(lineup, session):
+        return seat_counts
+
+    async def get_available_members(practice_date):
+        return set(paces) | coxwains
+
+    async def get_rower_paces(members, session):
+        return dict(paces)
+
+    async def get_coxwains(members, session):
+        return set(coxwains)
+
+    async def get_categories(rowers, session):
+        return dict(categories)
+
+    for method in (get_seat_counts, get_available_members, get_rower_paces, get_coxwains, get_categories):
+        monkeypatch.setattr(service, method.__name__, method)
+
+    return service
+
+def request(*boats: tuple[BoatEnum, BoatLineupTypeEnum]) -> LineupRequestModel:
+    return LineupRequestModel(
+        practice_date=date(2026, 10, 19),
+        boats=[{"boat": boat, "lineup_type": lineup_type} for boat, lineup_type in boats],
+    )
+
+
+async def test_a_boat_that_cant_be_filled_leaves_its_cox_to_the_next(monkeypatch):
+    men = [uuid4() for _ in range(4)]
+    cox = uuid4()
+    service = lineup_service(
+        monkeypatch, [4, 4], {rower: 100.0 + i for i, rower in enumerate(men)}, {cox}, dict.fromkeys(men, MEN)
+    )
+
+    # no women for the first four, the cox used to stay with it and the second four went without
+    result = await service.build_lineup(request((BoatEnum.JUDGE, WOMEN), (BoatEnum.WHEELER, MIXED)), None)
+
+    assert result.unfilled == [BoatEnum.JUDGE]
+    assert [boat.boat for boat in result.boats] == [BoatEnum.WHEELER]
+    assert result.boats[0].coxwain_id == cox
+    assert {seat.rower_id for seat in result.boats[0].seats} == set(men)
+
+async def test_a_rowing_cox_of_an_empty_boat_rows(monkeypatch):
+    fast, coxing_rower = uuid4(), uuid4()
+    service = lineup_service(
+        monkeypatch, [4, 2], {fast: 100.0, coxing_rower: 110.0}, {coxing_rower}, dict.fromkeys([fast, coxing_rower], MEN)
+    )
+
+    result = await service.build_lineup(request((BoatEnum.JUDGE, WOMEN), (BoatEnum.DZ, MIXED)), None)
+
+    assert result.unfilled == [BoatEnum.JUDGE]
+    assert result.boats[0].coxwain_id is None
+    assert [seat.rower_id for seat in result.boats[0].seats] == [coxing_rower, fast]
+    assert result.benched == []
@@ -0,0 +1,91 @@
+import asyncio
+import threading
+import time
+
+import pytest
+from fastapi.exceptions import HTTPException
+
+import src.auth.utils as utils
+from src.config import get_settings
+from src.metrics import bcrypt_seconds
+
+'''
+    The bcrypt pool's admission limit counts work the pool still has, not callers still waiting for it
+'''
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture
+def small_pool(monkeypatch):
+    '''
+        One thread and one queued call, a fresh pool before and after
+    '''
+    monkeypatch.setattr(get_settings(), "BCRYPT_POOL_SIZE", 1)
+    monkeypatch.setattr(get_settings(), "BCRYPT_MAX_QUEUED", 1)
+    utils.shutdown_passwd_hasher()
+
+    yield
+
+    utils.shutdown_passwd_hasher()
+
+async def wait_for(condition, timeout: float = 2.0) -> None:
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline
+        await asyncio.sleep(0.005)
+
+
+async def test_a_cancelled_caller_keeps_its_slot_until_the_hash_is_done(small_pool):
+    started, release = threading.Event(), threading.Event()
+
+    def blocking_hash():
+        started.set()
+        release.wait(5)
+        return True
+
+    running = asyncio.create_task(utils.run_passwd_hasher(blocking_hash))
+    await wait_for(started.is_set)
+
+    # e.g. the client disconnected, the thread is still hashing
+    running.cancel()
+    await asyncio.gather(running, return_exceptions=True)
+    assert utils.passwd_hasher_in_flight == 1
+
+    queued = asyncio.create_task(utils.run_passwd_hasher(lambda: True))
+    await asyncio.sleep(0)
+
+    with pytest.raises(HTTPException) as rejected:
+        await utils.run_passwd_hasher(lambda: True)
+    assert rejected.value.status_code == 503
+
+    release.set()
+    assert await queued is True
+    await wait_for(lambda: utils.passwd_hasher_in_flight == 0)
+
+async def test_a_call_cancelled_before_it_starts_frees_its_slot(small_pool):
+    release = threading.Event()
+
+    running = asyncio.create_task(utils.run_passwd_hasher(lambda: release.wait(5)))
+    queued = asyncio.create_task(utils.run_passwd_hasher(lambda: True))
+    await wait_for(lambda: utils.passwd_hasher_in_flight == 2)
+
+    queued.cancel()
+    await asyncio.gather(queued, return_exceptions=True)
+    assert utils.passwd_hasher_in_flight == 1
+
+    release.set()
+    await running
+    await wait_for(lambda: utils.passwd_hasher_in_flight == 0)
+
+async def test_bcrypt_seconds_leaves_out_the_queue(small_pool):
+    def queued_hash():
+        time.sleep(0.2)
+
+    bcrypt_seconds.values.pop(("queued_hash",), None)
+
+    # the second call waits 0.2s for the only thread
+    await asyncio.gather(utils.run_passwd_hasher(queued_hash), utils.run_passwd_hasher(queued_hash))
+
+    _, total, count = bcrypt_seconds.values[("queued_hash",)]
+    assert count == 2
+    assert total < 0.5
@@ -0,0 +1,109 @@
+from datetime import date
+
+import pytest
+from pydantic import ValidationError
+from sqlmodel import select
+
+import src.auth.permissions as permissions
+from src.auth.permissions import load_role_permissions
+from src.db.db_enum_models import MemberRoleEnum, SemesterEnum
+from src.db.models import RolePermissions, Semester, MemberEnrollmentHistory
+from src.member.schemas import RolePermissionsUpdateModel
+from src.member.semesters import publish_semesters
+
+'''
+    `update_role_permissions` needs MANAGE_ROLES and `enroll_member` MANAGE_MEMBERS (both were open before),
+    ADMIN holds every permission whatever its row says
+'''
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture
+async def role_permissions(session_maker, redis_client):
+    '''
+        MEMBER may only access the site, OFFICER may manage members but not roles
+    '''
+    saved = dict(permissions.role_permissions)
+
+    async with session_maker() as session:
+        session.add(RolePermissions(role=MemberRoleEnum.MEMBER, access_site=True))
+        session.add(RolePermissions(role=MemberRoleEnum.OFFICER, access_site=True, manage_members=True))
+        await session.commit()
+
+    await load_role_permissions()
+    yield
+
+    permissions.apply_role_permissions(saved)
+
+@pytest.fixture
+async def fall_semester(session_maker, redis_client):
+    async with session_maker() as session:
+        session.add(Semester(year=2025, semester=SemesterEnum.FALL, start_date=date(2025, 8, 20), end_date=date(2025, 12, 15)))
+        await session.commit()
+        await publish_semesters(session)
+
+
+@pytest.mark.parametrize("role", [MemberRoleEnum.MEMBER, MemberRoleEnum.OFFICER])
+async def test_update_role_permissions_needs_manage_roles(client, make_user, role_permissions, session_maker, role):
+    _, headers = await make_user(role)
+
+    response = await client.patch(
+        "/member/update_role_permissions", headers=headers, json={"role": "member", "view_roster": True}
+    )
+
+    assert response.status_code == 403, response.text
+
+    async with session_maker() as session:
+        row = (await session.exec(select(RolePermissions).where(RolePermissions.role == MemberRoleEnum.MEMBER))).one()
+    assert row.view_roster is False
+
+async def test_update_role_permissions_as_admin(client, make_user, role_permissions, session_maker):
+    _, headers = await make_user(MemberRoleEnum.ADMIN)
+
+    response = await client.patch(
+        "/member/update_role_permissions", headers=headers, json={"role": "member", "view_roster": True}
+    )
+
+    assert response.status_code == 200, response.text
+    assert permissions.role_has(MemberRoleEnum.MEMBER.value, permissions.Permission.VIEW_ROSTER)
+
+    async with session_maker() as session:
+        row = (await session.exec(select(RolePermissions).where(RolePermissions.role == MemberRoleEnum.MEMBER))).one()
+    assert row.view_roster is True
+
+async def test_enroll_member_needs_manage_members(client, make_user, role_permissions, fall_semester, session_maker):
+    member, member_headers = await make_user(MemberRoleEnum.MEMBER)
+    _, officer_headers = await make_user(MemberRoleEnum.OFFICER)
+    enrollment = {"member_id": str(member.uid), "role": "member", "year": 2025, "semester": "fall"}
+
+    response = await client.post("/member/enroll_member", headers=member_headers, json=enrollment)
+    assert response.status_code == 403, response.text
+
+    # it took no token at all before
+    response = await client.post("/member/enroll_member", json=enrollment)
+    assert response.status_code == 401, response.text
+
+    response = await client.post("/member/enroll_member", headers=officer_headers, json=enrollment)
+    assert response.status_code == 201, response.text
+
+    async with session_maker() as session:
+        enrolled = (await session.exec(select(MemberEnrollmentHistory.member_id))).all()
+    assert enrolled == [member.uid]
+
+
+def test_role_permissions_update_needs_one_permission():
+    # "after" mode, the validator reads the parsed fields (in "before" mode it got the raw dict and always failed)
+    assert RolePermissionsUpdateModel(role=MemberRoleEnum.MEMBER, view_roster=True).view_roster is True
+
+    with pytest.raises(ValidationError, match="At least one permission"):
+        RolePermissionsUpdateModel(role=MemberRoleEnum.MEMBER)
+
+    with pytest.raises(ValidationError, match="At least one permission"):
+        RolePermissionsUpdateModel(role=MemberRoleEnum.MEMBER, view_roster=False)
+
+async def test_update_role_permissions_rejects_an_empty_toggle(client, make_user, role_permissions):
+    _, headers = await make_user(MemberRoleEnum.ADMIN)
+
+    response = await client.patch("/member/update_role_permissions", headers=headers, json={"role": "member"})
+
+    assert response.status_code == 422, response.text
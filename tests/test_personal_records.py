@@ -0,0 +1,137 @@
+import asyncio
+import random
+from datetime import date, timedelta
+import pytest
+from sqlmodel import select, text
+from src.db.db_enum_models import WorkoutMeasurementTypeEnum, WorkoutTypeEnum
+from src.db.models import ExamModel, RowerPerformanceRecord, User
+from src.exam.schemas import ExamResultModel
+from src.exam.service import ExamService
+
+'''
+    Personal records are maintained by one conditional upsert per exam session,
+    concurrent sessions for the same members must never lose a better result
+'''
+pytestmark = pytest.mark.anyio
+
+exam_service = ExamService()
+
+MEMBERS = 50
+SESSIONS_PER_EXAM = 12
+EXAMS = {
+    "2k": WorkoutMeasurementTypeEnum.TIME,
+    "watt ladder": WorkoutMeasurementTypeEnum.WATTAGE,
+    "30min": WorkoutMeasurementTypeEnum.DISTANCE,
+}
+
+
+async def setup_exams(session_maker) -> tuple[list, dict[str, list[int]]]:
+    '''
+        MEMBERS users and SESSIONS_PER_EXAM exam sessions of each exam, returns (member ids, exam name -> exam ids)
+    '''
+    async with session_maker() as session:
+        await session.exec(text(
+            '''INSERT INTO "Semester" (year, semester, start_date, end_date) VALUES (2026, 'FALL', '2026-08-20', '2026-12-15')'''
+        ))
+        await session.exec(text(
+            '''
+            INSERT INTO "User" (uid, username, email, first_name, last_name, role, birthdate, is_verified, join_date)
+            SELECT gen_random_uuid(), lpad(i::text, 8, '0'), i || '@test.edu', 'first', 'last', 'MEMBER',
+                DATE '2000-01-01', false, DATE '2026-01-01'
+            FROM generate_series(1, :members) AS i
+            '''
+        ).bindparams(members=MEMBERS))
+
+        exam_ids = {}
+        for exam_name, measure_type in EXAMS.items():
+            session.add(ExamModel(exam_name=exam_name, exam_type=WorkoutTypeEnum.ERG, measure_type=measure_type))
+            await session.flush()
+            result = await session.exec(text(
+                '''
+                INSERT INTO "Exam" (exam_name, semester_id, date_occurred)
+                SELECT :name, 1, DATE '2026-09-01' + i FROM generate_series(1, :sessions) AS i
+                RETURNING exam_id
+                '''
+            ).bindparams(name=exam_name, sessions=SESSIONS_PER_EXAM))
+            exam_ids[exam_name] = list(result.scalars())
+
+        members = list((await session.exec(select(User.uid))).all())
+        await session.commit()
+
+    return members, exam_ids
+
+def random_results(members: list, rng: random.Random) -> list[ExamResultModel]:
+    results = [
+        ExamResultModel(
+            member_id=member,
+            completion_time=timedelta(seconds=rng.randint(380, 480)),
+            peak_wattage=rng.randint(150, 450),
+            distance=rng.randint(7000, 9000),
+        )
+        for member in members
+    ]
+    rng.shuffle(results)
+    return results
+
+
+async def test_concurrent_sessions_lose_no_records(session_maker, redis_client):
+    members, exam_ids = await setup_exams(session_maker)
+    rng = random.Random(24)
+
+    sessions = [
+        (exam_name, exam_id, random_results(members, rng))
+        for exam_name, ids in exam_ids.items()
+        for exam_id in ids
+    ]
+
+    async def record(exam_id: int, results: list[ExamResultModel]):
+        async with session_maker() as session:
+            return await exam_service.record_results(exam_id, results, session)
+
+    reports = await asyncio.gather(*(record(exam_id, results) for _, exam_id, results in sessions))
+    assert all(report.results_written == MEMBERS for report in reports)
+
+    best = {}
+    for exam_name, _, results in sessions:
+        for result in results:
+            key = (exam_name, result.member_id)
+            if exam_name == "2k":
+                value = result.completion_time
+                best[key] = min(value, best.get(key, value))
+            else:
+                value = result.peak_wattage if exam_name == "watt ladder" else result.distance
+                best[key] = max(value, best.get(key, value))
+
+    async with session_maker() as session:
+        records = (await session.exec(select(RowerPerformanceRecord))).all()
+
+    assert len(records) == len(EXAMS) * MEMBERS
+    for record in records:
+        value = record.value_time if record.exam_name == "2k" else record.value_int
+        assert value == best[(record.exam_name, record.member_id)], (record.exam_name, record.member_id)
+
+    # every record was created once and then only replaced by a better result
+    assert sum(report.records_set for report in reports) >= len(records)
+
+async def test_worse_result_keeps_the_record(session_maker, redis_client):
+    members, exam_ids = await setup_exams(session_maker)
+    first, second = exam_ids["2k"][:2]
+    member = members[0]
+
+    async with session_maker() as session:
+        report = await exam_service.record_results(
+            first, [ExamResultModel(member_id=member, completion_time=timedelta(seconds=400))], session
+        )
+        assert report.records_set == 1
+
+        report = await exam_service.record_results(
+            second, [ExamResultModel(member_id=member, completion_time=timedelta(seconds=410))], session
+        )
+        assert report.records_set == 0
+
+        record = (await session.exec(
+            select(RowerPerformanceRecord).where(RowerPerformanceRecord.member_id == member)
+        )).one()
+
+    assert record.value_time == timedelta(seconds=400)
+    assert record.date_occurred == date(2026, 9, 2)
@@ -0,0 +1,134 @@
+import logging
+import pytest
+from fastapi import Depends
+from fastapi.responses import StreamingResponse
+from sqlmodel import select, text
+from src.auth.service import UserService
+from src.db.models import User
+from src.db.query_stats import assert_query_budget, query_budget
+
+'''
+    Statement budgets per endpoint / service call, `src.db.query_stats` counts what actually ran
+'''
+pytestmark = pytest.mark.anyio
+
+user_service = UserService()
+
+SIGNUP = {
+    "username": "ab123456",
+    "email": "ab@test.edu",
+    "passwd": "secret1",
+    "first_name": "ab",
+    "last_name": "cd",
+    "birthdate": "2000-01-01",
+}
+
+
+async def test_signup_budget(client):
+    '''
+        username check, email check, insert (BEGIN/COMMIT aren't statements)
+    '''
+    response = await client.post("/auth/signup", json=SIGNUP)
+
+    assert response.status_code == 201, response.text
+    assert response.headers["X-DB-Query-Count"] == "3"
+    assert_query_budget(response, 3)
+
+async def test_rejected_signup_budget(client):
+    await client.post("/auth/signup", json=SIGNUP)
+
+    response = await client.post("/auth/signup", json=SIGNUP)
+
+    assert response.status_code == 403
+    assert_query_budget(response, 1)
+
+async def test_authorization_costs_no_query(client, make_user):
+    '''
+        roles come from the token, the roster page is the only statement
+    '''
+    _, headers = await make_user()
+
+    response = await client.get("/auth/all_users", headers=headers)
+
+    assert response.status_code == 200, response.text
+    assert_query_budget(response, 1)
+
+async def test_service_budget(session_maker, make_user):
+    user, _ = await make_user()
+
+    async with session_maker() as session:
+        with query_budget(1) as stats:
+            assert await user_service.get_user_by_uid(user.uid, session) is not None
+
+    assert stats.count == 1
+
+async def test_budget_exceeded(session_maker):
+    async with session_maker() as session:
+        with pytest.raises(AssertionError, match="Query budget exceeded: 2 > 1"):
+            with query_budget(1):
+                await session.exec(select(User))
+                await session.exec(select(User))
+
+async def test_repeated_statement_warns(client, make_user, caplog, monkeypatch):
+    '''
+        The same shape DB_N_PLUS_ONE_THRESHOLD times in one request is logged as a possible N+1
+    '''
+    from src import app
+    from src.config import get_settings
+    from src.db.main import get_session
+
+    monkeypatch.setattr(get_settings(), "DB_N_PLUS_ONE_THRESHOLD", 3)
+
+    @app.get("/tests/n_plus_one")
+    async def n_plus_one(session=Depends(get_session)):
+        for i in range(3):
+            await session.exec(text("SELECT :i").bindparams(i=i))
+
+    try:
+        with caplog.at_level(logging.WARNING, logger="src.db.query_stats"):
+            response = await client.get("/tests/n_plus_one")
+    finally:
+        app.router.routes.pop()
+
+    assert response.headers["X-DB-Query-Count"] == "3"
+    assert "Possible N+1 on GET /tests/n_plus_one: statement ran 3 times" in caplog.text
+
+async def test_streamed_response_is_counted_when_the_stream_ends(client, session_maker, caplog, monkeypatch):
+    '''
+        A StreamingResponse queries after its headers are sent: no headers, the stats are logged at the end
+    '''
+    from src import app
+    from src.config import get_settings
+
+    monkeypatch.setattr(get_settings(), "DB_N_PLUS_ONE_THRESHOLD", 3)
+
+    async def rows():
+        async with session_maker() as session:
+            for i in range(3):
+                yield f"{(await session.exec(text('SELECT :i').bindparams(i=i))).one()[0]}\n"
+
+    @app.get("/tests/streamed")
+    async def streamed():
+        return StreamingResponse(rows(), media_type="text/plain")
+
+    try:
+        with caplog.at_level(logging.INFO, logger="src.db.query_stats"):
+            response = await client.get("/tests/streamed")
+    finally:
+        app.router.routes.pop()
+
+    assert response.text == "0\n1\n2\n"
+    assert "X-DB-Query-Count" not in response.headers
+    assert "GET /tests/streamed streamed: 3 statements" in caplog.text
+    assert "Possible N+1 on GET /tests/streamed: statement ran 3 times" in caplog.text
+
+async def test_export_has_no_query_headers(client, make_user, caplog):
+    _, headers = await make_user()
+
+    with caplog.at_level(logging.INFO, logger="src.db.query_stats"):
+        response = await client.get("/member/export/roster", headers=headers)
+
+    assert response.status_code == 200, response.text
+    assert len(response.text.splitlines()) == 2
+    assert "X-DB-Query-Count" not in response.headers
+    assert "GET /member/export/roster streamed: 1 statements" in caplog.text
@@ -0,0 +1,125 @@
+import time
+from datetime import date
+
+import pytest
+from sqlalchemy.ext.asyncio import async_sessionmaker
+from sqlmodel import SQLModel, text
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+import src.db.main as db_main
+from src.config import get_settings
+from src.db.db_enum_models import MemberRoleEnum
+from src.db.main import READ_PRIMARY_COOKIE, READ_CONSISTENCY_HEADER, build_engine
+from src.db.models import User
+
+'''
+    GET handlers read from DB_READ_URL, unless the client just wrote, asks for the primary, or the replica is down
+    the "replica" is a second database nothing replicates into, each test writes the side it expects to be read
+'''
+pytestmark = pytest.mark.anyio
+
+UNREACHABLE_REPLICA_URL = "postgresql+asyncpg://postgres@127.0.0.1:1/rowing_replica"
+
+SIGNUP = {
+    "username": "su123456",
+    "email": "su@test.edu",
+    "passwd": "secret1",
+    "first_name": "su",
+    "last_name": "cd",
+    "birthdate": "2000-01-01",
+}
+
+
+@pytest.fixture
+async def use_replica(session_maker, monkeypatch):
+    '''
+        use_replica(url) -> the replica's session factory, installed the way `init_engines` does with DB_READ_URL
+    '''
+    engines = []
+    monkeypatch.setattr(get_settings(), "RESPONSE_CACHE_ENABLED", False)
+    monkeypatch.setattr(db_main, "replica_down_until", 0.0)
+
+    def install(url: str) -> async_sessionmaker:
+        engine = build_engine(url, "replica")
+        engines.append(engine)
+
+        replica_session_maker = async_sessionmaker(bind=engine, class_=AsyncSession, expire_on_commit=False)
+        monkeypatch.setattr(db_main, "read_async_engine", engine)
+        monkeypatch.setattr(db_main, "read_session_maker", replica_session_maker)
+        return replica_session_maker
+
+    yield install
+
+    for engine in engines:
+        await engine.dispose()
+
+@pytest.fixture
+async def replica(use_replica, migrated_replica_database):
+    replica_session_maker = use_replica(migrated_replica_database)
+
+    tables = ", ".join(f'"{table.name}"' for table in SQLModel.metadata.sorted_tables)
+    async with replica_session_maker() as session:
+        await session.exec(text(f"TRUNCATE {tables} RESTART IDENTITY CASCADE"))
+        session.add(User(
+            username="re123456",
+            email="re@test.edu",
+            first_name="replica",
+            last_name="user",
+            role=MemberRoleEnum.MEMBER,
+            birthdate=date(2000, 1, 1),
+            passwd_hash=None,
+        ))
+        await session.commit()
+
+    return replica_session_maker
+
+
+async def usernames(client, headers: dict, **kwargs) -> set[str]:
+    response = await client.get("/auth/all_users", headers=headers, params={"fields": "username"}, **kwargs)
+    assert response.status_code == 200, response.text
+    return {item["username"] for item in response.json()["items"]}
+
+
+async def test_reads_go_to_the_replica(client, make_user, replica):
+    admin, headers = await make_user()
+
+    assert await usernames(client, headers) == {"re123456"}
+
+async def test_consistency_header_reads_the_primary(client, make_user, replica):
+    admin, headers = await make_user()
+
+    assert await usernames(client, {**headers, READ_CONSISTENCY_HEADER: "primary"}) == {admin.username}
+
+async def test_a_commit_pins_the_client_to_the_primary(client, make_user, replica):
+    admin, headers = await make_user()
+
+    response = await client.post("/auth/signup", json=SIGNUP)
+    assert response.status_code == 201, response.text
+    cookie = response.cookies[READ_PRIMARY_COOKIE]
+    assert float(cookie) > time.time()
+
+    client.cookies.set(READ_PRIMARY_COOKIE, cookie)
+    assert await usernames(client, headers) == {admin.username, SIGNUP["username"]}
+
+    # an expired pin reads from the replica again
+    client.cookies.set(READ_PRIMARY_COOKIE, str(time.time() - 1))
+    assert await usernames(client, headers) == {"re123456"}
+
+async def test_reads_without_a_commit_leave_no_cookie(client, make_user, replica):
+    _, headers = await make_user()
+
+    response = await client.get("/auth/all_users", headers=headers)
+
+    assert response.status_code == 200, response.text
+    assert READ_PRIMARY_COOKIE not in response.cookies
+
+async def test_unreachable_replica_falls_back_within_the_request(client, make_user, use_replica):
+    use_replica(UNREACHABLE_REPLICA_URL)
+    admin, headers = await make_user()
+
+    # the request that finds the replica down is answered from the primary
+    assert await usernames(client, headers) == {admin.username}
+    assert db_main.replica_down_until > time.monotonic()
+
+    # and the following ones don't try it again until DB_READ_FALLBACK_SECONDS have passed
+    assert await usernames(client, headers) == {admin.username}
@@ -0,0 +1,31 @@
+import pytest
+from src.auth.utils import generate_passwd_hash
+from src.db.response_cache import RESPONSE_CACHE_KEY
+
+'''
+    Cached responses are what the client would have gotten, nothing the response model leaves out gets stored
+'''
+pytestmark = pytest.mark.anyio
+
+
+async def test_me_never_exposes_or_caches_the_password_hash(client, make_user, redis_client):
+    passwd_hash = generate_passwd_hash("a-password")
+    user, headers = await make_user(passwd_hash=passwd_hash)
+
+    response = await client.get("/auth/me", headers=headers)
+
+    assert response.status_code == 200, response.text
+    assert response.json()["uid"] == str(user.uid)
+    assert "passwd_hash" not in response.json()
+    assert passwd_hash not in response.text
+
+    keys = [key async for key in redis_client.scan_iter(f"{RESPONSE_CACHE_KEY}*")]
+    assert keys
+
+    for key in keys:
+        body = await redis_client.hget(key, "body")
+        assert b"passwd_hash" not in body
+        assert passwd_hash.encode() not in body
+
+    cached = await client.get("/auth/me", headers=headers)
+    assert cached.json() == response.json()
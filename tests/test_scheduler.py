@@ -0,0 +1,83 @@
+import asyncio
+
+import pytest
+
+import src.scheduler as scheduler
+from src.config import get_settings
+from src.scheduler import ScheduledJob, SCHEDULER_LOCK_KEY
+
+'''
+    Every worker runs `run_scheduler`, a job must never run in two of them at once however long it takes
+    (fakeredis stands in for the shared redis, each loop is one worker)
+'''
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture
+def fast_scheduler(redis_client, monkeypatch):
+    settings = get_settings()
+    monkeypatch.setattr(settings, "SCHEDULER_TICK_SECONDS", 0.01)
+    monkeypatch.setattr(settings, "SCHEDULER_LOCK_SECONDS", 0.15)
+    return redis_client
+
+def slow_job(name: str, seconds: float, interval: float, state: dict) -> ScheduledJob:
+    '''
+        A job that outlives its interval and its lock, counting runs and how many overlap
+    '''
+    async def run() -> int:
+        state["running"] += 1
+        state["max_running"] = max(state["max_running"], state["running"])
+        try:
+            await asyncio.sleep(seconds)
+        finally:
+            state["running"] -= 1
+
+        state["runs"] += 1
+        return 1
+
+    return ScheduledJob(name, lambda: interval, run)
+
+async def run_workers(count: int, seconds: float) -> None:
+    workers = [asyncio.create_task(scheduler.run_scheduler()) for _ in range(count)]
+    await asyncio.sleep(seconds)
+
+    for worker in workers:
+        worker.cancel()
+    await asyncio.gather(*workers, return_exceptions=True)
+
+
+async def test_two_workers_never_run_a_job_at_once(fast_scheduler, monkeypatch):
+    state = {"running": 0, "max_running": 0, "runs": 0}
+    # runs 4 lock lengths and 10 intervals
+    monkeypatch.setattr(scheduler, "scheduled_jobs", [slow_job("slow", 0.6, 0.06, state)])
+
+    await run_workers(2, 2.0)
+
+    assert state["max_running"] == 1
+    assert state["runs"] >= 2
+    assert not await fast_scheduler.exists(f"{SCHEDULER_LOCK_KEY}slow")
+
+async def test_a_run_that_loses_its_lock_is_cancelled(fast_scheduler, monkeypatch):
+    state = {"running": 0, "max_running": 0, "runs": 0}
+    job = slow_job("lost", 1.0, 60, state)
+    monkeypatch.setattr(scheduler, "scheduled_jobs", [job])
+
+    run = asyncio.create_task(scheduler.run_if_due(job))
+    await asyncio.sleep(0.02)
+    assert state["running"] == 1
+
+    # another worker's lock now, e.g. after this one stalled past SCHEDULER_LOCK_SECONDS
+    await fast_scheduler.set(f"{SCHEDULER_LOCK_KEY}lost", "someone-else")
+    await asyncio.wait_for(run, 1.0)
+
+    assert state == {"running": 0, "max_running": 1, "runs": 0}
+    # release only deletes its own token
+    assert await fast_scheduler.get(f"{SCHEDULER_LOCK_KEY}lost") == b"someone-else"
+
+async def test_interval_limits_how_often_a_job_runs(fast_scheduler, monkeypatch):
+    state = {"running": 0, "max_running": 0, "runs": 0}
+    monkeypatch.setattr(scheduler, "scheduled_jobs", [slow_job("hourly", 0, 3600, state)])
+
+    await run_workers(2, 0.3)
+
+    assert state["runs"] == 1
@@ -0,0 +1,43 @@
+from datetime import date
+
+import pytest
+from sqlmodel import select
+
+from src.db.db_enum_models import MemberRoleEnum, SemesterEnum
+from src.db.models import Semester, MemberEnrollmentHistory
+from src.member.schemas import CreateMemberEnrollmentHistoryModel
+from src.member.semesters import publish_semesters
+
+'''
+    `enroll_member` resolves (year, semester) to a semester_id through the in-memory resolver,
+    so a request that leaves `year` out must resolve with the current year
+'''
+pytestmark = pytest.mark.anyio
+
+
+def test_enrollment_year_defaults_to_the_current_year():
+    enrollment = CreateMemberEnrollmentHistoryModel(
+        member_id="00000000-0000-0000-0000-000000000000", role=MemberRoleEnum.MEMBER, semester=SemesterEnum.FALL
+    )
+
+    assert enrollment.year == date.today().year
+
+async def test_enroll_member_without_a_year(client, make_user, session_maker, redis_client):
+    year = date.today().year
+    async with session_maker() as session:
+        semester = Semester(year=year, semester=SemesterEnum.FALL, start_date=date(year, 8, 20), end_date=date(year, 12, 15))
+        session.add(semester)
+        await session.commit()
+        await publish_semesters(session)
+
+    member, _ = await make_user(MemberRoleEnum.MEMBER)
+    _, headers = await make_user()
+
+    response = await client.post(
+        "/member/enroll_member", headers=headers, json={"member_id": str(member.uid), "role": "member", "semester": "fall"}
+    )
+    assert response.status_code == 201, response.text
+
+    async with session_maker() as session:
+        enrolled = (await session.exec(select(MemberEnrollmentHistory.member_id, MemberEnrollmentHistory.semester_id))).all()
+    assert enrolled == [(member.uid, semester.semester_id)]